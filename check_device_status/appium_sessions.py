@@ -0,0 +1,313 @@
+"""
+Appium driver factory and session reuse for the check_device_status tests.
+
+DriverParams describes the session a test needs (platform, app, device,
+Sauce Labs region and options) and is built from ``@pytest.mark.driver(...)``
+markers, usually naming a profile of capabilities.json plus overrides.
+SessionCache hands the same WebDriver session to every test with equal
+params inside the configured scope (class, module or whole pytest session)
+and restarts the app with terminateApp/activateApp between tests instead of
+creating a new session. With a session_pool.SessionPool, new sessions are
+started in the background ahead of the tests that need them.
+"""
+
+import os
+import time
+import uuid
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from capabilities import CapabilityRegistry, default_registry
+from connection_pool import shared_http_client
+from session_pool import SessionPool
+
+SAUCE_HUB = "https://{credentials}ondemand.{region}.saucelabs.com:443/wd/hub"
+
+DRIVER_SCOPES = ("class", "module", "session")
+
+# When a reused session gets its app restarted
+APP_RESETS = ("class", "test", "never")
+
+
+@dataclass(frozen=True)
+class DriverParams:
+    """Everything that decides which Appium session a test can share."""
+
+    app: str = "storage:filename=Features-18.ipa"
+    platform_name: str = "iOS"
+    automation_name: str = "XCUITest"
+    device_name: Optional[str] = None
+    platform_version: Optional[str] = None
+    region: str = "eu-central-1"
+    appium_version: str = "latest"
+    build: str = "Enable pytest debug log"
+    new_command_timeout: int = 90
+    bundle_id: Optional[str] = None
+    sauce_options: Tuple[Tuple[str, Any], ...] = ()
+    # Builds the connection's urllib3 client (default: shared_http_client)
+    http_client: Optional[Callable[[], Any]] = None
+    # WebDriver hub to use instead of Sauce Labs (e.g. a local stub)
+    hub_url: Optional[str] = None
+    # The Sauce Labs job keeps the name of the test that created the session
+    name: str = field(default="Features Test", compare=False)
+
+    @classmethod
+    def from_markers(
+        cls,
+        markers: Iterable,
+        device_id: Optional[str] = None,
+        registry: Optional[CapabilityRegistry] = None
+    ) -> "DriverParams":
+        """
+        Merge ``driver`` marker arguments into params.
+
+        Args:
+            markers: ``driver`` markers, closest to the test first (as returned
+                by ``item.iter_markers("driver")``)
+            device_id: Default device name (SELECTED_DEVICE_ID)
+            registry: Profiles for the ``profile`` marker argument (default:
+                capabilities.json)
+
+        Returns:
+            The params; marker arguments override the profile's fields, and
+            closer markers override module-level ones
+        """
+        known = {f.name for f in fields(cls)}
+        overrides: Dict[str, Any] = {}
+        for marker in reversed(list(markers)):
+            unknown = set(marker.kwargs) - known - {"profile"}
+            if unknown:
+                raise ValueError(f"Unknown driver marker arguments: {', '.join(sorted(unknown))}")
+            overrides.update(marker.kwargs)
+        kwargs: Dict[str, Any] = {"device_name": device_id}
+        profile = overrides.pop("profile", None)
+        if profile:
+            base = (registry or default_registry()).profile(profile)
+            unknown = set(base) - known
+            if unknown:
+                raise ValueError(f"Unknown fields in capability profile {profile!r}: {', '.join(sorted(unknown))}")
+            kwargs.update(base)
+        kwargs.update(overrides)
+        if isinstance(kwargs.get("sauce_options"), dict):
+            kwargs["sauce_options"] = tuple(sorted(kwargs["sauce_options"].items()))
+        return cls(**kwargs)
+
+
+def build_options(params: DriverParams, username: str, access_key: str):
+    """
+    Build the options for a Sauce Labs session of the params' platform.
+
+    Returns:
+        appium.options.ios.XCUITestOptions, or
+        appium.options.android.UiAutomator2Options for Android
+    """
+    if params.platform_name.lower() == 'android':
+        from appium.options.android import UiAutomator2Options as Options
+    else:
+        from appium.options.ios import XCUITestOptions as Options
+
+    options = Options()
+    options.platform_name = params.platform_name
+    options.automation_name = params.automation_name
+    options.set_capability('appium:deviceName', f'{params.device_name}')
+    if params.platform_version:
+        options.set_capability('appium:platformVersion', params.platform_version)
+    options.set_capability('appium:newCommandTimeout', params.new_command_timeout)
+    options.set_capability('appium:app', params.app)
+
+    # Sauce Labs (sauce:options) - request Appium 2.x explicitly
+    sauce_options = {
+        'username': username,
+        'accessKey': access_key,
+        'appiumVersion': params.appium_version,
+        'uuid': str(uuid.uuid4()),
+        'build': params.build,
+        'name': params.name,
+        **dict(params.sauce_options),
+    }
+    options.set_capability('sauce:options', sauce_options)
+    return options
+
+
+def create_driver(params: DriverParams, metrics=None):
+    """
+    Start a new Appium session on Sauce Labs.
+
+    Credentials come from SAUCE_USERNAME and SAUCE_ACCESS_KEY (only
+    required when ``params.hub_url`` is not set). With a
+    command_metrics.CommandMetrics, session creation and every later
+    command of the driver are timed into it.
+
+    Returns:
+        appium.webdriver.Remote
+    """
+    from appium import webdriver
+
+    username = os.environ.get("SAUCE_USERNAME")
+    access_key = os.environ.get("SAUCE_ACCESS_KEY")
+    if params.hub_url:
+        remote_url = params.hub_url
+    elif not username or not access_key:
+        raise ValueError("SAUCE_USERNAME and SAUCE_ACCESS_KEY environment variables are required")
+    else:
+        # Build the remote URL with credentials for authentication
+        remote_url = SAUCE_HUB.format(credentials=f"{username}:{access_key}@", region=params.region)
+    from appium.webdriver.appium_connection import AppiumConnection
+    from appium.webdriver.client_config import AppiumClientConfig
+
+    # Inject the urllib3 client into the connection; by default sessions of
+    # the process share one pool of keep-alive connections
+    command_executor = AppiumConnection(
+        client_config=AppiumClientConfig(remote_server_addr=remote_url, keep_alive=True)
+    )
+    command_executor._conn = (params.http_client or shared_http_client)()
+
+    started = time.perf_counter()
+    try:
+        driver = webdriver.Remote(
+            command_executor=command_executor,
+            options=build_options(params, username, access_key)
+        )
+    except Exception:
+        if metrics is not None:
+            metrics.record("newSession", time.perf_counter() - started, params.device_name, error=True)
+        raise
+    if metrics is not None:
+        from command_metrics import instrument
+
+        metrics.record("newSession", time.perf_counter() - started, params.device_name)
+        instrument(driver, metrics, params.device_name)
+    return driver
+
+
+def reset_app(driver, bundle_id: str) -> None:
+    """Restart the app under test without a new session."""
+    driver.terminate_app(bundle_id)
+    driver.activate_app(bundle_id)
+
+
+@dataclass
+class _Session:
+    driver: Any
+    bundle_id: Optional[str]
+    last_class: Optional[str] = None
+
+
+class SessionCache:
+    """Shares Appium sessions between tests that need the same params."""
+
+    def __init__(
+        self,
+        scope: str = "class",
+        app_reset: str = "class",
+        factory: Callable[[DriverParams], Any] = create_driver,
+        pool: Optional[SessionPool] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            scope: How long a session lives: "class", "module" or "session"
+            app_reset: When a reused session restarts its app: on the first
+                test of each class ("class"), before every test ("test") or
+                "never"
+            factory: Creates a driver for params (default: create_driver);
+                ignored when a pool is given
+            pool: Optional pool that starts sessions ahead of the tests
+        """
+        if scope not in DRIVER_SCOPES:
+            raise ValueError(f"Driver scope must be one of {', '.join(DRIVER_SCOPES)}")
+        if app_reset not in APP_RESETS:
+            raise ValueError(f"App reset must be one of {', '.join(APP_RESETS)}")
+        self.scope = scope
+        self.app_reset = app_reset
+        self.factory = factory
+        self.pool = pool
+        self.created = 0
+        self.reused = 0
+        self._sessions: Dict[Tuple[str, DriverParams], _Session] = {}
+
+    def scope_key(self, item) -> str:
+        """Return the scope a test's session belongs to."""
+        if self.scope == "session":
+            return "session"
+        if self.scope == "class" and item.cls is not None:
+            return f"{item.module.__name__}::{item.cls.__qualname__}"
+        return item.module.__name__
+
+    def acquire(self, item, params: DriverParams):
+        """
+        Return a driver for a test, reusing the scope's session when possible.
+
+        Args:
+            item: The pytest test item
+            params: Session the test needs
+
+        Returns:
+            The WebDriver
+        """
+        key = (self.scope_key(item), params)
+        class_key = f"{item.module.__name__}::{item.cls.__qualname__ if item.cls else ''}"
+        session = self._sessions.get(key)
+
+        if session is not None:
+            reset = self.app_reset == "test" or (
+                self.app_reset == "class" and session.last_class != class_key
+            )
+            try:
+                if reset and session.bundle_id:
+                    reset_app(session.driver, session.bundle_id)
+                self.reused += 1
+            except Exception:
+                # The session died (timeout, crash); start a fresh one
+                self._quit(key)
+                session = None
+
+        if session is None:
+            driver = self.pool.acquire(params) if self.pool is not None else self.factory(params)
+            self.created += 1
+            session = _Session(driver, params.bundle_id or _active_bundle_id(driver))
+            self._sessions[key] = session
+
+        session.last_class = class_key
+        return session.driver
+
+    def prewarm(self, params: DriverParams) -> None:
+        """Start sessions for params in the background (needs a pool)."""
+        if self.pool is not None:
+            self.pool.prewarm(params)
+
+    def release(self, item, nextitem) -> None:
+        """Quit the sessions of a scope once its last test has finished."""
+        if self.scope == "session" and nextitem is not None:
+            return
+        scope = self.scope_key(item)
+        if nextitem is not None and self.scope_key(nextitem) == scope:
+            return
+        for key in [key for key in self._sessions if key[0] == scope]:
+            self._quit(key)
+
+    def close(self) -> None:
+        """Quit every open session and the pool's idle ones."""
+        for key in list(self._sessions):
+            self._quit(key)
+        if self.pool is not None:
+            self.pool.close()
+
+    def _quit(self, key) -> None:
+        session = self._sessions.pop(key)
+        if self.pool is not None:
+            self.pool.release(session.driver)
+            return
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+
+
+def _active_bundle_id(driver) -> Optional[str]:
+    """Bundle id of the app in the foreground right after session start."""
+    try:
+        return driver.execute_script("mobile: activeAppInfo").get("bundleId")
+    except Exception:
+        return None
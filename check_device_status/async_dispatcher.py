@@ -0,0 +1,284 @@
+"""
+Asyncio dispatcher for the device checker service.
+
+A watcher task polls the device snapshot and streams AVAILABLE devices into a
+queue; a pool of worker tasks claims each device and launches its own pytest
+run, so every free device is kept busy instead of one run at a time.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from run_output import RunLog, pump_async
+from run_results import new_result_log
+from scheduler import Job, Scheduler
+
+
+class AsyncDeviceDispatcher:
+    """Runs pytest scripts concurrently across the checker's devices."""
+
+    def __init__(
+        self,
+        checker,
+        test_scripts: List[str],
+        concurrency: Optional[int] = None,
+        scheduler: Optional[Scheduler] = None
+    ):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            checker: SauceLabsDeviceChecker used for polling and pytest commands
+            test_scripts: Scripts to dispatch round-robin. With ``max_runs`` set
+                on the checker, every script runs ``max_runs`` times in total.
+            concurrency: Maximum simultaneous runs (default: number of devices)
+            scheduler: Job queue that decides which job runs on which device.
+                When given, ``test_scripts`` and ``max_runs`` are ignored and
+                the service stops once the scheduler's queue is drained.
+        """
+        self.checker = checker
+        self.test_scripts = test_scripts
+        self.scheduler = scheduler
+        self.concurrency = concurrency or len(checker.device_ids)
+        self.run_count = 0
+        self.results: List[bool] = []
+
+        if checker.max_runs:
+            jobs = itertools.chain.from_iterable(itertools.repeat(test_scripts, checker.max_runs))
+        else:
+            jobs = itertools.cycle(test_scripts)
+        self._jobs: Iterator[str] = iter(jobs)
+        self._upcoming: Optional[str] = next(self._jobs, None)
+        self._upcoming_since = time.monotonic()
+
+        # Devices queued or running, and when each was last released
+        self._claimed: Set[str] = set()
+        self._released_at: Dict[str, datetime] = {}
+        # Jobs queued or running; counted at enqueue so none is missed while it waits
+        self._in_flight = 0
+        self._finished: Optional[asyncio.Event] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def _exhausted(self) -> bool:
+        """True once every run has been handed to a worker."""
+        if self.scheduler is not None:
+            return not self.scheduler.has_pending()
+        return self._upcoming is None
+
+    def _next_job(self) -> Optional[str]:
+        """Return the next script to run, or None when all runs are dispatched."""
+        job = self._upcoming
+        if job is not None:
+            self._upcoming = next(self._jobs, None)
+            self._upcoming_since = time.monotonic()
+        return job
+
+    def _assign(self, free: Dict[str, Dict[str, Any]], limit: int) -> List[Tuple[Job, str]]:
+        """Pair free devices with jobs, at most ``limit`` pairs."""
+        if self.scheduler is not None:
+            return self.scheduler.assign(free, limit=limit)
+
+        assignments = []
+        for device_id in list(free)[:limit]:
+            waiting_since = self._upcoming_since
+            script = self._next_job()
+            if script is None:
+                break
+            assignments.append((Job(script=script, submitted_at=waiting_since), device_id))
+        return assignments
+
+    async def run(self) -> List[bool]:
+        """
+        Dispatch until all runs complete (or forever without ``max_runs``).
+
+        Returns:
+            Success flag of every completed run, in completion order
+        """
+        self._finished = asyncio.Event()
+        self._wake = asyncio.Event()
+        if self._exhausted:
+            return self.results
+        queue: "asyncio.Queue[Tuple[str, Job]]" = asyncio.Queue()
+        watcher = asyncio.create_task(self._watch(queue))
+        workers = [
+            asyncio.create_task(self._worker(queue, index))
+            for index in range(self.concurrency)
+        ]
+
+        try:
+            await self._finished.wait()
+        finally:
+            for task in [watcher, *workers]:
+                task.cancel()
+            await asyncio.gather(watcher, *workers, return_exceptions=True)
+
+        self.checker._log(f"All {self.run_count} runs dispatched and completed. Stopping service.")
+        return self.results
+
+    async def _watch(self, queue: "asyncio.Queue[Tuple[str, Job]]") -> None:
+        """Poll device states and enqueue (device, job) pairs for free devices."""
+        checker = self.checker
+        previous: Dict[str, Optional[str]] = {}
+
+        while True:
+            try:
+                snapshot = await asyncio.to_thread(checker.get_device_snapshot)
+                fetched_at = checker.snapshot_fetched_at
+                free: Dict[str, Dict[str, Any]] = {}
+
+                for device_id in checker.device_ids:
+                    device = snapshot.get(device_id)
+                    status = device.get("state") if device else None
+                    if status != previous.get(device_id, ""):
+                        checker._log(f"[{device_id}] Status: {status or 'NOT FOUND'}")
+                    previous[device_id] = status
+
+                    if status != "AVAILABLE" or device_id in self._claimed:
+                        continue
+                    # A snapshot taken before the last run ended can still show the
+                    # device as AVAILABLE; wait for one that reflects the release.
+                    released_at = self._released_at.get(device_id)
+                    if released_at and (fetched_at is None or fetched_at <= released_at):
+                        continue
+                    free[device_id] = device
+
+                if self.scheduler is not None and snapshot:
+                    monitored = {d: snapshot[d] for d in checker.device_ids if d in snapshot}
+                    for job in self.scheduler.drop_unschedulable(monitored):
+                        checker._log(
+                            f"No monitored device matches job {job.script} {job.capabilities}; dropping it"
+                        )
+                    if self._exhausted and self._in_flight == 0:
+                        self._finished.set()
+
+                capacity = self.concurrency - len(self._claimed)
+                if free and capacity > 0 and not self._exhausted:
+                    if checker.leases is not None:
+                        # Only devices no other checker instance holds
+                        free = await asyncio.to_thread(self._lease, free)
+                    assigned = set()
+                    for job, device_id in self._assign(free, capacity):
+                        self._claimed.add(device_id)
+                        assigned.add(device_id)
+                        self._in_flight += 1
+                        await queue.put((device_id, job))
+                    for device_id in set(free) - assigned:
+                        await asyncio.to_thread(checker._release_device, device_id, False)
+            except Exception as e:
+                # A failed poll must not end the watcher, or run() would wait forever
+                checker._log(f"Error while watching devices: {e}", logging.ERROR)
+                checker.poller.record_error()
+
+            # Adaptive interval; a finished run wakes the watcher early
+            await self._sleep(checker.poller.next_interval())
+
+    def _lease(self, free: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Lease the free devices; those another checker holds are left out."""
+        return {
+            device_id: device for device_id, device in free.items()
+            if self.checker._lease_device(device_id)
+        }
+
+    async def _sleep(self, timeout: float) -> None:
+        """Sleep until the next poll or until a run finishes."""
+        waiter = asyncio.ensure_future(self._wake.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        finally:
+            waiter.cancel()
+        self._wake.clear()
+
+    async def _worker(self, queue: "asyncio.Queue[Tuple[str, Job]]", index: int) -> None:
+        """Take (device, job) pairs from the queue and run each job's script."""
+        while True:
+            device_id, job = await queue.get()
+            self.run_count += 1
+            run_number = self.run_count
+            self.checker.metrics.set_run_count(self.run_count)
+            started = time.monotonic()
+            try:
+                self.checker._log(
+                    f"[worker {index}] Run {run_number}: {job.script} on {device_id}"
+                )
+                success = await self._run_script(
+                    job.script, device_id, queue_wait=started - job.submitted_at
+                )
+                self.results.append(success)
+                if self.scheduler is not None:
+                    self.scheduler.complete(job, device_id, time.monotonic() - started)
+            finally:
+                self._in_flight -= 1
+                self._release(device_id)
+                queue.task_done()
+
+    def _release(self, device_id: str) -> None:
+        """Return a device to the pool and stop once every run has finished."""
+        self._claimed.discard(device_id)
+        self._released_at[device_id] = datetime.now()
+        self.checker._release_device(device_id)
+        self.checker.poller.note_transition()
+        self._wake.set()
+        if self._exhausted and self._in_flight == 0:
+            self._finished.set()
+
+    async def _run_script(self, test_script: str, device_id: str, queue_wait: float = 0.0) -> bool:
+        """
+        Run one pytest script as a child process bound to a device.
+
+        Args:
+            test_script: Path to the pytest script to execute
+            device_id: Device exported to the run as SELECTED_DEVICE_ID
+            queue_wait: Seconds the script waited for a device (for the history)
+
+        Returns:
+            True if successful, False otherwise
+        """
+        checker = self.checker
+        try:
+            result_log = new_result_log()
+            log_path = checker._run_log_path(test_script, device_id)
+            started_at = time.time()
+            started = time.monotonic()
+            env = checker._test_env(device_id)
+            checker.metrics.run_started(device_id, test_script, queue_wait)
+            if checker.runner.mode == "subprocess" and log_path:
+                process = await asyncio.create_subprocess_exec(
+                    *checker._pytest_command(test_script, result_log), env=env,
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+                )
+                # Drain the pipe while the run goes on so it never blocks on output
+                with RunLog(log_path, checker.runner.log_max_bytes) as run_log:
+                    await pump_async(process.stdout, run_log)
+                returncode = await process.wait()
+            elif checker.runner.mode == "subprocess":
+                process = await asyncio.create_subprocess_exec(
+                    *checker._pytest_command(test_script, result_log), env=env
+                )
+                returncode = await process.wait()
+            else:
+                returncode = await asyncio.to_thread(
+                    checker.runner.run, checker._pytest_args(test_script, result_log), env, None, log_path
+                )
+            checker._finish_run(
+                test_script, device_id, started_at, time.monotonic() - started,
+                returncode, queue_wait, result_log, log_path
+            )
+        except FileNotFoundError:
+            checker._log("Error: pytest not found in the current Python environment.", logging.ERROR)
+            checker.metrics.run_finished(device_id, test_script, "error")
+            return False
+        except Exception as e:
+            checker._log(f"Error executing pytest: {e}", logging.ERROR)
+            checker.metrics.run_finished(device_id, test_script, "error")
+            return False
+
+        if returncode == 0:
+            checker._log(f"Pytest {test_script} on {device_id} completed successfully")
+            return True
+        checker._log(f"Pytest {test_script} on {device_id} failed with exit code {returncode}", logging.WARNING)
+        return False
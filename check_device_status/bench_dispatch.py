@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark pytest dispatch latency for each runner mode.
+
+Generates a trivial test that imports the same heavy modules as the real
+suites (pytest, Appium, Selenium, urllib3) and times how long each runner
+takes to execute it. The numbers are pure dispatch overhead: interpreter
+start-up, imports, collection and teardown.
+
+    python bench_dispatch.py --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+from pytest_runners import RUNNER_MODES, make_runner
+
+TRIVIAL_TEST = '''
+import urllib3
+try:
+    from appium import webdriver
+    from selenium.webdriver.support.ui import WebDriverWait
+except ImportError:
+    pass
+
+
+def test_dispatch():
+    assert True
+'''
+
+
+def bench_mode(mode: str, script: str, runs: int, workers: int) -> Dict[str, float]:
+    """
+    Time ``runs`` sequential dispatches of a script with one runner mode.
+
+    Returns:
+        Start-up time of the runner and per-run latency statistics in seconds
+    """
+    started = time.perf_counter()
+    runner = make_runner(mode, workers=workers)
+    startup = time.perf_counter() - started
+
+    latencies: List[float] = []
+    env = dict(os.environ)
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            exit_code = runner.run(["-qq", script], env)
+            latencies.append(time.perf_counter() - started)
+            if exit_code != 0:
+                raise RuntimeError(f"{mode} run failed with exit code {exit_code}")
+    finally:
+        runner.close()
+
+    return {
+        "startup": startup,
+        "mean": statistics.mean(latencies),
+        "p50": statistics.median(latencies),
+        "max": max(latencies),
+    }
+
+
+def main():
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description="Compare pytest dispatch latency per runner mode")
+    parser.add_argument("--runs", type=int, default=10, help="Dispatches per mode (default: 10)")
+    parser.add_argument("--workers", type=int, default=1, help="Workers for the warm pool (default: 1)")
+    parser.add_argument(
+        "--modes", nargs="+", choices=RUNNER_MODES, default=list(RUNNER_MODES),
+        help="Runner modes to compare (default: all)"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "test_dispatch_bench.py")
+        with open(script, "w") as f:
+            f.write(TRIVIAL_TEST)
+
+        results = {mode: bench_mode(mode, script, args.runs, args.workers) for mode in args.modes}
+
+    print(f"{'mode':<12}{'startup':>10}{'mean':>10}{'p50':>10}{'max':>10}")
+    for mode, stats in results.items():
+        print(
+            f"{mode:<12}{stats['startup'] * 1000:>8.0f}ms{stats['mean'] * 1000:>8.0f}ms"
+            f"{stats['p50'] * 1000:>8.0f}ms{stats['max'] * 1000:>8.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Declarative Appium capability profiles.
+
+Profiles live in ``capabilities.json`` (or the file in CAPABILITIES_FILE):
+named sets of DriverParams fields, optionally extending another profile.
+Tests select one with ``@pytest.mark.driver(profile="features-sim")`` and
+override single fields with more marker arguments. The file is read once,
+on first use, and only the profiles that are actually requested are
+resolved.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+DEFAULT_PROFILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "capabilities.json")
+
+
+class CapabilityRegistry:
+    """Named capability profiles loaded lazily from a JSON file."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the registry without reading the file yet.
+
+        Args:
+            path: Profiles file (default: $CAPABILITIES_FILE or capabilities.json
+                next to this module)
+        """
+        self.path = path or os.environ.get("CAPABILITIES_FILE") or DEFAULT_PROFILES
+        self._raw: Optional[Dict[str, Dict[str, Any]]] = None
+        self._resolved: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._raw is None:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            profiles = data.get("profiles")
+            if not isinstance(profiles, dict):
+                raise ValueError(f"{self.path} has no 'profiles' object")
+            self._raw = profiles
+        return self._raw
+
+    @property
+    def names(self) -> List[str]:
+        """Names of every profile in the file."""
+        with self._lock:
+            return sorted(self._load())
+
+    def profile(self, name: str) -> Dict[str, Any]:
+        """
+        Fields of a profile with the profiles it extends merged in.
+
+        Returns:
+            DriverParams field values (a copy)
+        """
+        with self._lock:
+            if name not in self._resolved:
+                self._resolved[name] = self._resolve(name, ())
+            return dict(self._resolved[name])
+
+    def _resolve(self, name: str, seen: tuple) -> Dict[str, Any]:
+        profiles = self._load()
+        if name not in profiles:
+            raise ValueError(f"Unknown capability profile {name!r} in {self.path}")
+        if name in seen:
+            raise ValueError(f"Capability profile {name!r} extends itself")
+        fields = dict(profiles[name])
+        base = fields.pop("extends", None)
+        if base is None:
+            return fields
+        return {**self._resolve(base, seen + (name,)), **fields}
+
+
+_default: Optional[CapabilityRegistry] = None
+_default_lock = threading.Lock()
+
+
+def default_registry() -> CapabilityRegistry:
+    """Process-wide registry on the default profiles file."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = CapabilityRegistry()
+        return _default
@@ -0,0 +1,254 @@
+"""
+Per-command latency histograms for WebDriver sessions.
+
+instrument() wraps a driver's command executor so every WebDriver command
+(findElement, click, executeScript, ...) is timed into a LatencyHistogram
+tagged by command name, device and the test that issued it. Histograms are
+log-linear (HDR style: 128 linear sub-buckets per power of two, under 1%
+relative error) and sparse, so recording costs two clock reads, a lock and
+a dict update. CommandMetrics dumps them as JSON or Prometheus text.
+"""
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Bucket boundaries (seconds) of the Prometheus exposition
+PROMETHEUS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# executeScript commands are tagged with their extension name (mobile:/sauce:)
+SCRIPT_COMMANDS = {"w3cExecuteScript", "executeScript", "w3cExecuteScriptAsync", "executeAsyncScript"}
+
+
+class LatencyHistogram:
+    """Sparse log-linear histogram of durations, with microsecond resolution."""
+
+    SUB_BUCKET_BITS = 8
+    UNIT = 1e-6
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        shift = max(0, value.bit_length() - cls.SUB_BUCKET_BITS)
+        return (shift << cls.SUB_BUCKET_BITS) + (value >> shift)
+
+    @classmethod
+    def _bounds(cls, index: int) -> Tuple[float, float]:
+        """Lowest and highest duration (seconds) that land in a bucket."""
+        shift = index >> cls.SUB_BUCKET_BITS
+        mantissa = index & ((1 << cls.SUB_BUCKET_BITS) - 1)
+        return (mantissa << shift) * cls.UNIT, (((mantissa + 1) << shift) - 1) * cls.UNIT
+
+    def record(self, seconds: float) -> None:
+        """Add one duration."""
+        index = self._index(max(0, int(seconds / self.UNIT)))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add every value of another histogram."""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Duration at or below which ``q`` percent of the values fall.
+
+        Returns:
+            The midpoint of the matching bucket (clamped to min/max), or None
+            when empty
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * q / 100.0))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                low, high = self._bounds(index)
+                return min(self.max, max(self.min, (low + high) / 2))
+        return self.max
+
+    def cumulative(self, bounds=PROMETHEUS_BUCKETS) -> List[Tuple[float, int]]:
+        """Counts of values at or below each bound (bucket upper edges)."""
+        ordered = sorted(self.counts.items())
+        result = []
+        for bound in bounds:
+            result.append((bound, sum(count for index, count in ordered if self._bounds(index)[1] <= bound)))
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary statistics and the raw buckets."""
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": {str(index): count for index, count in sorted(self.counts.items())},
+        }
+
+
+class CommandMetrics:
+    """Registry of command histograms tagged by (command, device, test)."""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+        self.errors: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def test(self) -> str:
+        """Test the calling thread is running (tags new recordings)."""
+        return getattr(self._local, "test", "")
+
+    @test.setter
+    def test(self, name: Optional[str]) -> None:
+        self._local.test = name or ""
+
+    def record(self, command: str, seconds: float, device: Optional[str] = None, error: bool = False) -> None:
+        """Record one command execution."""
+        key = (command, device or "", self.test)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+            if error:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def by_command(self) -> Dict[str, LatencyHistogram]:
+        """Histograms merged over devices and tests."""
+        merged: Dict[str, LatencyHistogram] = {}
+        with self._lock:
+            for (command, _, _), histogram in self.histograms.items():
+                merged.setdefault(command, LatencyHistogram()).merge(histogram)
+        return merged
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Every histogram with its tags."""
+        with self._lock:
+            items = list(self.histograms.items())
+            errors = dict(self.errors)
+        return {
+            "generated_at": time.time(),
+            "commands": [
+                {"command": command, "device": device, "test": test,
+                 "errors": errors.get((command, device, test), 0), **histogram.to_dict()}
+                for (command, device, test), histogram in sorted(items)
+            ],
+        }
+
+    def prometheus(self, name: str = "webdriver_command_duration_seconds") -> str:
+        """Prometheus text exposition of the histograms and error counters."""
+        with self._lock:
+            items = sorted(self.histograms.items())
+            errors = sorted(self.errors.items())
+        lines = [
+            f"# HELP {name} WebDriver command latency.",
+            f"# TYPE {name} histogram",
+        ]
+        for tags, histogram in items:
+            labels = _labels(tags)
+            for bound, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        lines += [
+            "# HELP webdriver_command_errors_total WebDriver commands that raised.",
+            "# TYPE webdriver_command_errors_total counter",
+        ]
+        lines += [f"webdriver_command_errors_total{{{_labels(tags)}}} {count}" for tags, count in errors]
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        """Write ``<path>`` as JSON and the same name with ``.prom`` as Prometheus text."""
+        stem = path[:-5] if path.endswith(".json") else path
+        _write_atomic(stem + ".json", json.dumps(self.to_dict(), indent=2))
+        _write_atomic(stem + ".prom", self.prometheus())
+
+    def slowest(self, limit: int = 10) -> Iterator[Tuple[str, LatencyHistogram]]:
+        """Commands by total time spent, largest first."""
+        merged = sorted(self.by_command().items(), key=lambda item: -item[1].total)
+        return iter(merged[:limit])
+
+
+def instrument(driver, metrics: CommandMetrics, device: Optional[str] = None):
+    """
+    Time every command the driver sends from now on.
+
+    Args:
+        driver: WebDriver whose ``command_executor.execute`` is wrapped
+        metrics: Registry receiving the timings
+        device: Device tag (default: the session's deviceName capability)
+
+    Returns:
+        The same driver
+    """
+    executor = driver.command_executor
+    if getattr(executor, "_command_metrics", None) is metrics:
+        return driver
+    device = device or (getattr(driver, "capabilities", None) or {}).get("deviceName")
+    execute = executor.execute
+    clock = time.perf_counter
+
+    def timed_execute(command, params):
+        name = command
+        if command in SCRIPT_COMMANDS and isinstance(params, dict):
+            script = str(params.get("script", ""))
+            if script.startswith(("mobile:", "sauce:")):
+                name = f"{command}[{script.split('=')[0]}]"
+        started = clock()
+        try:
+            result = execute(command, params)
+        except Exception:
+            metrics.record(name, clock() - started, device, error=True)
+            raise
+        metrics.record(name, clock() - started, device)
+        return result
+
+    executor.execute = timed_execute
+    executor._command_metrics = metrics
+    return driver
+
+
+def _labels(tags: Tuple[str, str, str]) -> str:
+    command, device, test = (_escape(tag) for tag in tags)
+    return f'command="{command}",device="{device}",test="{test}"'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomic(path: str, text: str) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
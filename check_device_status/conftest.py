@@ -0,0 +1,193 @@
+import os
+from functools import partial
+
+import pytest
+
+from appium_sessions import APP_RESETS, DRIVER_SCOPES, DriverParams, SessionCache, create_driver
+from capabilities import CapabilityRegistry
+from command_metrics import CommandMetrics
+from connection_pool import configure_shared_pool, shared_pool
+from fake_device_api import FakeDeviceAPI
+from fake_webdriver import FakeWebDriver
+from session_pool import SessionPool
+
+DRIVER_SESSIONS = pytest.StashKey[SessionCache]()
+COMMAND_METRICS = pytest.StashKey[CommandMetrics]()
+CAPABILITIES = pytest.StashKey[CapabilityRegistry]()
+
+
+def pytest_addoption(parser):
+    # --capabilities, --session-pool and --session-idle-timeout are shared
+    # with the other suites and registered in the root conftest.py
+    parser.addoption(
+        "--driver-scope",
+        choices=DRIVER_SCOPES,
+        default=os.environ.get("DRIVER_SCOPE", "class"),
+        help="How long an Appium session is shared: class, module or session "
+             "(default: $DRIVER_SCOPE or class)",
+    )
+    parser.addoption(
+        "--app-reset",
+        choices=APP_RESETS,
+        default=os.environ.get("APP_RESET", "class"),
+        help="When a reused session restarts the app with terminateApp/activateApp: "
+             "class, test or never (default: $APP_RESET or class)",
+    )
+    parser.addoption(
+        "--command-metrics",
+        default=os.environ.get("COMMAND_METRICS"),
+        help="Write per-command latency histograms to PATH.json and PATH.prom at the end "
+             "(default: $COMMAND_METRICS)",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "driver(profile=None, **params): Appium session params: a capabilities.json profile "
+        "and overrides (app, device_name, platform_version, region, appium_version, build, "
+        "name, sauce_options, http_client, ...)",
+    )
+    # Profiles are read on first use, once per pytest session
+    config.stash[CAPABILITIES] = CapabilityRegistry(config.getoption("capabilities"))
+    metrics = config.stash[COMMAND_METRICS] = CommandMetrics()
+    factory = partial(create_driver, metrics=metrics)
+    pool = None
+    if config.getoption("session_pool") > 0:
+        pool = SessionPool(
+            factory,
+            size=config.getoption("session_pool"),
+            idle_timeout=config.getoption("session_idle_timeout"),
+        )
+    config.stash[DRIVER_SESSIONS] = SessionCache(
+        scope=config.getoption("driver_scope"),
+        app_reset=config.getoption("app_reset"),
+        factory=factory,
+        pool=pool,
+    )
+
+
+def _driver_params(item) -> DriverParams:
+    return DriverParams.from_markers(
+        item.iter_markers("driver"), os.environ.get("SELECTED_DEVICE_ID"), item.config.stash[CAPABILITIES]
+    )
+
+
+def pytest_collection_finish(session):
+    # Start the first sessions while pytest is still setting up
+    sessions = session.config.stash[DRIVER_SESSIONS]
+    if sessions.pool is None or session.config.option.collectonly:
+        return
+    all_params = list(dict.fromkeys(
+        _driver_params(item) for item in session.items if "driver" in getattr(item, "fixturenames", ())
+    ))
+    # Background sessions of every params set plus the running test's
+    configure_shared_pool(sessions.pool.size * len(all_params) + 1)
+    for params in all_params:
+        sessions.prewarm(params)
+
+
+def pytest_unconfigure(config):
+    sessions = config.stash.get(DRIVER_SESSIONS, None)
+    if sessions is not None:
+        sessions.close()
+    metrics = config.stash.get(COMMAND_METRICS, None)
+    path = config.getoption("command_metrics")
+    if metrics is not None and path and metrics.histograms:
+        metrics.dump(path)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    # Tag WebDriver commands (fixture setup included) with the running test
+    metrics = item.config.stash[COMMAND_METRICS]
+    metrics.test = item.nodeid
+    yield
+    metrics.test = None
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    connections = shared_pool().stats()
+    if connections["requests"]:
+        terminalreporter.section("WebDriver connections")
+        terminalreporter.line(
+            f"{connections['requests']} requests over {connections['connections']} connections "
+            f"({connections['reused']} reused, {connections['closed_by_server']} without keep-alive)"
+        )
+    metrics = config.stash.get(COMMAND_METRICS, None)
+    if metrics is None or not metrics.histograms:
+        return
+    terminalreporter.section("WebDriver command latency")
+    terminalreporter.line(f"{'command':<40}{'count':>7}{'total':>10}{'p50':>9}{'p99':>9}{'max':>9}")
+    for command, histogram in metrics.slowest():
+        terminalreporter.line(
+            f"{command[:39]:<40}{histogram.count:>7}{histogram.total:>9.2f}s"
+            f"{histogram.percentile(50):>8.3f}s{histogram.percentile(99):>8.3f}s{histogram.max:>8.3f}s"
+        )
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_runtest_teardown(item, nextitem):
+    # Quit the sessions of a class/module once its last test has run
+    item.config.stash[DRIVER_SESSIONS].release(item, nextitem)
+
+
+@pytest.fixture
+def driver(request):
+    """
+    Appium driver for iOS device testing on Sauce Labs.
+
+    The session is built from the ``driver`` markers of the test, its class
+    and its module (``pytestmark = pytest.mark.driver(app=..., ...)``) and
+    the device in SELECTED_DEVICE_ID. Tests with equal params share one
+    session for the ``--driver-scope``; the app is restarted between them
+    according to ``--app-reset``. With ``--session-pool N`` the next
+    sessions are started in the background while earlier tests run.
+    """
+    return request.config.stash[DRIVER_SESSIONS].acquire(request.node, _driver_params(request.node))
+
+
+@pytest.fixture
+def fake_device_api():
+    """
+    Local fake of the Sauce Labs device management API.
+
+    Use ``fake_device_api.url`` as the checker's ``api_url`` and assert on
+    ``request_count`` / ``not_modified_count``; set ``latency`` to simulate a
+    slow link.
+    """
+    with FakeDeviceAPI(devices=[
+        {"id": "iPhone_SE_2022_16_POC07", "state": "AVAILABLE"},
+        {"id": "iPhone_14_Plus_16_POC46", "state": "IN_USE"},
+    ]) as api:
+        yield api
+
+
+@pytest.fixture
+def fake_webdriver():
+    """
+    Local stub WebDriver hub.
+
+    Point sessions at it with ``DriverParams(hub_url=fake_webdriver.url)``
+    and set ``session_delay`` to simulate slow session creation.
+    """
+    with FakeWebDriver() as hub:
+        yield hub
+
+
+@pytest.fixture
+def device_checker(fake_device_api, monkeypatch):
+    """SauceLabsDeviceChecker wired to the fake device API."""
+    from device_check_service import SauceLabsDeviceChecker
+
+    monkeypatch.setenv("SAUCE_USERNAME", "fake-user")
+    monkeypatch.setenv("SAUCE_ACCESS_KEY", "fake-key")
+    checker = SauceLabsDeviceChecker(
+        device_ids=["iPhone_SE_2022_16_POC07", "iPhone_14_Plus_16_POC46"],
+        api_url=fake_device_api.url,
+        poll_interval=1,
+        snapshot_ttl=0,
+        rate_limit=0,
+    )
+    yield checker
+    checker.close()
@@ -0,0 +1,178 @@
+"""
+Process-wide HTTP connection pool for WebDriver sessions.
+
+Left alone, every RemoteConnection builds its own urllib3.PoolManager, so a
+process running many sessions opens (and TLS-handshakes) one connection per
+session to the same hub. SharedPoolManager keeps one set of keep-alive
+connections per host for the whole process, sized to the number of sessions
+expected to run at once. Each driver gets a SharedHTTPClient: a handle on
+the shared connections that applies the driver's own retry policies
+(retry_policy.py) and whose clear(), called when the driver quits, leaves
+the connections open for the other sessions.
+
+stats() reports, per host, the connections opened, the requests sent over
+them and how many reused a connection, plus responses that refused
+keep-alive (HTTP/1.0 or ``Connection: close``).
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from retry_policy import EndpointPolicy, PolicyPoolManager, RetryEngine, default_engine
+
+# Connections kept per host when the expected concurrency is unknown
+DEFAULT_MAXSIZE = 10
+
+
+class SharedPoolManager(PolicyPoolManager):
+    """PoolManager shared by every WebDriver connection of the process."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, engine: Optional[RetryEngine] = None, **kwargs):
+        """
+        Initialize the manager.
+
+        Args:
+            maxsize: Connections kept per host (concurrent sessions)
+            engine: Retry engine of clients without their own
+            kwargs: urllib3.PoolManager arguments
+        """
+        super().__init__(engine, maxsize=max(1, maxsize), **kwargs)
+        self.closed_by_server = 0
+        # Counters of pools dropped by resize()/close()
+        self._retired: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self) -> int:
+        """Connections kept per host."""
+        return self.connection_pool_kw["maxsize"]
+
+    def resize(self, maxsize: int) -> None:
+        """
+        Grow the connections kept per host.
+
+        Existing pools are dropped (their idle connections closed), so call
+        it before the sessions start. Never shrinks.
+        """
+        with self._lock:
+            if maxsize <= self.maxsize:
+                return
+            self.connection_pool_kw["maxsize"] = maxsize
+            self._retire()
+
+    def urlopen(self, method, url, redirect=True, **kw):
+        response = super().urlopen(method, url, redirect=redirect, **kw)
+        if response.version < 11 or response.headers.get("Connection", "").lower() == "close":
+            # The server will close this connection instead of keeping it alive
+            with self._lock:
+                self.closed_by_server += 1
+        return response
+
+    def clear(self) -> None:
+        """Keep the connections: RemoteConnection.close() calls this on quit."""
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        with self._lock:
+            self._retire()
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection reuse counters, per host and in total."""
+        with self._lock:
+            hosts = {host: dict(counts) for host, counts in self._retired.items()}
+            closed_by_server = self.closed_by_server
+        for host, pool in self._pools():
+            counts = hosts.setdefault(host, {"connections": 0, "requests": 0})
+            counts["connections"] += pool.num_connections
+            counts["requests"] += pool.num_requests
+            # The queue is pre-filled with None placeholders for unopened slots
+            idle = list(pool.pool.queue) if pool.pool is not None else []
+            counts["idle"] = sum(conn is not None for conn in idle)
+        for counts in hosts.values():
+            counts["reused"] = max(0, counts["requests"] - counts["connections"])
+            counts.setdefault("idle", 0)
+        requests = sum(counts["requests"] for counts in hosts.values())
+        reused = sum(counts["reused"] for counts in hosts.values())
+        return {
+            "maxsize": self.maxsize,
+            "connections": sum(counts["connections"] for counts in hosts.values()),
+            "requests": requests,
+            "reused": reused,
+            "reuse_ratio": round(reused / requests, 3) if requests else None,
+            "closed_by_server": closed_by_server,
+            "hosts": hosts,
+        }
+
+    def _pools(self):
+        for key in self.pools.keys():
+            try:
+                pool = self.pools[key]
+            except KeyError:
+                continue
+            yield f"{key.key_host}:{key.key_port or ''}".rstrip(":"), pool
+
+    def _retire(self) -> None:
+        # Caller holds self._lock
+        for host, pool in self._pools():
+            counts = self._retired.setdefault(host, {"connections": 0, "requests": 0})
+            counts["connections"] += pool.num_connections
+            counts["requests"] += pool.num_requests
+        super().clear()
+
+
+class SharedHTTPClient:
+    """One driver's handle on the shared pool, with its own retry policies."""
+
+    def __init__(self, manager: SharedPoolManager, engine: Optional[RetryEngine] = None):
+        self.manager = manager
+        self.engine = engine or manager.engine
+
+    def request(self, method, url, **kw):
+        return self.manager.request(method, url, engine=self.engine, **kw)
+
+    def urlopen(self, method, url, **kw):
+        return self.manager.urlopen(method, url, engine=self.engine, **kw)
+
+    def clear(self) -> None:
+        """Nothing to release: the connections belong to the shared pool."""
+
+
+_shared: Optional[SharedPoolManager] = None
+_shared_pid: Optional[int] = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> SharedPoolManager:
+    """
+    The process's shared pool manager.
+
+    Sized from HTTP_POOL_SIZE (default 10) until configure_shared_pool()
+    grows it. A forked child gets its own, since sockets cannot be shared.
+    """
+    global _shared, _shared_pid
+    with _shared_lock:
+        if _shared is None or _shared_pid != os.getpid():
+            _shared = SharedPoolManager(int(os.environ.get("HTTP_POOL_SIZE") or DEFAULT_MAXSIZE))
+            _shared_pid = os.getpid()
+        return _shared
+
+
+def configure_shared_pool(concurrency: int) -> SharedPoolManager:
+    """Size the shared pool for this many concurrent sessions."""
+    pool = shared_pool()
+    pool.resize(concurrency)
+    return pool
+
+
+def shared_http_client(*policies: EndpointPolicy) -> SharedHTTPClient:
+    """
+    HTTP client for DriverParams.http_client on the shared pool.
+
+    Args:
+        policies: Extra endpoint policies tried before the defaults
+
+    Returns:
+        A client whose requests use the process-wide connections and engine
+    """
+    return SharedHTTPClient(shared_pool(), default_engine().with_policies(*policies) if policies else None)
@@ -6,13 +6,28 @@ This service continuously polls Sauce Labs private device availability
 and executes pytest scripts when devices become available.
 """
 
+import asyncio
+import logging
 import os
 import sys
 import time
 import requests
 import json
-import subprocess
-from typing import List, Optional
+from device_leases import DEFAULT_TTL as DEFAULT_LEASE_TTL, LeaseManager
+from polling import AdaptivePoller, budget_for
+from retry_policy import CircuitOpenError, PolicyAdapter
+from pytest_runners import RUNNER_MODES, make_runner
+from run_output import DEFAULT_MAX_BYTES as RUN_LOG_MAX_BYTES, run_log_path, tail
+from run_results import RunResult, RunSummary, new_result_log, read_result_log, results_path_for
+from service_logging import (
+    DEFAULT_BACKUPS as LOG_BACKUPS,
+    DEFAULT_MAX_BYTES as LOG_MAX_BYTES,
+    LOG_FORMATS,
+    get_logger,
+    setup_logging,
+)
+from service_metrics import MetricsServer, ServiceMetrics
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 
@@ -24,7 +39,19 @@ class SauceLabsDeviceChecker:
         device_ids: List[str],
         api_url: str = "https://api.eu-central-1.saucelabs.com/v1/rdc/device-management/devices",
         poll_interval: int = 10,
-        max_runs: Optional[int] = None
+        max_runs: Optional[int] = None,
+        snapshot_ttl: Optional[float] = None,
+        pool_size: int = 4,
+        history=None,
+        min_poll_interval: Optional[float] = None,
+        max_poll_interval: Optional[float] = None,
+        rate_limit: Optional[float] = 60,
+        runner: str = "subprocess",
+        warm_workers: int = 2,
+        summary_json: Optional[str] = None,
+        run_log_dir: Optional[str] = None,
+        run_log_max_bytes: int = RUN_LOG_MAX_BYTES,
+        leases=None
     ):
         """
         Initialize the device checker.
@@ -34,12 +61,74 @@ class SauceLabsDeviceChecker:
             api_url: Sauce Labs device management API URL
             poll_interval: Seconds between status checks
             max_runs: Maximum number of test runs (None for infinite)
+            snapshot_ttl: Seconds a fetched device list is reused before the
+                API is queried again (default: half the poll interval); never
+                more than the minimum poll interval
+            pool_size: Maximum number of keep-alive connections kept open to
+                the device management API
+            history: Optional run_history.RunHistory that records every run
+            min_poll_interval: Interval right after a device changed state
+                (default: a fifth of the poll interval)
+            max_poll_interval: Longest interval while every device is busy
+                (default: six times the poll interval)
+            rate_limit: API requests per minute shared by all checker
+                instances on this host (None or 0 disables the budget)
+            runner: How pytest runs are executed: "subprocess" (fresh
+                interpreter per run), "inprocess" (pytest.main in this process)
+                or "warm" (pre-started worker processes)
+            warm_workers: Worker processes for the "warm" runner
+            summary_json: Optional path rewritten with the aggregated test
+                results after every run; the tests of every run are appended
+                to ``<summary_json stem>.runs.jsonl``
+            run_log_dir: Directory that gets one log file per run with the
+                run's output (None lets runs write to the service's stdout)
+            run_log_max_bytes: Size at which a run's log file is rotated
+            leases: Optional device_leases.LeaseManager shared with the other
+                checker instances on the host; devices are leased before a
+                run and the device list is polled once for all instances
         """
         self.device_ids = device_ids
         self.api_url = api_url
         self.poll_interval = poll_interval
         self.max_runs = max_runs
         self.selected_device_id = None
+        self.history = history
+        # Totals only: the tests of every run go to the results file
+        self.summary = RunSummary(
+            keep_runs=False, results_path=results_path_for(summary_json) if summary_json else None
+        )
+        self.metrics = ServiceMetrics(max_runs)
+        self.summary_json = summary_json
+        self.run_log_dir = run_log_dir
+        self.logger = get_logger()
+        self.leases = leases
+        if leases is not None:
+            leases.on_lost = self._lease_lost
+        # Last lease refusal logged per device, to log only changes
+        self._lease_notes: Dict[str, str] = {}
+        self.last_result: Optional[RunResult] = None
+        self.poller = AdaptivePoller(
+            poll_interval,
+            min_interval=min_poll_interval,
+            max_interval=max_poll_interval,
+            budget=budget_for(api_url, rate_limit)
+        )
+        # A list older than the shortest interval must not be reused, or the
+        # fast polls after a state change would only re-read it
+        self.snapshot_ttl = min(
+            poll_interval / 2 if snapshot_ttl is None else snapshot_ttl, self.poller.min_interval
+        )
+
+        # Device-state index built from the last successful API fetch
+        self._snapshot: Dict[str, Dict[str, Any]] = {}
+        self._indexed_devices: Optional[List[Dict[str, Any]]] = None
+        self._snapshot_time: Optional[float] = None
+        self.snapshot_fetched_at: Optional[datetime] = None
+
+        # Validators and body of the last 200 response, for conditional requests
+        self._devices: Optional[List[Dict[str, Any]]] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
         
         # Get credentials from environment variables
         self.username = os.environ.get("SAUCE_USERNAME")
@@ -49,15 +138,173 @@ class SauceLabsDeviceChecker:
             raise ValueError(
                 "SAUCE_USERNAME and SAUCE_ACCESS_KEY environment variables must be set"
             )
+
+        self.session = self._create_session(pool_size)
+        self.runner = make_runner(runner, workers=warm_workers, log_max_bytes=run_log_max_bytes)
+
+    def _create_session(self, pool_size: int) -> requests.Session:
+        """
+        Create the pooled, keep-alive HTTP session used for all API calls.
+
+        Args:
+            pool_size: Maximum number of connections kept per host
+
+        Returns:
+            Configured requests session
+        """
+        session = requests.Session()
+        session.auth = (self.username, self.access_key)
+        session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        # Retries follow the device-api policy and draw from the shared budget
+        adapter = PolicyAdapter(self.api_url, pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self) -> None:
+        """Close the HTTP session, the pytest runner, the run history and the leases."""
+        self.session.close()
+        self.runner.close()
+        if self.history is not None:
+            self.history.close()
+        if self.leases is not None:
+            self.leases.close()
     
-    def _log(self, message: str) -> None:
-        """Log a message with timestamp."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] {message}")
+    def _log(self, message: str, level: int = logging.INFO, **fields: Any) -> None:
+        """
+        Log a message without waiting for the console or log file.
+
+        Args:
+            message: Text of the record
+            level: logging level
+            fields: Structured fields for the JSON log (script, device_id, ...)
+        """
+        self.logger.log(level, message, extra=fields or None)
     
+    def _fetch_devices(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Download the full device list from the Sauce Labs API.
+
+        Sends If-None-Match / If-Modified-Since when the previous response
+        carried an ETag or Last-Modified header, so an unchanged list costs a
+        304 instead of a full body download and parse.
+
+        Returns:
+            List of device records (the previous list object when the API
+            answered 304 Not Modified) or None if the request failed
+        """
+        headers = {}
+        if self._devices is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        self.poller.before_request()
+        started = time.monotonic()
+        try:
+            response = self.session.get(self.api_url, headers=headers, timeout=10)
+            if response.status_code == 304 and self._devices is not None:
+                self.metrics.record_poll(time.monotonic() - started, "not_modified")
+                return self._devices
+            response.raise_for_status()
+            devices = response.json()
+        except (requests.exceptions.RequestException, CircuitOpenError, ValueError) as e:
+            # An open circuit is a failed poll too: back off instead of crashing the loop
+            self._log(f"Error fetching device status: {e}", logging.ERROR)
+            error_response = getattr(e, "response", None)
+            self.metrics.record_poll(
+                time.monotonic() - started, "error", getattr(error_response, "status_code", None)
+            )
+            self.poller.record_error(
+                status_code=getattr(error_response, "status_code", None),
+                retry_after=self._retry_after(error_response)
+            )
+            return None
+
+        self.metrics.record_poll(time.monotonic() - started, "ok")
+        self._devices = devices
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+        return devices
+
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        """Seconds from a Retry-After header, if the response carries one."""
+        if response is None:
+            return None
+        try:
+            return float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            return None
+
+    def get_device_snapshot(self, force_refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the device-state index for the current poll cycle.
+
+        The device list is fetched at most once per ``snapshot_ttl`` window and
+        indexed by device ID, so every lookup inside the window is served from
+        memory.
+
+        Args:
+            force_refresh: Ignore the TTL and query the API
+
+        Returns:
+            Mapping of device ID to the full device record (state, timestamps
+            and any other fields returned by the API). Empty if the fetch failed.
+        """
+        now = time.monotonic()
+        if (
+            not force_refresh
+            and self._snapshot_time is not None
+            and now - self._snapshot_time < self.snapshot_ttl
+        ):
+            return self._snapshot
+
+        if self.leases is not None:
+            # Served from the list another instance fetched, when fresh enough
+            devices, fetched_at = self.leases.snapshot(
+                f"{self.username}@{self.api_url}", self.snapshot_ttl, self._fetch_devices
+            )
+        else:
+            devices, fetched_at = self._fetch_devices(), time.time()
+        if devices is None:
+            return {}
+
+        if devices is not self._indexed_devices:
+            self._snapshot = {
+                device["id"]: device for device in devices if device.get("id")
+            }
+            self._indexed_devices = devices
+        self._snapshot_time = now
+        self.snapshot_fetched_at = datetime.fromtimestamp(fetched_at)
+        states = {
+            device_id: self._snapshot.get(device_id, {}).get("state")
+            for device_id in self.device_ids
+        }
+        self.poller.record_states(states)
+        self.metrics.record_states(states, fetched_at)
+        return self._snapshot
+
+    def get_device(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a device record in the current snapshot.
+
+        Args:
+            device_id: The device ID to look up
+
+        Returns:
+            Device record or None if not found
+        """
+        return self.get_device_snapshot().get(device_id)
+
     def _get_device_status(self, device_id: str) -> Optional[str]:
         """
-        Fetch the status of a specific device from Sauce Labs API.
+        Fetch the status of a specific device from the current snapshot.
         
         Args:
             device_id: The device ID to check
@@ -65,23 +312,10 @@ class SauceLabsDeviceChecker:
         Returns:
             Device status string or None if not found
         """
-        try:
-            response = requests.get(
-                self.api_url,
-                auth=(self.username, self.access_key),
-                timeout=10
-            )
-            response.raise_for_status()
-            
-            devices = response.json()
-            for device in devices:
-                if device.get("id") == device_id:
-                    return device.get("state")
-            
-            return None
-        except requests.exceptions.RequestException as e:
-            self._log(f"Error fetching device status: {e}")
+        device = self.get_device(device_id)
+        if device is None:
             return None
+        return device.get("state")
     
     def wait_for_devices(self) -> str:
         """
@@ -91,70 +325,245 @@ class SauceLabsDeviceChecker:
             The ID of the available device
         """
         while True:
+            # One API request per cycle; every device is looked up in the index
+            snapshot = self.get_device_snapshot()
             for device_id in self.device_ids:
-                status = self._get_device_status(device_id)
+                device = snapshot.get(device_id)
+                status = device.get("state") if device else None
                 self._log(f"[{device_id}] Status: {status or 'NOT FOUND'}")
                 
-                if status == "AVAILABLE":
+                if status == "AVAILABLE" and self._lease_device(device_id):
                     self._log(f"Device {device_id} is AVAILABLE — proceeding with test run.")
                     self.selected_device_id = device_id
                     return device_id
             
-            self._log(f"Waiting {self.poll_interval} seconds before checking again...")
-            time.sleep(self.poll_interval)
+            interval = self.poller.next_interval()
+            self._log(f"Waiting {interval:.1f} seconds before checking again...")
+            self.poller.sleep(interval)
     
-    def run_test_suite(self, test_script: str) -> bool:
+    def _lease_device(self, device_id: str, script: Optional[str] = None) -> bool:
         """
-        Execute a pytest test script using the configured selected device.
+        Take the lease on an AVAILABLE device before dispatching to it.
+
+        Args:
+            device_id: Device about to be used
+            script: Script about to run, if already known
+
+        Returns:
+            True if this checker may use the device (always without leases)
+        """
+        if self.leases is None:
+            return True
+        seen_at = self.snapshot_fetched_at.timestamp() if self.snapshot_fetched_at else None
+        if self.leases.acquire(device_id, script, seen_at=seen_at):
+            self._lease_notes.pop(device_id, None)
+            return True
+        holder = self.leases.holder(device_id)
+        if holder is not None:
+            note = f"[{device_id}] Leased by {holder.owner}" + (f" ({holder.script})" if holder.script else "")
+        else:
+            note = f"[{device_id}] Released by another checker; waiting for a newer device list"
+        if self._lease_notes.get(device_id) != note:
+            self._log(note)
+            self._lease_notes[device_id] = note
+        return False
+
+    def _release_device(self, device_id: Optional[str], used: bool = True) -> None:
+        """Give a device's lease back (after a run, or unused)."""
+        if self.leases is not None and device_id:
+            self.leases.release(device_id, used)
+
+    def _lease_lost(self, device_id: str) -> None:
+        self._log(
+            f"Lease on {device_id} expired and was taken by another checker; its run may collide",
+            logging.WARNING, device_id=device_id
+        )
+
+    def _pytest_args(self, test_script: str, result_log: Optional[str] = None) -> List[str]:
+        """Build the pytest arguments for a single script."""
+        args = ["-q", "--log-cli-level=DEBUG", "-s"]
+        if result_log:
+            args += ["-p", "result_plugin", "--result-log", result_log]
+        return [*args, test_script]
+
+    def _pytest_command(self, test_script: str, result_log: Optional[str] = None) -> List[str]:
+        """Build the pytest command line for a single script."""
+        return [sys.executable, "-m", "pytest", *self._pytest_args(test_script, result_log)]
+
+    def _run_log_path(self, test_script: str, device_id: Optional[str]) -> Optional[str]:
+        """Log file for a new run's output, or None to inherit stdout."""
+        return run_log_path(self.run_log_dir, test_script, device_id) if self.run_log_dir else None
+
+    def _test_env(self, device_id: Optional[str]) -> Dict[str, str]:
+        """Build the environment for a pytest run on the given device."""
+        env = os.environ.copy()
+        if device_id:
+            env["SELECTED_DEVICE_ID"] = device_id
+        # Make result_plugin importable wherever the run starts
+        plugin_dir = os.path.dirname(os.path.abspath(__file__))
+        env["PYTHONPATH"] = os.pathsep.join(
+            path for path in (plugin_dir, env.get("PYTHONPATH")) if path
+        )
+        return env
+
+    def _finish_run(
+        self,
+        test_script: str,
+        device_id: Optional[str],
+        started_at: float,
+        duration: float,
+        exit_code: int,
+        queue_wait: float,
+        result_log: Optional[str] = None,
+        log_path: Optional[str] = None
+    ) -> RunResult:
+        """
+        Collect the results of a finished run.
+
+        Reads the per-test records written by result_plugin, adds the run to
+        the summary (and the summary file), and records it in the history store.
+
+        Returns:
+            The structured result of the run
+        """
+        tests = read_result_log(result_log) if result_log else []
+        result = RunResult(
+            script=test_script,
+            device_id=device_id,
+            exit_code=exit_code,
+            started_at=started_at,
+            duration=round(duration, 3),
+            queue_wait=round(queue_wait, 3),
+            tests=tests,
+            log_path=log_path,
+        )
+        self.last_result = result
+        self.summary.add(result)
+        self._log(
+            f"Results for {test_script}: {result.describe()}",
+            script=test_script, device_id=device_id, exit_code=exit_code,
+            duration=result.duration, outcomes=result.outcomes, run_log=log_path
+        )
+        self.metrics.run_finished(device_id, test_script, "passed" if exit_code == 0 else "failed", duration)
+        if exit_code != 0 and log_path:
+            self._log(
+                f"Last output of {test_script} ({log_path}):\n{tail(log_path)}",
+                logging.WARNING, script=test_script, device_id=device_id, run_log=log_path
+            )
+
+        if self.summary_json:
+            try:
+                self.summary.write_json(self.summary_json)
+            except OSError as e:
+                self._log(f"Error writing results summary: {e}", logging.ERROR)
+
+        if self.history is not None:
+            try:
+                self.history.record(
+                    test_script, device_id, duration, exit_code,
+                    queue_wait=queue_wait, started_at=started_at
+                )
+            except Exception as e:
+                self._log(f"Error recording run history: {e}", logging.ERROR)
+        return result
+
+    def run_test_suite(
+        self,
+        test_script: str,
+        device_id: Optional[str] = None,
+        queue_wait: float = 0.0
+    ) -> bool:
+        """
+        Execute a pytest test script on a device.
+
+        The structured result of the run is available as ``last_result`` and
+        is added to ``summary``.
 
         Args:
             test_script: Path to the pytest script to execute
+            device_id: Device to run on (defaults to the selected device)
+            queue_wait: Seconds the script waited for a device (for the history)
 
         Returns:
             True if successful, False otherwise
         """
+        device_id = device_id or self.selected_device_id
         try:
-            env = os.environ.copy()
-            if self.selected_device_id:
-                env["SELECTED_DEVICE_ID"] = self.selected_device_id
-
             self._log(f"Executing pytest script: {test_script}")
+            self.metrics.run_started(device_id, test_script, queue_wait)
+            result_log = new_result_log()
+            log_path = self._run_log_path(test_script, device_id)
+            started_at = time.time()
+            started = time.monotonic()
             # Run pytest quietly for the single script
-            result = subprocess.run([
-                sys.executable, "-m", "pytest", "-q", "--log-cli-level=DEBUG", "-s", test_script
-            ], env=env, check=False)
+            returncode = self.runner.run(
+                self._pytest_args(test_script, result_log), self._test_env(device_id), log_path=log_path
+            )
+            self._finish_run(
+                test_script, device_id, started_at, time.monotonic() - started,
+                returncode, queue_wait, result_log, log_path
+            )
 
-            if result.returncode == 0:
+            if returncode == 0:
                 self._log(f"Pytest {test_script} completed successfully")
                 return True
             else:
-                self._log(f"Pytest {test_script} failed with exit code {result.returncode}")
+                self._log(f"Pytest {test_script} failed with exit code {returncode}", logging.WARNING)
                 return False
         except FileNotFoundError:
-            self._log("Error: pytest not found in the current Python environment.")
+            self._log("Error: pytest not found in the current Python environment.", logging.ERROR)
+            self.metrics.run_finished(device_id, test_script, "error")
             return False
         except Exception as e:
-            self._log(f"Error executing pytest: {e}")
+            self._log(f"Error executing pytest: {e}", logging.ERROR)
+            self.metrics.run_finished(device_id, test_script, "error")
             return False
-    
-    def start_service(self, test_scripts: Optional[List[str]] = None) -> None:
-        """
-        Start the device monitoring service and execute pytest when devices are available.
 
-        Args:
-            test_scripts: List of pytest script paths to run when a device becomes available
-        """
+    @staticmethod
+    def _normalize_scripts(test_scripts: Optional[List[str]]) -> List[str]:
+        """Normalize the test script argument to a list."""
+        if test_scripts is None:
+            return ["test_features.py"]
+        if isinstance(test_scripts, str):
+            return [test_scripts]
+        return list(test_scripts)
+
+    def _log_startup(self) -> None:
+        """Log the service configuration banner."""
         self._log("=" * 50)
         self._log("Device Availability Checker Service Started")
         self._log("=" * 50)
         self._log(f"Monitoring devices: {', '.join(self.device_ids)}")
-        self._log(f"Poll interval: {self.poll_interval} seconds")
+        self._log(
+            f"Poll interval: {self.poll_interval} seconds "
+            f"(adaptive {self.poller.min_interval:g}-{self.poller.max_interval:g}s)"
+        )
+        self._log(f"Snapshot TTL: {self.snapshot_ttl} seconds")
+        self._log(f"Pytest runner: {self.runner.mode}")
+        if self.leases is not None:
+            self._log(f"Device leases: {self.leases.path} (TTL {self.leases.ttl:g}s, owner {self.leases.owner})")
         if self.max_runs:
             self._log(f"Max runs: {self.max_runs}")
         else:
             self._log("Running indefinitely (Ctrl+C to stop)")
         self._log("=" * 50)
         self._log("")
+
+    def _log_stopped(self) -> None:
+        """Log the Ctrl+C shutdown banner."""
+        self._log("")
+        self._log("=" * 50)
+        self._log("Service stopped by user (Ctrl+C)")
+        self._log("=" * 50)
+    
+    def start_service(self, test_scripts: Optional[List[str]] = None) -> None:
+        """
+        Start the device monitoring service and execute pytest when devices are available.
+
+        Args:
+            test_scripts: List of pytest script paths to run when a device becomes available
+        """
+        self._log_startup()
         
         run_count = 0
         
@@ -165,36 +574,123 @@ class SauceLabsDeviceChecker:
                 if self.max_runs and run_count > self.max_runs:
                     self._log(f"Reached maximum runs ({self.max_runs}). Stopping service.")
                     break
+                self.metrics.set_run_count(run_count)
                 
                 self._log("=" * 50)
                 self._log(f"Run number {run_count}")
                 self._log("=" * 50)
                 
                 # Normalize input to a list (done once per run loop)
-                if test_scripts is None:
-                    scripts = ["test_features.py"]
-                elif isinstance(test_scripts, str):
-                    scripts = [test_scripts]
-                else:
-                    scripts = list(test_scripts)
+                scripts = self._normalize_scripts(test_scripts)
 
                 # For each script, check device availability and then run the test.
                 # This ensures we re-check devices between tests.
                 for script in scripts:
-                    self.wait_for_devices()
-                    self.run_test_suite(script)
+                    wait_started = time.monotonic()
+                    device_id = self.wait_for_devices()
+                    try:
+                        self.run_test_suite(
+                            script, device_id, queue_wait=time.monotonic() - wait_started
+                        )
+                    finally:
+                        self._release_device(device_id)
                 
                 self._log("")
         
         except KeyboardInterrupt:
-            self._log("")
-            self._log("=" * 50)
-            self._log("Service stopped by user (Ctrl+C)")
-            self._log("=" * 50)
+            self._log_stopped()
+            sys.exit(0)
+        except Exception as e:
+            self._log(f"Unexpected error in service: {e}", logging.ERROR)
+            sys.exit(1)
+        finally:
+            self.close()
+
+    def start_async_service(
+        self,
+        test_scripts: Optional[List[str]] = None,
+        concurrency: Optional[int] = None,
+        scheduler=None
+    ) -> None:
+        """
+        Start the service in asyncio mode, running one pytest per available device.
+
+        A watcher task streams AVAILABLE devices into a queue and a pool of
+        workers claims each one and launches its own pytest run, so several
+        devices are kept busy at once.
+
+        Args:
+            test_scripts: List of pytest script paths, dispatched round-robin
+            concurrency: Maximum simultaneous runs (default: number of devices)
+            scheduler: Optional scheduler.Scheduler holding the job batch; when
+                given it replaces test_scripts and the service stops once the
+                batch is done
+        """
+        from async_dispatcher import AsyncDeviceDispatcher
+
+        self._log_startup()
+        dispatcher = AsyncDeviceDispatcher(
+            self, self._normalize_scripts(test_scripts), concurrency=concurrency,
+            scheduler=scheduler
+        )
+        self._log(f"Async mode: up to {dispatcher.concurrency} concurrent runs")
+        if scheduler is not None:
+            self._log(f"Scheduling {len(scheduler.pending)} jobs")
+
+        try:
+            asyncio.run(dispatcher.run())
+        except KeyboardInterrupt:
+            self._log_stopped()
             sys.exit(0)
         except Exception as e:
-            self._log(f"Unexpected error in service: {e}")
+            self._log(f"Unexpected error in service: {e}", logging.ERROR)
             sys.exit(1)
+        finally:
+            self.close()
+
+
+def print_batch_plan(
+    history,
+    test_scripts: List[str],
+    device_ids: List[str],
+    quantile: float = 50,
+    deadline: Optional[float] = None
+) -> None:
+    """
+    Print a longest-processing-time-first plan for a batch of scripts.
+
+    The plan is advisory: start_service() does not follow it, it hands each
+    script to the next device that becomes available.
+
+    Args:
+        history: run_history.RunHistory with past durations
+        test_scripts: Scripts in the batch
+        device_ids: Devices the batch may use
+        quantile: Duration percentile used as the expected runtime
+        deadline: Optional batch deadline in seconds
+    """
+    from run_history import HistoryEstimator, devices_needed, plan_batch
+
+    estimator = HistoryEstimator(history, quantile=quantile)
+    for script in dict.fromkeys(test_scripts):
+        prediction = history.predict(script)
+        if prediction:
+            percentiles = ", ".join(f"{name}={value:.1f}s" for name, value in prediction.items())
+        else:
+            percentiles = f"no history (assuming {estimator.default:.0f}s)"
+        print(f"{script}: {percentiles}")
+
+    plan = plan_batch(test_scripts, device_ids, estimator.estimate)
+    for device_id, scripts in plan.assignments.items():
+        print(f"{device_id}: {', '.join(scripts) or '-'} ({plan.loads[device_id]:.1f}s)")
+    print(f"Expected makespan: {plan.makespan:.1f}s")
+
+    if deadline is not None:
+        needed = devices_needed(test_scripts, deadline, estimator.estimate)
+        if needed is None:
+            print(f"No pool size finishes the batch within {deadline:.0f}s")
+        else:
+            print(f"Devices needed to finish within {deadline:.0f}s: {needed}")
 
 
 def main():
@@ -227,6 +723,37 @@ def main():
         default="https://api.eu-central-1.saucelabs.com/v1/rdc/device-management/devices",
         help="Sauce Labs device management API URL"
     )
+    parser.add_argument(
+        "--snapshot-ttl",
+        type=float,
+        default=None,
+        help="Seconds a fetched device list is reused (default: half the poll interval, "
+             "at most the minimum poll interval)"
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=4,
+        help="Keep-alive connections kept open to the device API (default: 4)"
+    )
+    parser.add_argument(
+        "--min-poll-interval",
+        type=float,
+        default=None,
+        help="Poll interval right after a device changes state (default: poll interval / 5)"
+    )
+    parser.add_argument(
+        "--max-poll-interval",
+        type=float,
+        default=None,
+        help="Longest poll interval while every device is busy (default: poll interval * 6)"
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=60,
+        help="API requests per minute shared by all checkers on this host (0 disables; default: 60)"
+    )
     # Use --test-script to specify pytest script
     parser.add_argument(
         "--test-script",
@@ -234,17 +761,200 @@ def main():
         default=["test_features.py"],
         help="One or more pytest scripts to execute when a device becomes available"
     )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Run one pytest per available device concurrently (asyncio mode)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Maximum concurrent runs in asyncio mode (default: number of devices; implies --async)"
+    )
+    parser.add_argument(
+        "--runner",
+        choices=RUNNER_MODES,
+        default="subprocess",
+        help="How pytest runs are executed: fresh subprocess (default), in-process, or warm worker pool"
+    )
+    parser.add_argument(
+        "--warm-workers",
+        type=int,
+        default=2,
+        help="Worker processes for --runner warm (default: 2)"
+    )
+    parser.add_argument(
+        "--jobs",
+        default=None,
+        help="JSON job file for the scheduler (scripts, capabilities, priorities; implies --async)"
+    )
+    parser.add_argument(
+        "--history-db",
+        default=None,
+        help="SQLite file that records every run and feeds duration predictions"
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Print a longest-first plan of --test-script over --devices from the history and exit "
+             "(advisory: the service still hands each script to the next free device)"
+    )
+    parser.add_argument(
+        "--plan-deadline",
+        type=float,
+        default=None,
+        help="With --plan, also report how many devices finish the batch within this many seconds"
+    )
+    parser.add_argument(
+        "--plan-percentile",
+        type=float,
+        default=50,
+        help="Duration percentile used for planning and scheduling (default: 50)"
+    )
+    parser.add_argument(
+        "--summary-json",
+        default=None,
+        help="JSON file rewritten after every run with totals per outcome and script; "
+             "per-test results are appended to <name>.runs.jsonl"
+    )
+    parser.add_argument(
+        "--log-file",
+        default=None,
+        help="Service log written as JSON lines, in addition to the console"
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=LOG_FORMATS,
+        default="text",
+        help="Console log format: timestamped text (default) or JSON lines"
+    )
+    parser.add_argument(
+        "--log-max-bytes",
+        type=int,
+        default=LOG_MAX_BYTES,
+        help="Rotate the service log at this size (0 disables; default: 10 MiB)"
+    )
+    parser.add_argument(
+        "--log-backups",
+        type=int,
+        default=LOG_BACKUPS,
+        help="Rotated service logs kept (default: 5)"
+    )
+    parser.add_argument(
+        "--log-rotate-hours",
+        type=float,
+        default=None,
+        help="Also rotate the service log after this many hours"
+    )
+    parser.add_argument(
+        "--run-log-dir",
+        default="run_logs",
+        help="Directory with one log file per pytest run (default: run_logs; "
+             "empty string lets runs write to the service's stdout)"
+    )
+    parser.add_argument(
+        "--run-log-max-bytes",
+        type=int,
+        default=RUN_LOG_MAX_BYTES,
+        help="Rotate a run's log file at this size (default: 20 MiB)"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics on http://HOST:PORT/metrics (default: off)"
+    )
+    parser.add_argument(
+        "--metrics-host",
+        default="127.0.0.1",
+        help="Interface of the metrics endpoint (default: 127.0.0.1; 0.0.0.0 for remote scrapers)"
+    )
+    parser.add_argument(
+        "--lease-db",
+        default=None,
+        help="With --leases, SQLite file of device leases and the shared device list "
+             "(default: one file per host in the temp directory)"
+    )
+    parser.add_argument(
+        "--lease-ttl",
+        type=float,
+        default=DEFAULT_LEASE_TTL,
+        help="With --leases, seconds a device lease lasts without a heartbeat (default: 60)"
+    )
+    parser.add_argument(
+        "--leases",
+        action="store_true",
+        help="Coordinate devices and polls with the other checkers on this host through "
+             "device leases in --lease-db (default: off, each checker works alone)"
+    )
     
     args = parser.parse_args()
+    setup_logging(
+        args.log_file,
+        max_bytes=args.log_max_bytes,
+        backups=args.log_backups,
+        max_age=args.log_rotate_hours * 3600 if args.log_rotate_hours else None,
+        console_format=args.log_format,
+    )
+
+    history = None
+    if args.history_db or args.plan:
+        from run_history import RunHistory
+
+        history = RunHistory(args.history_db or "run_history.db")
+
+    if args.plan:
+        print_batch_plan(history, args.test_script, args.devices, args.plan_percentile, args.plan_deadline)
+        history.close()
+        return
     
     try:
         checker = SauceLabsDeviceChecker(
             device_ids=args.devices,
             api_url=args.api_url,
             poll_interval=args.poll_interval,
-            max_runs=args.max_runs
+            max_runs=args.max_runs,
+            snapshot_ttl=args.snapshot_ttl,
+            pool_size=args.pool_size,
+            history=history,
+            min_poll_interval=args.min_poll_interval,
+            max_poll_interval=args.max_poll_interval,
+            rate_limit=args.rate_limit,
+            runner=args.runner,
+            warm_workers=args.warm_workers,
+            summary_json=args.summary_json,
+            run_log_dir=args.run_log_dir or None,
+            run_log_max_bytes=args.run_log_max_bytes,
+            leases=LeaseManager(args.lease_db, ttl=args.lease_ttl) if args.leases else None
         )
-        checker.start_service(test_scripts=args.test_script)
+        if args.metrics_port is not None:
+            try:
+                metrics_server = MetricsServer(checker.metrics, args.metrics_port, args.metrics_host).start()
+            except OSError as e:
+                checker.close()
+                print(f"Error: cannot serve metrics on {args.metrics_host}:{args.metrics_port}: {e}", file=sys.stderr)
+                sys.exit(1)
+            checker._log(f"Metrics endpoint: {metrics_server.url}")
+        if args.jobs:
+            from scheduler import Scheduler, load_jobs
+
+            estimator = None
+            if history is not None:
+                from run_history import HistoryEstimator
+
+                estimator = HistoryEstimator(history, quantile=args.plan_percentile)
+            checker.start_async_service(
+                concurrency=args.concurrency,
+                scheduler=Scheduler(load_jobs(args.jobs), estimator=estimator)
+            )
+        elif args.use_async or args.concurrency:
+            checker.start_async_service(
+                test_scripts=args.test_script, concurrency=args.concurrency
+            )
+        else:
+            checker.start_service(test_scripts=args.test_script)
     except ValueError as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
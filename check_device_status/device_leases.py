@@ -0,0 +1,309 @@
+"""
+Cross-process device leases for the device checker service.
+
+Several checker instances on one host (one per app team) watch the same
+devices. Before dispatching a run to a device, a checker takes a lease on it
+in a SQLite file shared by every instance. A lease expires after a TTL unless
+its holder renews it, which a heartbeat thread does every third of the TTL
+while the run goes on, so a crashed checker frees its devices within one
+TTL. A released device is not leased again on a device list fetched before
+the release, since that list still shows it AVAILABLE.
+
+The same file holds the last device list fetched from the API. While it is
+younger than the snapshot TTL every instance reads it instead of polling,
+and only one instance at a time refreshes it, so N checkers cost one API
+poll per cycle instead of N.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    device_id TEXT PRIMARY KEY,
+    owner TEXT,
+    script TEXT,
+    acquired_at REAL,
+    expires_at REAL NOT NULL DEFAULT 0,
+    released_at REAL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    key TEXT PRIMARY KEY,
+    devices TEXT,
+    fetched_at REAL NOT NULL DEFAULT 0,
+    refresh_owner TEXT,
+    refresh_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+DEFAULT_TTL = 60.0
+# Seconds other instances wait for a refresh before polling themselves
+REFRESH_TIMEOUT = 30.0
+
+
+def default_lease_path() -> str:
+    """Lease file shared by every checker on the host."""
+    return os.path.join(tempfile.gettempdir(), "sauce-device-checker-leases.sqlite")
+
+
+@dataclass
+class Lease:
+    """A device held by one checker instance."""
+
+    device_id: str
+    owner: str
+    script: Optional[str]
+    acquired_at: float
+    expires_at: float
+
+
+class LeaseManager:
+    """Device leases and the shared device list of one checker instance."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = DEFAULT_TTL,
+        owner: Optional[str] = None,
+        on_lost: Optional[Callable[[str], None]] = None
+    ):
+        """
+        Open (or create) the lease file.
+
+        Args:
+            path: SQLite file shared by the instances (default: host-wide file
+                in the temp directory)
+            ttl: Seconds a lease lasts without a heartbeat
+            owner: Name of this instance (default: host, pid and a random tag)
+            on_lost: Called with the device ID when a heartbeat finds that a
+                lease expired and was taken by another instance
+        """
+        self.path = path or default_lease_path()
+        self.ttl = ttl
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.on_lost = on_lost
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._held: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        # Last shared device list decoded: (fetched_at, devices)
+        self._snapshot: Tuple[Optional[float], Optional[List[Dict[str, Any]]]] = (None, None)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front, so a read followed by
+        # a write is atomic across processes
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def acquire(self, device_id: str, script: Optional[str] = None, seen_at: Optional[float] = None) -> bool:
+        """
+        Take the lease on a device.
+
+        Args:
+            device_id: Device to lease
+            script: Script about to run (shown to the other instances)
+            seen_at: When the device list that shows the device AVAILABLE was
+                fetched (epoch seconds); refused if the device was released
+                since then
+
+        Returns:
+            True if this instance now holds the lease (also when it already did)
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT owner, expires_at, released_at FROM leases WHERE device_id = ?", (device_id,)
+            ).fetchone()
+            released_at = None
+            if row is not None:
+                owner, expires_at, released_at = row
+                if owner and owner != self.owner and expires_at > now:
+                    return False
+                if owner != self.owner and released_at and seen_at is not None and seen_at <= released_at:
+                    return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (device_id, owner, script, acquired_at, expires_at, released_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (device_id, self.owner, script, now, now + self.ttl, released_at),
+            )
+            self._held[device_id] = now
+        self._start_heartbeat()
+        return True
+
+    def release(self, device_id: str, used: bool = True) -> None:
+        """
+        Give a device back.
+
+        Args:
+            device_id: Leased device
+            used: A run went to the device, so the instances lease it again
+                only on a device list fetched after now; False when it was
+                leased but never dispatched to
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE leases SET owner = NULL, script = NULL, expires_at = 0, "
+                "released_at = CASE WHEN ? THEN ? ELSE released_at END "
+                "WHERE device_id = ? AND owner = ?",
+                (used, time.time(), device_id, self.owner),
+            )
+            self._held.pop(device_id, None)
+
+    def renew(self) -> List[str]:
+        """
+        Extend every lease this instance holds by one TTL.
+
+        Returns:
+            Devices whose lease had expired and been taken by another instance
+        """
+        lost = []
+        with self._transaction() as conn:
+            expires_at = time.time() + self.ttl
+            for device_id in list(self._held):
+                cursor = conn.execute(
+                    "UPDATE leases SET expires_at = ? WHERE device_id = ? AND owner = ?",
+                    (expires_at, device_id, self.owner),
+                )
+                if cursor.rowcount == 0:
+                    lost.append(device_id)
+                    del self._held[device_id]
+        return lost
+
+    def holder(self, device_id: str) -> Optional[Lease]:
+        """The unexpired lease on a device, if any instance holds one."""
+        leases = self.leases(device_id)
+        return leases[0] if leases else None
+
+    def leases(self, device_id: Optional[str] = None) -> List[Lease]:
+        """Unexpired leases of every instance (or of one device)."""
+        query = (
+            "SELECT device_id, owner, script, acquired_at, expires_at FROM leases "
+            "WHERE owner IS NOT NULL AND expires_at > ?"
+        )
+        params: List[Any] = [time.time()]
+        if device_id is not None:
+            query += " AND device_id = ?"
+            params.append(device_id)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY device_id", params).fetchall()
+        return [Lease(*row) for row in rows]
+
+    def snapshot(
+        self,
+        key: str,
+        max_age: float,
+        fetch: Callable[[], Optional[List[Dict[str, Any]]]]
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[float]]:
+        """
+        Device list shared by the instances polling the same API and account.
+
+        The stored list is returned while it is younger than ``max_age``. Once
+        it is older, one instance claims the refresh and calls ``fetch``; the
+        others keep using the stored list until the new one is published.
+
+        Args:
+            key: Identifies the API URL and account
+            max_age: Seconds a stored list is used without polling
+            fetch: Polls the API; returns the device list or None on failure
+
+        Returns:
+            (devices, epoch seconds when they were fetched), or (None, None)
+            when the poll failed and no list is stored
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT fetched_at, refresh_owner, refresh_until FROM snapshots WHERE key = ?", (key,)
+            ).fetchone()
+            refresh = row is None or (now - row[0] >= max_age and (row[2] <= now or row[1] == self.owner))
+            if refresh:
+                conn.execute("INSERT OR IGNORE INTO snapshots (key) VALUES (?)", (key,))
+                conn.execute(
+                    "UPDATE snapshots SET refresh_owner = ?, refresh_until = ? WHERE key = ?",
+                    (self.owner, now + REFRESH_TIMEOUT, key),
+                )
+        if not refresh:
+            return self._read_snapshot(key)
+
+        # The poll may reflect any release up to the moment it is sent
+        fetched_at = time.time()
+        devices = None
+        try:
+            devices = fetch()
+        finally:
+            with self._transaction() as conn:
+                if devices is not None:
+                    conn.execute(
+                        "UPDATE snapshots SET devices = ?, fetched_at = ?, refresh_owner = NULL, refresh_until = 0 "
+                        "WHERE key = ?",
+                        (json.dumps(devices), fetched_at, key),
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE snapshots SET refresh_owner = NULL, refresh_until = 0 "
+                        "WHERE key = ? AND refresh_owner = ?",
+                        (key, self.owner),
+                    )
+        if devices is None:
+            return None, None
+        self._snapshot = (fetched_at, devices)
+        return devices, fetched_at
+
+    def _read_snapshot(self, key: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT devices, fetched_at FROM snapshots WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] is None:
+            return None, None
+        if row[1] != self._snapshot[0]:
+            # Decode only when another instance published a newer list
+            self._snapshot = (row[1], json.loads(row[0]))
+        return self._snapshot[1], self._snapshot[0]
+
+    def _start_heartbeat(self) -> None:
+        with self._lock:
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._stop.clear()
+                self._heartbeat = threading.Thread(target=self._beat, name="lease-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            if not self._held:
+                continue
+            try:
+                lost = self.renew()
+            except sqlite3.Error:
+                # Lock contention; the next beat is still well inside the TTL
+                continue
+            for device_id in lost:
+                if self.on_lost is not None:
+                    self.on_lost(device_id)
+
+    def close(self) -> None:
+        """Stop the heartbeat, release every held lease and close the file."""
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        for device_id in list(self._held):
+            self.release(device_id)
+        with self._lock:
+            self._conn.close()
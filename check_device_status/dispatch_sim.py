@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Discrete-event simulator of the service's dispatch policies.
+
+Replays the dispatch loop on a virtual clock, with the device API and pytest
+replaced by recorded distributions, so thousands of simulated hours take
+seconds. Run durations per script and device come from a service log (parsed
+with log_index) or a run history database. Device recovery times come from
+the status lines of a service log: the time from the end of a run until the
+device shows AVAILABLE again, cleaning and other users included. As in the
+service, devices are only seen at polls, and a finished run triggers a poll
+right away.
+
+Policies:
+
+- ``sequential``: the ``start_service`` loop, one run at a time on the first
+  AVAILABLE device, scripts in order
+- ``async``: AsyncDeviceDispatcher, one run per free device, scripts in order
+- ``shortest-first``: the job Scheduler (shortest expected duration first,
+  least contended device), with recorded medians as estimates
+- ``longest-first``: the Scheduler ordered longest expected duration first
+
+Every policy sees the same jobs and the same per-job duration quantiles, so
+differences come from the policy rather than from sampling.
+
+    python dispatch_sim.py --log testrunner_log.txt --runs 50
+    python dispatch_sim.py --log testrunner_log.txt --hours 2000 --arrivals-per-hour 20 --devices A B C
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import mmap
+import os
+import random
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from log_index import TEXT_LINE, LogParser, iter_lines
+from run_history import RunHistory, percentile
+from scheduler import Job, Scheduler
+
+POLICIES = ("sequential", "async", "shortest-first", "longest-first")
+
+STATUS_MESSAGE = re.compile(r"^\[(\S+)\] Status: (\S+)")
+
+# (arrival time, script, quantile of the run's duration)
+JobSpec = Tuple[float, str, float]
+
+
+@dataclass
+class RecordedData:
+    """Run durations and device recovery times observed in the past."""
+
+    durations: Dict[Tuple[str, Optional[str]], List[float]] = field(default_factory=dict)
+    recoveries: Dict[str, List[float]] = field(default_factory=dict)
+    default_duration: float = 60.0
+    default_recovery: float = 0.0
+
+    def add_run(self, script: str, device_id: Optional[str], duration: float) -> None:
+        """Record one run, under its device and under the script as a whole."""
+        self.durations.setdefault((script, device_id), []).append(duration)
+        if device_id is not None:
+            self.durations.setdefault((script, None), []).append(duration)
+
+    def scripts(self) -> List[str]:
+        """Scripts with recorded runs."""
+        return sorted({script for script, _ in self.durations})
+
+    def devices(self) -> List[str]:
+        """Devices with recorded runs or recoveries."""
+        return sorted({device for _, device in self.durations if device} | set(self.recoveries))
+
+    def duration(self, script: str, device_id: str, quantile: float) -> float:
+        """
+        Duration of a run at a quantile of the recorded distribution.
+
+        Falls back to the script on every device, then to every script, then
+        to ``default_duration``.
+        """
+        values = (
+            self.durations.get((script, device_id))
+            or self.durations.get((script, None))
+            or [value for (_, device), values in self.durations.items() if device is None for value in values]
+        )
+        return percentile(values, quantile * 100) if values else self.default_duration
+
+    def recovery(self, device_id: str, rng: random.Random) -> float:
+        """Random recovery time of a device after a run (pooled over devices if it has none)."""
+        values = self.recoveries.get(device_id) or [value for values in self.recoveries.values() for value in values]
+        return rng.choice(values) if values else self.default_recovery
+
+    def estimate(self, script: str, device_id: Optional[str] = None) -> float:
+        """Median recorded duration (a Scheduler estimator)."""
+        return self.duration(script, device_id, 0.5)
+
+    def record(self, script: str, device_id: Optional[str], duration: float) -> None:
+        """No-op: simulated runs do not change the recorded distributions."""
+
+
+def load_log(path: str, data: Optional[RecordedData] = None) -> RecordedData:
+    """
+    Read run durations and device recovery times from a service log.
+
+    Args:
+        path: Service log (text console output or JSON lines)
+        data: Distributions to add to (default: new ones)
+
+    Returns:
+        The distributions
+    """
+    data = data or RecordedData()
+    if not os.path.getsize(path):
+        return data
+    parser = LogParser()
+    # Device -> end of the last run on it, until it shows AVAILABLE again
+    released: Dict[str, float] = {}
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for start, end, line in iter_lines(mapped, 0, len(mapped)):
+            for kind, run in parser.feed(start, end, line):
+                if kind == "run" and run.outcome != "interrupted":
+                    data.add_run(run.script, run.device_id, run.duration)
+                    if run.device_id:
+                        released[run.device_id] = run.started_at + run.duration
+            if b"] Status: " not in line:
+                continue
+            status = _parse_status(line)
+            if status is not None and status[1] == "AVAILABLE" and status[0] in released:
+                device_id, _, seen_at = status
+                data.recoveries.setdefault(device_id, []).append(max(0.0, seen_at - released.pop(device_id)))
+    return data
+
+
+def _parse_status(line: bytes) -> Optional[Tuple[str, str, float]]:
+    """(device, state, epoch seconds) of a ``[device] Status: STATE`` line."""
+    match = TEXT_LINE.match(line)
+    if match:
+        message = match.group(2).decode("utf-8", "replace")
+        seen_at = time.mktime(time.strptime(match.group(1).decode(), "%Y-%m-%d %H:%M:%S"))
+    else:
+        try:
+            entry = json.loads(line)
+            message = str(entry["message"])
+            seen_at = datetime.fromisoformat(entry["time"]).timestamp()
+        except (ValueError, KeyError, TypeError):
+            return None
+    status = STATUS_MESSAGE.match(message)
+    return (status.group(1), status.group(2), seen_at) if status else None
+
+
+def load_history(path: str, data: Optional[RecordedData] = None) -> RecordedData:
+    """Add the run durations of a run history database to the distributions."""
+    data = data or RecordedData()
+    history = RunHistory(path)
+    try:
+        for row in history.summary():
+            if row["device_id"] is None:
+                continue
+            for duration in history.durations(row["script"], row["device_id"], limit=100000):
+                data.add_run(row["script"], row["device_id"], duration)
+    finally:
+        history.close()
+    return data
+
+
+class FifoPolicy:
+    """Jobs in arrival order on the first free devices (the service's own loops)."""
+
+    def __init__(self):
+        self._pending: Deque[Job] = deque()
+
+    def submit(self, job: Job) -> None:
+        self._pending.append(job)
+
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def assign(self, free: Dict[str, Dict[str, Any]], limit: Optional[int] = None) -> List[Tuple[Job, str]]:
+        devices = list(free)[:limit]
+        return [(self._pending.popleft(), device_id) for device_id in devices[:len(self._pending)]]
+
+    def complete(self, job: Job, device_id: str, duration: float) -> None:
+        pass
+
+
+class LongestFirstScheduler(Scheduler):
+    """Scheduler variant that starts the longest expected job first."""
+
+    def _order_key(self, job: Job) -> Tuple[int, float, float, int]:
+        return (
+            -job.priority,
+            self._usage.get(job.app, 0.0),
+            -self.estimator.estimate(job.script),
+            job.seq,
+        )
+
+
+def make_policy(name: str, data: RecordedData):
+    """Job queue of a policy (Scheduler interface: submit/has_pending/assign/complete)."""
+    if name in ("sequential", "async"):
+        return FifoPolicy()
+    if name == "shortest-first":
+        return Scheduler(estimator=data)
+    if name == "longest-first":
+        return LongestFirstScheduler(estimator=data)
+    raise ValueError(f"Unknown policy {name!r}; choose from {', '.join(POLICIES)}")
+
+
+@dataclass
+class SimResult:
+    """Outcome of one simulated policy."""
+
+    policy: str
+    runs: int
+    makespan: float
+    polls: int
+    busy: Dict[str, float]
+    queue_waits: List[float]
+
+    @property
+    def utilisation(self) -> Dict[str, float]:
+        """Share of the makespan every device spent running jobs."""
+        return {
+            device_id: busy / self.makespan if self.makespan else 0.0
+            for device_id, busy in self.busy.items()
+        }
+
+    @property
+    def mean_utilisation(self) -> float:
+        """Utilisation averaged over the devices."""
+        values = list(self.utilisation.values())
+        return sum(values) / len(values) if values else 0.0
+
+
+def batch_jobs(scripts: Sequence[str], runs: int, seed: int = 0) -> List[JobSpec]:
+    """Every script ``runs`` times, all queued at time 0 (like ``--max-runs``)."""
+    rng = random.Random(seed)
+    return [(0.0, script, rng.random()) for _ in range(runs) for script in scripts]
+
+
+def stream_jobs(scripts: Sequence[str], hours: float, arrivals_per_hour: float, seed: int = 0) -> List[JobSpec]:
+    """Jobs arriving at random (Poisson) over ``hours``, scripts in turn."""
+    rng = random.Random(seed)
+    jobs: List[JobSpec] = []
+    now = 0.0
+    for script in itertools.cycle(scripts):
+        now += rng.expovariate(arrivals_per_hour / 3600.0)
+        if now > hours * 3600:
+            return jobs
+        jobs.append((now, script, rng.random()))
+    return jobs
+
+
+def simulate(
+    policy_name: str,
+    jobs: Sequence[JobSpec],
+    devices: Sequence[str],
+    data: RecordedData,
+    poll_interval: float = 10.0,
+    concurrency: Optional[int] = None,
+    seed: int = 0
+) -> SimResult:
+    """
+    Run one policy over a job list on a virtual clock.
+
+    Args:
+        policy_name: One of POLICIES
+        jobs: (arrival, script, duration quantile) of every job
+        devices: Devices of the pool, in the service's ``--devices`` order;
+            every device starts AVAILABLE
+        data: Recorded durations and recovery times
+        poll_interval: Seconds between device API polls while jobs wait
+        concurrency: Simultaneous runs (default: 1 for sequential, else the
+            number of devices)
+        seed: Seed of the recovery times (same per device for every policy)
+
+    Returns:
+        Makespan, per-device busy time, queue waits and poll count
+    """
+    policy = make_policy(policy_name, data)
+    if concurrency is None:
+        concurrency = 1 if policy_name == "sequential" else len(devices)
+    recovery_rngs = {device_id: random.Random(f"{seed}:{device_id}") for device_id in devices}
+
+    events: List[Tuple[float, int, str, Any]] = []
+    order = itertools.count()
+    for arrival, script, quantile in jobs:
+        heapq.heappush(events, (arrival, next(order), "arrive", (script, quantile)))
+
+    available = {device_id: True for device_id in devices}
+    running: Dict[str, Tuple[Job, float]] = {}
+    busy = {device_id: 0.0 for device_id in devices}
+    quantiles: Dict[int, float] = {}
+    waits: List[float] = []
+    poll_at: Optional[float] = None
+    polls = 0
+    makespan = 0.0
+    phase = random.Random(seed)
+
+    def schedule_poll(at: float) -> None:
+        nonlocal poll_at
+        if poll_at is None or at < poll_at:
+            poll_at = at
+            heapq.heappush(events, (at, next(order), "poll", None))
+
+    while events:
+        now, _, kind, payload = heapq.heappop(events)
+        if kind == "arrive":
+            script, quantile = payload
+            job = Job(script=script, submitted_at=now)
+            quantiles[id(job)] = quantile
+            policy.submit(job)
+            # The service is polling anyway; the next poll comes within one interval
+            schedule_poll(now + phase.uniform(0, poll_interval))
+        elif kind == "finish":
+            device_id = payload
+            job, started = running.pop(device_id)
+            busy[device_id] += now - started
+            makespan = max(makespan, now)
+            policy.complete(job, device_id, now - started)
+            heapq.heappush(
+                events, (now + data.recovery(device_id, recovery_rngs[device_id]), next(order), "recovered", device_id)
+            )
+            if policy.has_pending():
+                # A finished run is followed by a poll right away
+                schedule_poll(now)
+        elif kind == "recovered":
+            available[payload] = True
+        elif kind == "poll":
+            if now != poll_at:
+                continue  # superseded by an earlier poll
+            poll_at = None
+            polls += 1
+            free = {
+                device_id: {"id": device_id} for device_id in devices
+                if available[device_id] and device_id not in running
+            }
+            capacity = concurrency - len(running)
+            if free and capacity > 0:
+                for job, device_id in policy.assign(free, capacity):
+                    available[device_id] = False
+                    running[device_id] = (job, now)
+                    waits.append(now - job.submitted_at)
+                    duration = data.duration(job.script, device_id, quantiles.pop(id(job)))
+                    heapq.heappush(events, (now + duration, next(order), "finish", device_id))
+            if policy.has_pending():
+                schedule_poll(now + poll_interval)
+
+    return SimResult(
+        policy=policy_name, runs=len(waits), makespan=makespan, polls=polls, busy=busy, queue_waits=waits
+    )
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    if seconds >= 60:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds:.1f}s"
+
+
+def print_results(results: List[SimResult], per_device: bool = False) -> None:
+    """Print one line per policy (and optionally per device)."""
+    print(
+        f"{'policy':<16}{'runs':>7}{'makespan':>10}{'util':>7}"
+        f"{'wait mean':>11}{'p50':>9}{'p95':>9}{'max':>9}{'polls':>9}"
+    )
+    for result in results:
+        waits = result.queue_waits
+        mean = sum(waits) / len(waits) if waits else None
+        print(
+            f"{result.policy:<16}{result.runs:>7}{_format_seconds(result.makespan):>10}"
+            f"{result.mean_utilisation:>6.0%} {_format_seconds(mean):>10}"
+            f"{_format_seconds(percentile(waits, 50)):>9}{_format_seconds(percentile(waits, 95)):>9}"
+            f"{_format_seconds(max(waits, default=None)):>9}{result.polls:>9}"
+        )
+        if per_device:
+            for device_id, share in result.utilisation.items():
+                print(f"  {device_id:<30} {share:>6.0%}  busy {_format_seconds(result.busy[device_id])}")
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Compare dispatch policies on a virtual clock")
+    parser.add_argument("--log", action="append", default=[], help="Service log with past runs (repeatable)")
+    parser.add_argument("--history-db", default=None, help="Run history database with past durations")
+    parser.add_argument("--devices", nargs="+", default=None, help="Device pool (default: devices in the data)")
+    parser.add_argument("--scripts", nargs="+", default=None, help="Scripts to run (default: scripts in the data)")
+    parser.add_argument("--runs", type=int, default=20, help="Batch mode: runs of every script queued at once (default: 20)")
+    parser.add_argument("--hours", type=float, default=None, help="Stream mode: simulated hours of arriving jobs")
+    parser.add_argument("--arrivals-per-hour", type=float, default=10, help="Stream mode: job arrival rate (default: 10)")
+    parser.add_argument(
+        "--policies", nargs="+", choices=POLICIES, default=list(POLICIES), help="Policies to compare (default: all)"
+    )
+    parser.add_argument("--poll-interval", type=float, default=10, help="Seconds between polls (default: 10)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Simultaneous runs of the concurrent policies")
+    parser.add_argument("--default-duration", type=float, default=60, help="Run duration without data (default: 60)")
+    parser.add_argument("--default-recovery", type=float, default=0, help="Recovery time without data (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--per-device", action="store_true", help="Also print every device's utilisation")
+    args = parser.parse_args()
+
+    data = RecordedData(default_duration=args.default_duration, default_recovery=args.default_recovery)
+    for path in args.log:
+        load_log(path, data)
+    if args.history_db:
+        load_history(args.history_db, data)
+    devices = args.devices or data.devices()
+    scripts = args.scripts or data.scripts()
+    if not devices or not scripts:
+        parser.error("No devices or scripts: pass --log/--history-db with past runs, or --devices and --scripts")
+
+    if args.hours:
+        jobs = stream_jobs(scripts, args.hours, args.arrivals_per_hour, args.seed)
+        print(f"{len(jobs)} jobs arriving over {args.hours:g}h on {len(devices)} devices")
+    else:
+        jobs = batch_jobs(scripts, args.runs, args.seed)
+        print(f"{len(jobs)} jobs queued at once on {len(devices)} devices")
+    for script in scripts:
+        samples = len(data.durations.get((script, None), []))
+        print(f"  {script}: median {_format_seconds(data.estimate(script))} ({samples} recorded runs)")
+    recoveries = [value for values in data.recoveries.values() for value in values]
+    if recoveries:
+        print(f"  device recovery: median {_format_seconds(percentile(recoveries, 50))} ({len(recoveries)} recorded)")
+
+    started = time.perf_counter()
+    results = [
+        simulate(policy, jobs, devices, data, args.poll_interval, args.concurrency, args.seed)
+        for policy in args.policies
+    ]
+    simulated = sum(result.makespan for result in results)
+    print(f"Simulated {_format_seconds(simulated)} in {time.perf_counter() - started:.2f}s\n")
+    print_results(results, args.per_device)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Local fake of the Sauce Labs device management API.
+
+Serves ``GET /v1/rdc/device-management/devices`` from an in-memory device list
+so the device checker can be exercised offline. The server honours
+If-None-Match / If-Modified-Since, gzip-encodes bodies when asked to, counts
+requests and connections and can inject latency.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+DEVICES_PATH = "/v1/rdc/device-management/devices"
+
+
+class FakeDeviceAPI:
+    """In-process HTTP server that mimics the device management endpoint."""
+
+    def __init__(
+        self,
+        devices: Optional[List[Dict[str, Any]]] = None,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        """
+        Initialize the fake API.
+
+        Args:
+            devices: Initial device list (records with at least ``id`` and ``state``)
+            latency: Seconds to sleep before answering each request
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.latency = latency
+        self.request_count = 0
+        # TCP connections accepted; below request_count when clients keep them alive
+        self.connection_count = 0
+        self.not_modified_count = 0
+        self.status_override: Optional[int] = None
+        self._lock = threading.Lock()
+        self._set_body(devices or [])
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Full URL of the device list endpoint."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{DEVICES_PATH}"
+
+    def set_devices(self, devices: List[Dict[str, Any]]) -> None:
+        """Replace the device list; the ETag changes with the content."""
+        self._set_body(devices)
+
+    def set_state(self, device_id: str, state: str) -> None:
+        """Change the state of a single device."""
+        with self._lock:
+            devices = [dict(device) for device in self._devices]
+        for device in devices:
+            if device.get("id") == device_id:
+                device["state"] = state
+        self._set_body(devices)
+
+    def _set_body(self, devices: List[Dict[str, Any]]) -> None:
+        body = json.dumps(devices).encode("utf-8")
+        with self._lock:
+            self._devices = devices
+            self._body = body
+            self._etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            self._last_modified = formatdate(time.time(), usegmt=True)
+
+    def start(self) -> "FakeDeviceAPI":
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and release its socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeDeviceAPI":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with api._lock:
+                    api.connection_count += 1
+
+            def do_GET(self):
+                with api._lock:
+                    api.request_count += 1
+                    body, etag, last_modified = api._body, api._etag, api._last_modified
+                    status_override = api.status_override
+
+                if api.latency:
+                    time.sleep(api.latency)
+
+                if self.path.split("?")[0] != DEVICES_PATH:
+                    self._send(404, b"")
+                    return
+                if status_override:
+                    self._send(status_override, b"")
+                    return
+
+                # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+                if_none_match = self.headers.get("If-None-Match")
+                if if_none_match is not None:
+                    not_modified = if_none_match == etag
+                else:
+                    not_modified = self.headers.get("If-Modified-Since") == last_modified
+                if not_modified:
+                    with api._lock:
+                        api.not_modified_count += 1
+                    self._send(304, b"", {"ETag": etag, "Last-Modified": last_modified})
+                    return
+
+                headers = {
+                    "Content-Type": "application/json",
+                    "ETag": etag,
+                    "Last-Modified": last_modified,
+                }
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    headers["Content-Encoding"] = "gzip"
+                self._send(200, body, headers)
+
+            def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
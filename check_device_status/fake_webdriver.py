@@ -0,0 +1,259 @@
+"""
+Local stub of a WebDriver / Appium hub.
+
+Implements just enough of the W3C protocol for session management and
+view tests: ``POST /session`` (with a configurable start-up delay), ``DELETE
+/session/{id}``, ``POST /session/{id}/execute/sync`` (``mobile:
+activeAppInfo`` / ``terminateApp`` / ``activateApp``), ``GET source`` and
+element find / click / displayed against an XML screen (``page_source``;
+``transitions`` switches the screen when an element is clicked), and
+navigation with ``GET title`` for browser pages (``titles``). Finds support
+accessibility ids, XPath, ``name IN {...}`` predicates and
+``descriptionMatches`` selectors. Any other command of a live session gets a
+null answer. It counts sessions and commands.
+"""
+
+import json
+import re
+import socket
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+BUNDLE_ID = "com.saucelabs.stub"
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+EMPTY_SCREEN = '<AppiumAUT><XCUIElementTypeApplication name="Stub" visible="true"/></AppiumAUT>'
+
+
+class FakeWebDriver:
+    """In-process HTTP server that mimics a WebDriver hub."""
+
+    def __init__(
+        self,
+        session_delay: float = 0.0,
+        command_latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        """
+        Initialize the stub hub.
+
+        Args:
+            session_delay: Seconds ``POST /session`` takes to answer
+            command_latency: Seconds every other command takes to answer
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.session_delay = session_delay
+        self.command_latency = command_latency
+        self.sessions_created = 0
+        self.sessions_deleted = 0
+        self.fail_session_start = False
+        self.commands: List[Tuple[str, str]] = []
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.page_source = EMPTY_SCREEN
+        # Accessibility id of a clicked element -> page source shown afterwards
+        self.transitions: Dict[str, str] = {}
+        # URL -> document title returned after navigating to it
+        self.titles: Dict[str, str] = {}
+        self._elements: Dict[str, ET.Element] = {}
+        self._urls: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Hub URL to pass as the command executor."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/wd/hub"
+
+    @property
+    def active_sessions(self) -> int:
+        """Sessions created and not yet deleted."""
+        with self._lock:
+            return len(self.sessions)
+
+    def command_count(self, suffix: Optional[str] = None) -> int:
+        """Commands received for live sessions, optionally only those ending in ``suffix``."""
+        with self._lock:
+            return sum(1 for _, path in self.commands if suffix is None or path.endswith(suffix))
+
+    def _find(self, using: str, value: str) -> List[str]:
+        """Element ids of the current screen matching a locator."""
+        root = ET.fromstring(self.page_source)
+        if using in ("accessibility id", "id", "name"):
+            nodes = [node for node in root.iter() if value in (node.get("name"), node.get("content-desc"))]
+        elif using == "xpath":
+            nodes = root.findall("." + value if value.startswith("/") else value)
+        elif using == "class name":
+            nodes = [node for node in root.iter() if node.tag == value]
+        elif using == "-ios predicate string" and " IN {" in value:
+            names = set(re.findall(r"'((?:[^'\\]|\\.)*)'", value))
+            nodes = [node for node in root.iter() if node.get("name") in names]
+        elif using == "-android uiautomator" and "descriptionMatches" in value:
+            pattern = re.search(r'descriptionMatches\("(.*)"\)', value).group(1).replace('\\"', '"')
+            nodes = [node for node in root.iter() if re.fullmatch(pattern, node.get("content-desc") or "")]
+        else:
+            nodes = []
+        ids = []
+        with self._lock:
+            for node in nodes:
+                element_id = uuid.uuid4().hex
+                self._elements[element_id] = node
+                ids.append(element_id)
+        return ids
+
+    def start(self) -> "FakeWebDriver":
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and release its socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeWebDriver":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _make_handler(self):
+        hub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; avoid Nagle delays
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+            def _dispatch(self, method: str):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                path = self.path.split("?")[0]
+                if path.startswith("/wd/hub"):
+                    path = path[len("/wd/hub"):]
+                parts = [part for part in path.split("/") if part]
+
+                if parts == ["session"] and method == "POST":
+                    self._new_session(payload)
+                    return
+                if len(parts) < 2 or parts[0] != "session":
+                    self._send(404, {"error": "unknown command", "message": path})
+                    return
+
+                session_id = parts[1]
+                with hub._lock:
+                    known = session_id in hub.sessions
+                    hub.commands.append((method, "/".join(parts[2:])))
+                if not known:
+                    self._send(404, {"error": "invalid session id", "message": session_id})
+                    return
+                if hub.command_latency:
+                    time.sleep(hub.command_latency)
+
+                if len(parts) == 2 and method == "DELETE":
+                    with hub._lock:
+                        del hub.sessions[session_id]
+                        hub.sessions_deleted += 1
+                    self._send(200, None)
+                elif parts[2:] == ["execute", "sync"]:
+                    self._send(200, self._execute(payload))
+                elif parts[2:] == ["source"]:
+                    self._send(200, hub.page_source)
+                elif parts[2:] == ["url"] and method == "POST":
+                    with hub._lock:
+                        hub._urls[session_id] = payload.get("url")
+                    self._send(200, None)
+                elif parts[2:] in (["url"], ["title"]):
+                    with hub._lock:
+                        url = hub._urls.get(session_id)
+                    self._send(200, url if parts[2] == "url" else hub.titles.get(url, ""))
+                elif parts[2:] in (["element"], ["elements"]):
+                    ids = hub._find(payload.get("using"), payload.get("value"))
+                    if parts[2] == "elements":
+                        self._send(200, [{ELEMENT_KEY: element_id} for element_id in ids])
+                    elif ids:
+                        self._send(200, {ELEMENT_KEY: ids[0]})
+                    else:
+                        self._send(404, {"error": "no such element", "message": payload.get("value")})
+                elif len(parts) >= 5 and parts[2] == "element":
+                    self._element_command(parts[3], parts[4:])
+                else:
+                    self._send(200, None)
+
+            def _element_command(self, element_id: str, command: List[str]):
+                with hub._lock:
+                    node = hub._elements.get(element_id)
+                if node is None:
+                    self._send(404, {"error": "stale element reference", "message": element_id})
+                elif command == ["displayed"]:
+                    self._send(200, node.get("visible", "true") == "true")
+                elif command == ["click"]:
+                    screen = hub.transitions.get(node.get("name") or node.get("content-desc"))
+                    if screen is not None:
+                        with hub._lock:
+                            hub.page_source = screen
+                            # Elements of the previous screen are gone
+                            hub._elements.clear()
+                    self._send(200, None)
+                elif command[:1] == ["attribute"] and len(command) == 2:
+                    self._send(200, node.get(command[1]))
+                else:
+                    self._send(200, None)
+
+            def _new_session(self, payload: Dict[str, Any]):
+                if hub.session_delay:
+                    time.sleep(hub.session_delay)
+                if hub.fail_session_start:
+                    self._send(500, {"error": "session not created", "message": "stub failure"})
+                    return
+                capabilities = dict(payload.get("capabilities", {}).get("alwaysMatch", {}))
+                session_id = uuid.uuid4().hex
+                with hub._lock:
+                    hub.sessions[session_id] = capabilities
+                    hub.sessions_created += 1
+                self._send(200, {"sessionId": session_id, "capabilities": capabilities})
+
+            def _execute(self, payload: Dict[str, Any]) -> Any:
+                script = payload.get("script")
+                if script == "mobile: activeAppInfo":
+                    return {"bundleId": BUNDLE_ID, "name": "Stub", "processArguments": {}}
+                if script == "mobile: terminateApp":
+                    return True
+                return None
+
+            def _send(self, status: int, value: Any):
+                body = json.dumps({"value": value}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Load-generation harness for the Sauce Labs Appium flows.
+
+Runs the tests of an existing test module (e.g. ``test_features_sim.py``) as
+a scenario from N concurrent virtual users in a thread or process pool. Each
+iteration opens one session per test class with the module's ``driver``
+marker params, runs the class's tests and quits the session. Users can be
+ramped up, and run either a fixed number of iterations or for a duration.
+At the end the harness prints throughput, session-creation and iteration
+latency percentiles, and the error classes seen.
+
+    python load_harness.py test_features_sim_increase_retry.py --users 50 --iterations 1000
+    python load_harness.py test_features_sim_arm.py --users 20 --ramp-up 60 --duration 1800
+"""
+
+import argparse
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from appium_sessions import DriverParams, create_driver
+from connection_pool import configure_shared_pool, shared_pool
+from run_history import percentile
+
+# Repository root, where the shared smart_wait package the scenarios import lives
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+POOL_MODES = ("thread", "process")
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class Iteration:
+    """One scenario pass of one virtual user."""
+
+    user: int
+    started_at: float
+    duration: float
+    sessions: List[float]
+    outcome: str
+    error: Optional[str] = None
+
+
+class Scenario:
+    """Test classes of a module, runnable without pytest."""
+
+    def __init__(self, path: str, hub_url: Optional[str] = None, device_id: Optional[str] = None):
+        """
+        Load a test module as a scenario.
+
+        Args:
+            path: Test module whose ``driver`` fixture tests become the scenario
+            hub_url: WebDriver hub replacing the module's (e.g. a local stub)
+            device_id: Device name when the module does not set one
+                (default: SELECTED_DEVICE_ID)
+        """
+        self.path = os.path.abspath(path)
+        self.hub_url = hub_url
+        self.device_id = device_id or os.environ.get("SELECTED_DEVICE_ID")
+        self.steps = self._load()
+
+    def _load(self) -> List[Tuple[DriverParams, type, List[str]]]:
+        """Import the module and collect (params, class, test names) steps."""
+        # pytest gets both from pytest.ini and rootdir-relative imports
+        for directory in (REPO_DIR, os.path.dirname(self.path)):
+            if directory not in sys.path:
+                sys.path.insert(0, directory)
+        name = os.path.splitext(os.path.basename(self.path))[0]
+        spec = importlib.util.spec_from_file_location(name, self.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        steps = []
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if not cls.__name__.startswith("Test") or cls.__module__ != module.__name__:
+                continue
+            tests = [
+                attr for attr, value in vars(cls).items()
+                if attr.startswith("test") and callable(value)
+                and list(inspect.signature(value).parameters)[1:] == ["driver"]
+            ]
+            if not tests:
+                continue
+            # Closest markers first, as pytest's iter_markers returns them
+            markers = [
+                mark for mark in _marks(cls) + _marks(module) if mark.name == "driver"
+            ]
+            params = DriverParams.from_markers(markers, self.device_id)
+            if self.hub_url:
+                params = replace(params, hub_url=self.hub_url)
+            steps.append((params, cls, tests))
+        if not steps:
+            raise ValueError(f"No test classes using only the driver fixture in {self.path}")
+        return steps
+
+    def run_once(self, user: int, factory: Callable[[DriverParams], Any] = create_driver) -> Iteration:
+        """
+        Run every step once with fresh sessions.
+
+        Returns:
+            The iteration record; the first error stops the iteration
+        """
+        started_at = time.time()
+        started = time.monotonic()
+        sessions: List[float] = []
+        for params, cls, tests in self.steps:
+            try:
+                session_started = time.monotonic()
+                driver = factory(params)
+                sessions.append(time.monotonic() - session_started)
+            except Exception as e:
+                return Iteration(user, started_at, time.monotonic() - started, sessions,
+                                 "error", f"session: {_error_class(e)}")
+            try:
+                instance = cls()
+                for test in tests:
+                    getattr(instance, test)(driver)
+            except AssertionError as e:
+                return Iteration(user, started_at, time.monotonic() - started, sessions,
+                                 "failed", f"test: {_error_class(e)}")
+            except Exception as e:
+                return Iteration(user, started_at, time.monotonic() - started, sessions,
+                                 "error", f"test: {_error_class(e)}")
+            finally:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+        return Iteration(user, started_at, time.monotonic() - started, sessions, "passed")
+
+
+def _marks(obj) -> list:
+    marks = getattr(obj, "pytestmark", [])
+    marks = marks if isinstance(marks, list) else [marks]
+    return [getattr(mark, "mark", mark) for mark in marks]
+
+
+def _error_class(error: BaseException) -> str:
+    """Group an exception by type and the first line of its message."""
+    message = (getattr(error, "msg", None) or str(error)).strip().splitlines()
+    first_line = message[0][:120] if message else ""
+    return f"{type(error).__name__}: {first_line}" if first_line else type(error).__name__
+
+
+_stop = threading.Event()
+_scenarios: Dict[Tuple[str, Optional[str]], Scenario] = {}
+
+
+def run_user(
+    path: str,
+    hub_url: Optional[str],
+    user: int,
+    start_at: float,
+    iterations: Optional[int],
+    end_at: Optional[float]
+) -> List[Iteration]:
+    """
+    Loop one virtual user (runs in a pool thread or worker process).
+
+    Args:
+        path: Scenario test module
+        hub_url: Optional hub override
+        user: User number
+        start_at: Wall-clock time the user starts (ramp-up)
+        iterations: Iterations to run, or None to run until end_at
+        end_at: Wall-clock time after which no new iteration starts
+
+    Returns:
+        Records of the user's iterations
+    """
+    key = (path, hub_url)
+    if key not in _scenarios:
+        _scenarios[key] = Scenario(path, hub_url)
+    scenario = _scenarios[key]
+
+    if _stop.wait(max(0.0, start_at - time.time())):
+        return []
+    records = []
+    while not _stop.is_set():
+        if iterations is not None and len(records) >= iterations:
+            break
+        if end_at is not None and time.time() >= end_at:
+            break
+        records.append(scenario.run_once(user))
+    return records
+
+
+@dataclass
+class LoadReport:
+    """Aggregated results of a load run."""
+
+    users: int
+    wall_time: float
+    steady_time: float
+    iterations: int
+    outcomes: Dict[str, int]
+    throughput_per_min: float
+    steady_throughput_per_min: float
+    sessions: int
+    session_latency: Dict[str, Optional[float]]
+    iteration_latency: Dict[str, Optional[float]]
+    errors: Dict[str, int]
+    # Shared connection pool counters (thread pool only)
+    connections: Optional[Dict[str, Any]] = None
+
+    def print(self) -> None:
+        """Print the report as text."""
+        print("=" * 60)
+        print(f"Users: {self.users}   Wall time: {self.wall_time:.1f}s   Iterations: {self.iterations}")
+        print("Outcomes: " + ", ".join(f"{name} {count}" for name, count in sorted(self.outcomes.items())))
+        print(
+            f"Throughput: {self.throughput_per_min:.1f} iterations/min "
+            f"(steady state: {self.steady_throughput_per_min:.1f}/min over {self.steady_time:.1f}s)"
+        )
+        for label, stats in (("Session creation", self.session_latency), ("Iteration", self.iteration_latency)):
+            line = "  ".join(
+                f"{name} {value:.2f}s" for name, value in stats.items() if value is not None
+            )
+            print(f"{label} latency: {line or 'n/a'}")
+        if self.connections:
+            print(
+                f"Connections: {self.connections['connections']} opened for {self.connections['requests']} "
+                f"requests ({self.connections['reused']} reused, "
+                f"{self.connections['closed_by_server']} without keep-alive)"
+            )
+        if self.errors:
+            print("Errors:")
+            for error, count in sorted(self.errors.items(), key=lambda item: -item[1]):
+                print(f"  {count:>6}  {error}")
+        print("=" * 60)
+
+
+def _latency(values: List[float]) -> Dict[str, Optional[float]]:
+    stats = {f"p{q}": percentile(values, q) for q in PERCENTILES}
+    stats["max"] = max(values) if values else None
+    return stats
+
+
+def summarize(records: List[Iteration], users: int, started: float, finished: float, ramp_end: float) -> LoadReport:
+    """
+    Build the report of a run.
+
+    Steady-state throughput counts iterations that started after the last
+    user ramped up and before the first user stopped.
+    """
+    wall_time = max(1e-9, finished - started)
+    last_ends = {}
+    for record in records:
+        last_ends[record.user] = max(last_ends.get(record.user, 0.0), record.started_at + record.duration)
+    steady_end = min(last_ends.values()) if len(last_ends) == users else finished
+    steady = [r for r in records if ramp_end <= r.started_at and r.started_at + r.duration <= steady_end]
+    steady_time = max(0.0, steady_end - ramp_end)
+
+    sessions = [latency for record in records for latency in record.sessions]
+    return LoadReport(
+        users=users,
+        wall_time=round(wall_time, 3),
+        steady_time=round(steady_time, 3),
+        iterations=len(records),
+        outcomes=dict(Counter(record.outcome for record in records)),
+        throughput_per_min=len(records) / wall_time * 60,
+        steady_throughput_per_min=len(steady) / steady_time * 60 if steady_time > 0 else 0.0,
+        sessions=len(sessions),
+        session_latency=_latency(sessions),
+        iteration_latency=_latency([record.duration for record in records]),
+        errors=dict(Counter(record.error for record in records if record.error)),
+    )
+
+
+def run_load(
+    path: str,
+    users: int,
+    iterations: Optional[int] = None,
+    duration: Optional[float] = None,
+    ramp_up: float = 0.0,
+    pool: str = "thread",
+    hub_url: Optional[str] = None
+) -> LoadReport:
+    """
+    Run a scenario from concurrent virtual users.
+
+    Args:
+        path: Test module used as the scenario
+        users: Concurrent virtual users
+        iterations: Iterations per user (ignored when duration is set)
+        duration: Seconds to keep starting iterations, ramp-up included
+        ramp_up: Seconds over which users are started evenly
+        pool: "thread" or "process"
+        hub_url: Optional WebDriver hub override
+
+    Returns:
+        The aggregated report
+    """
+    if pool not in POOL_MODES:
+        raise ValueError(f"Pool must be one of {', '.join(POOL_MODES)}")
+    # Fail fast on a module that cannot be used as a scenario
+    Scenario(path, hub_url)
+
+    started = time.time()
+    end_at = started + duration if duration else None
+    per_user = None if duration else (iterations or 1)
+    offsets = [ramp_up * user / users if users > 1 else 0.0 for user in range(users)]
+
+    executor_cls = ThreadPoolExecutor if pool == "thread" else ProcessPoolExecutor
+    if pool == "thread":
+        # Users' sessions share the process's keep-alive connections
+        configure_shared_pool(users)
+    records: List[Iteration] = []
+    with executor_cls(max_workers=users) as executor:
+        futures = [
+            executor.submit(run_user, path, hub_url, user, started + offsets[user], per_user, end_at)
+            for user in range(users)
+        ]
+        try:
+            for future in futures:
+                records.extend(future.result())
+        except KeyboardInterrupt:
+            # Threads finish their current iteration; processes are cancelled
+            _stop.set()
+            for future in futures:
+                future.cancel()
+            for future in futures:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    records.extend(future.result())
+
+    report = summarize(records, users, started, time.time(), started + (offsets[-1] if offsets else 0.0))
+    if pool == "thread":
+        report.connections = shared_pool().stats()
+    return report
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Concurrent Appium session load harness")
+    parser.add_argument("scenario", help="Test module to run as the scenario (e.g. test_features_sim.py)")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users (default: 20)")
+    parser.add_argument(
+        "--iterations", type=int, default=1,
+        help="Scenario iterations per user (default: 1; ignored with --duration)"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=None,
+        help="Keep users looping for this many seconds, ramp-up included"
+    )
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which users start (default: 0)")
+    parser.add_argument(
+        "--pool", choices=POOL_MODES, default="thread",
+        help="Run users in threads (default) or worker processes"
+    )
+    parser.add_argument("--hub-url", default=None, help="WebDriver hub to use instead of the scenario's")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run_load(
+        args.scenario, args.users, iterations=args.iterations, duration=args.duration,
+        ramp_up=args.ramp_up, pool=args.pool, hub_url=args.hub_url
+    )
+    report.print()
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(report), f, indent=2)
+    sys.exit(0 if report.outcomes.keys() <= {"passed"} else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""
+Indexed analyzer for device checker service logs.
+
+The log (console text such as ``testrunner_log.txt`` or the JSON-lines
+``--log-file``) is memory-mapped and read once, line by line, by a
+generator; every finished run is stored in a small SQLite index next to it
+with its byte offsets in the log, script, device, start time, duration,
+outcome, pytest summary and Sauce Labs session ids. Queries then read only
+the index. Later calls continue from the last indexed offset (the parser
+state is saved with the index), so ``tail`` can follow a growing log and a
+rotated or truncated log is re-indexed from the start.
+
+When pytest children write into the service's stdout, their output is block
+buffered apart from the service's own lines. Their summary lines and Sauce
+session ids are then matched to runs in completion order (exact for the
+one-run-at-a-time service, best effort with concurrent runs). Logs that
+carry the service's ``Results for ...`` lines use those instead.
+
+    python log_index.py runs testrunner_log.txt --script foodtruck --device POC46 --since 7d
+    python log_index.py stats testrunner_log.txt --by script,device
+    python log_index.py show testrunner_log.txt 42
+    python log_index.py tail service.log
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from run_history import percentile
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    start_offset INTEGER NOT NULL UNIQUE,
+    end_offset INTEGER NOT NULL,
+    script TEXT NOT NULL,
+    device_id TEXT,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    exit_code INTEGER,
+    tests TEXT,
+    sauce_session_ids TEXT,
+    run_log TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started_at);
+CREATE INDEX IF NOT EXISTS runs_script_device ON runs (script, device_id, started_at);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+GROUP_COLUMNS = ("script", "device_id", "outcome", "day")
+
+TEXT_LINE = re.compile(rb"^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] (.*)$")
+SAUCE_SESSION = re.compile(rb"Sauce Session: https?://\S+/tests/([0-9A-Za-z-]+)")
+# "1 passed, 2 warnings in 22.50s" (-q) or "===== 1 failed in 0.25s ====="
+PYTEST_SUMMARY = re.compile(
+    rb"^=*\s*((?:\d+ [a-z]+)(?:, \d+ [a-z]+)*|no tests ran) in ([\d.]+)s\b"
+)
+
+SERVICE_STARTED = re.compile(r"^Device Availability Checker Service Started")
+DEVICE_AVAILABLE = re.compile(r"^Device (\S+) is AVAILABLE")
+RUN_STARTED = re.compile(r"^Executing pytest script: (\S+)")
+WORKER_RUN_STARTED = re.compile(r"^\[worker \d+\] Run \d+: (\S+) on (\S+)")
+RUN_PASSED = re.compile(r"^Pytest (\S+)(?: on (\S+))? completed successfully")
+RUN_FAILED = re.compile(r"^Pytest (\S+)(?: on (\S+))? failed with exit code (-?\d+)")
+RUN_ERROR = re.compile(r"^Error(?: executing pytest|: pytest not found)")
+RESULTS = re.compile(r"^Results for (\S+): (.*?)(?: in [\d.]+s)?(?: — sessions: (.*))?$")
+
+# Child reports kept while no run is waiting for one
+MAX_PENDING_REPORTS = 1000
+
+
+@dataclass
+class RunRecord:
+    """One finished run found in the log."""
+
+    start_offset: int
+    end_offset: int
+    script: str
+    device_id: Optional[str]
+    started_at: float
+    duration: float
+    outcome: str
+    exit_code: Optional[int] = None
+    tests: Optional[str] = None
+    sauce_session_ids: List[str] = field(default_factory=list)
+    run_log: Optional[str] = None
+
+
+def iter_lines(mapped: mmap.mmap, start: int, end: int) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Complete lines of a mapped file between two offsets.
+
+    Yields:
+        (start offset, end offset after the newline, line without newline);
+        a trailing line without newline is not yielded
+    """
+    position = start
+    while position < end:
+        newline = mapped.find(b"\n", position, end)
+        if newline == -1:
+            return
+        yield position, newline + 1, mapped[position:newline].rstrip(b"\r")
+        position = newline + 1
+
+
+class LogParser:
+    """Turns service log lines into RunRecords; its state can be saved."""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.last_device: Optional[str] = state.get("last_device")
+        # Started runs: start_offset, started_at, script, device_id, results
+        self.open_runs: List[Dict[str, Any]] = state.get("open_runs", [])
+        # Child output not yet matched to a run, and runs waiting for theirs
+        self.sessions: List[str] = state.get("sessions", [])
+        self.pending_reports: List[Dict[str, Any]] = state.get("pending_reports", [])
+        self.awaiting_report: List[int] = state.get("awaiting_report", [])
+        self.results_seen: bool = state.get("results_seen", False)
+
+    def state(self) -> Dict[str, Any]:
+        """JSON-serialisable state to resume parsing after the last line."""
+        return {
+            "last_device": self.last_device,
+            "open_runs": self.open_runs,
+            "sessions": self.sessions,
+            "pending_reports": self.pending_reports,
+            "awaiting_report": self.awaiting_report,
+            "results_seen": self.results_seen,
+        }
+
+    def feed(self, start: int, end: int, line: bytes) -> Iterator[Tuple[str, Any]]:
+        """
+        Parse one line.
+
+        Yields:
+            ("run", RunRecord) for a finished run and ("report", dict) for a
+            pytest summary (with the Sauce session ids before it) that
+            belongs to the oldest run still waiting for one
+        """
+        first = line[:1]
+        if first == b"[":
+            match = TEXT_LINE.match(line)
+            if match:
+                started_at = time.mktime(time.strptime(match.group(1).decode(), "%Y-%m-%d %H:%M:%S"))
+                yield from self._service_line(start, end, started_at, match.group(2).decode("utf-8", "replace"), {})
+                return
+        elif first == b"{":
+            try:
+                entry = json.loads(line)
+                timestamp = datetime.fromisoformat(entry["time"]).timestamp()
+            except (ValueError, KeyError, TypeError):
+                entry = None
+            if isinstance(entry, dict):
+                yield from self._service_line(start, end, timestamp, str(entry.get("message", "")), entry)
+                return
+        if self.results_seen:
+            return
+        match = SAUCE_SESSION.search(line)
+        if match:
+            self.sessions.append(match.group(1).decode())
+            return
+        match = PYTEST_SUMMARY.match(line)
+        if match:
+            report = {"tests": match.group(1).decode(), "sessions": self.sessions}
+            self.sessions = []
+            yield ("report", report)
+
+    def _service_line(
+        self, start: int, end: int, timestamp: float, message: str, fields: Dict[str, Any]
+    ) -> Iterator[Tuple[str, Any]]:
+        if SERVICE_STARTED.match(message):
+            # Runs still open were cut short by a restart
+            for run in self.open_runs:
+                yield ("run", self._record(run, start, timestamp, "interrupted"))
+            self.open_runs = []
+            return
+        match = DEVICE_AVAILABLE.match(message)
+        if match:
+            self.last_device = match.group(1)
+            return
+        match = RUN_STARTED.match(message)
+        if match:
+            self._open(start, timestamp, match.group(1), fields.get("device_id") or self.last_device)
+            return
+        match = WORKER_RUN_STARTED.match(message)
+        if match:
+            self._open(start, timestamp, match.group(1), match.group(2))
+            return
+        match = RESULTS.match(message)
+        if match:
+            self.results_seen = True
+            run = self._find(match.group(1), fields.get("device_id"))
+            if run is not None:
+                outcomes = fields.get("outcomes")
+                run["tests"] = (
+                    ", ".join(f"{count} {name}" for name, count in sorted(outcomes.items()))
+                    if isinstance(outcomes, dict) else match.group(2)
+                )
+                run["sessions"] = [s.strip() for s in (match.group(3) or "").split(",") if s.strip()]
+                if fields.get("duration") is not None:
+                    run["duration"] = float(fields["duration"])
+                run["run_log"] = fields.get("run_log")
+            return
+        match = RUN_PASSED.match(message)
+        if match:
+            run = self._find(match.group(1), match.group(2))
+            if run is not None:
+                self.open_runs.remove(run)
+                yield ("run", self._record(run, end, timestamp, "passed", 0))
+            return
+        match = RUN_FAILED.match(message)
+        if match:
+            run = self._find(match.group(1), match.group(2))
+            if run is not None:
+                self.open_runs.remove(run)
+                yield ("run", self._record(run, end, timestamp, "failed", int(match.group(3))))
+            return
+        if RUN_ERROR.match(message) and self.open_runs:
+            yield ("run", self._record(self.open_runs.pop(), end, timestamp, "error"))
+
+    def _open(self, start: int, timestamp: float, script: str, device_id: Optional[str]) -> None:
+        self.open_runs.append({
+            "start_offset": start, "started_at": timestamp, "script": script, "device_id": device_id,
+        })
+
+    def _find(self, script: str, device_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        for run in self.open_runs:
+            if run["script"] == script and (device_id is None or run["device_id"] == device_id):
+                return run
+        return None
+
+    @staticmethod
+    def _record(
+        run: Dict[str, Any], end: int, timestamp: float, outcome: str, exit_code: Optional[int] = None
+    ) -> RunRecord:
+        return RunRecord(
+            start_offset=run["start_offset"],
+            end_offset=end,
+            script=run["script"],
+            device_id=run["device_id"],
+            started_at=run["started_at"],
+            duration=round(run.get("duration", timestamp - run["started_at"]), 3),
+            outcome=outcome,
+            exit_code=exit_code,
+            tests=run.get("tests"),
+            sauce_session_ids=run.get("sessions", []),
+            run_log=run.get("run_log"),
+        )
+
+
+class LogIndex:
+    """SQLite index of the runs in one log file."""
+
+    def __init__(self, log_path: str, index_path: Optional[str] = None):
+        """
+        Open (or create) the index of a log.
+
+        Args:
+            log_path: Service log to analyse
+            index_path: SQLite file (default: ``<log>.index.sqlite``)
+        """
+        self.log_path = log_path
+        self.index_path = index_path or f"{log_path}.index.sqlite"
+        self._conn = sqlite3.connect(self.index_path)
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the index database."""
+        self._conn.close()
+
+    def _meta(self) -> Dict[str, Any]:
+        return {key: json.loads(value) for key, value in self._conn.execute("SELECT key, value FROM meta")}
+
+    def _identity(self, mapped: Optional[mmap.mmap], stat: os.stat_result) -> Dict[str, Any]:
+        head = mapped[:256].hex() if mapped is not None else ""
+        return {"inode": stat.st_ino, "head": head}
+
+    def update(self) -> List[RunRecord]:
+        """
+        Index the lines appended since the last update.
+
+        The log is re-indexed from the start when it was replaced, rotated or
+        truncated.
+
+        Returns:
+            The runs added by this update
+        """
+        stat = os.stat(self.log_path)
+        with open(self.log_path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else None
+            try:
+                return self._update(mapped, stat)
+            finally:
+                if mapped is not None:
+                    mapped.close()
+
+    def _update(self, mapped: Optional[mmap.mmap], stat: os.stat_result) -> List[RunRecord]:
+        meta = self._meta()
+        identity = self._identity(mapped, stat)
+        offset = meta.get("offset", 0)
+        old_identity = meta.get("identity")
+        replaced = old_identity is not None and (
+            old_identity["inode"] != identity["inode"]
+            or not identity["head"].startswith(old_identity["head"][:len(identity["head"])])
+        )
+        if replaced or stat.st_size < offset:
+            self._conn.execute("DELETE FROM runs")
+            offset, meta = 0, {}
+        if mapped is None:
+            return []
+
+        parser = LogParser(meta.get("parser"))
+        added: List[RunRecord] = []
+        with self._conn:
+            for start, end, line in iter_lines(mapped, offset, len(mapped)):
+                for kind, item in parser.feed(start, end, line):
+                    if kind == "run":
+                        self._insert(parser, item)
+                        added.append(item)
+                    else:
+                        self._report(parser, item)
+                offset = end
+            for key, value in (("offset", offset), ("identity", identity), ("parser", parser.state())):
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+        return added
+
+    def _insert(self, parser: LogParser, run: RunRecord) -> None:
+        cursor = self._conn.execute(
+            "INSERT OR REPLACE INTO runs (start_offset, end_offset, script, device_id, started_at, duration, "
+            "outcome, exit_code, tests, sauce_session_ids, run_log) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run.start_offset, run.end_offset, run.script, run.device_id, run.started_at, run.duration,
+             run.outcome, run.exit_code, run.tests, ",".join(run.sauce_session_ids) or None, run.run_log),
+        )
+        if parser.results_seen or run.outcome == "interrupted":
+            return
+        if parser.pending_reports:
+            self._apply_report(cursor.lastrowid, parser.pending_reports.pop(0), run)
+        else:
+            parser.awaiting_report.append(cursor.lastrowid)
+
+    def _report(self, parser: LogParser, report: Dict[str, Any]) -> None:
+        if parser.awaiting_report:
+            self._apply_report(parser.awaiting_report.pop(0), report)
+        else:
+            parser.pending_reports = (parser.pending_reports + [report])[-MAX_PENDING_REPORTS:]
+
+    def _apply_report(self, run_id: int, report: Dict[str, Any], run: Optional[RunRecord] = None) -> None:
+        sessions = ",".join(report["sessions"]) or None
+        self._conn.execute(
+            "UPDATE runs SET tests = ?, sauce_session_ids = ? WHERE id = ?", (report["tests"], sessions, run_id)
+        )
+        if run is not None:
+            run.tests = report["tests"]
+            run.sauce_session_ids = list(report["sessions"])
+
+    def runs(
+        self,
+        script: Optional[str] = None,
+        device_id: Optional[str] = None,
+        outcome: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        after_id: int = 0,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Indexed runs matching the filters, oldest first.
+
+        Args:
+            script: Case-insensitive substring of the script name
+            device_id: Case-insensitive substring of the device id
+            outcome: passed, failed, error or interrupted
+            since: Earliest start (epoch seconds)
+            until: Latest start (epoch seconds)
+            after_id: Only runs indexed after this run id
+            limit: Most recent runs to return
+
+        Returns:
+            One dict per run
+        """
+        where, params = self._filters(script, device_id, outcome, since, until)
+        where.append("id > ?")
+        params.append(after_id)
+        query = f"SELECT * FROM runs WHERE {' AND '.join(where)} ORDER BY started_at DESC, id DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        cursor = self._conn.execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in reversed(cursor.fetchall())]
+
+    def stats(
+        self,
+        by: Sequence[str] = ("script",),
+        script: Optional[str] = None,
+        device_id: Optional[str] = None,
+        outcome: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run counts and duration percentiles per group.
+
+        Args:
+            by: Group columns (script, device_id, outcome, day)
+            script, device_id, outcome, since, until: Filters as for runs()
+
+        Returns:
+            One dict per group, ordered by the group columns
+        """
+        unknown = set(by) - set(GROUP_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot group by {', '.join(sorted(unknown))}; use {', '.join(GROUP_COLUMNS)}")
+        where, params = self._filters(script, device_id, outcome, since, until)
+        expressions = [
+            "date(started_at, 'unixepoch', 'localtime')" if column == "day" else column for column in by
+        ]
+        query = (
+            f"SELECT {', '.join(expressions) + ',' if expressions else ''} duration, outcome "
+            f"FROM runs WHERE {' AND '.join(where)}"
+        )
+        groups: Dict[Tuple, List[Tuple[float, str]]] = {}
+        for row in self._conn.execute(query, params):
+            groups.setdefault(tuple(row[:len(by)]), []).append((row[-2], row[-1]))
+        result = []
+        for key in sorted(groups, key=lambda key: tuple("" if value is None else str(value) for value in key)):
+            durations = [duration for duration, _ in groups[key]]
+            result.append({
+                **dict(zip(by, key)),
+                "runs": len(durations),
+                "failed": sum(outcome != "passed" for _, outcome in groups[key]),
+                "mean": sum(durations) / len(durations),
+                "p50": percentile(durations, 50),
+                "p95": percentile(durations, 95),
+                "max": max(durations),
+            })
+        return result
+
+    @staticmethod
+    def _filters(script, device_id, outcome, since, until) -> Tuple[List[str], list]:
+        where, params = ["1"], []
+        if script:
+            where.append("script LIKE ?")
+            params.append(f"%{script}%")
+        if device_id:
+            where.append("device_id LIKE ?")
+            params.append(f"%{device_id}%")
+        if outcome:
+            where.append("outcome = ?")
+            params.append(outcome)
+        if since is not None:
+            where.append("started_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("started_at <= ?")
+            params.append(until)
+        return where, params
+
+    def run(self, run_id: int) -> Dict[str, Any]:
+        """One indexed run (KeyError if unknown)."""
+        cursor = self._conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,))
+        row = cursor.fetchone()
+        if row is None:
+            raise KeyError(run_id)
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    def span(self, run_id: int) -> bytes:
+        """Raw log bytes from a run's start line to its end line."""
+        run = self.run(run_id)
+        with open(self.log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[run["start_offset"]:run["end_offset"]]
+
+
+def parse_time(value: str) -> float:
+    """
+    Epoch seconds of a command-line time.
+
+    Accepts a relative age (``90m``, ``12h``, ``7d``, ``2w``) or a local
+    date/time (``2026-03-06``, ``2026-03-06 17:30``, ``2026-03-06T17:30:00``).
+    """
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhdw])", value.strip())
+    if match:
+        unit = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}[match.group(2)]
+        return time.time() - float(match.group(1)) * unit
+    try:
+        return datetime.fromisoformat(value.strip()).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Not a time or age: {value!r} (e.g. 7d, 12h, 2026-03-06 17:30)")
+
+
+def _format_time(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def print_runs(runs: List[Dict[str, Any]]) -> None:
+    """Print runs as a table."""
+    for run in runs:
+        tests = run["tests"] or "-"
+        line = (
+            f"{run['id']:>6}  {_format_time(run['started_at'])}  {run['script']:<28} "
+            f"{(run['device_id'] or '-'):<26} {run['duration']:>8.1f}s  {run['outcome']:<11} {tests}"
+        )
+        if run["sauce_session_ids"]:
+            line += f"  [{run['sauce_session_ids']}]"
+        print(line)
+
+
+def print_stats(rows: List[Dict[str, Any]], by: Sequence[str]) -> None:
+    """Print grouped statistics as a table."""
+    header = "".join(f"{column:<28}" for column in by)
+    print(f"{header}{'runs':>6}{'failed':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}")
+    for row in rows:
+        groups = "".join(f"{str(row[column] if row[column] is not None else '-')[:27]:<28}" for column in by)
+        print(
+            f"{groups}{row['runs']:>6}{row['failed']:>8}{row['mean']:>9.1f}s"
+            f"{row['p50']:>9.1f}s{row['p95']:>9.1f}s{row['max']:>9.1f}s"
+        )
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Index and query device checker service logs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name: str, help: str) -> argparse.ArgumentParser:
+        command = commands.add_parser(name, help=help)
+        command.add_argument("log", help="Service log (text console output or JSON lines)")
+        command.add_argument("--index", default=None, help="Index file (default: LOG.index.sqlite)")
+        return command
+
+    def add_filters(command: argparse.ArgumentParser) -> None:
+        command.add_argument("--script", default=None, help="Script name contains (case-insensitive)")
+        command.add_argument("--device", default=None, help="Device id contains (case-insensitive)")
+        command.add_argument("--outcome", choices=("passed", "failed", "error", "interrupted"), default=None)
+        command.add_argument("--since", type=parse_time, default=None, help="Started after (7d, 12h, 2026-03-06)")
+        command.add_argument("--until", type=parse_time, default=None, help="Started before (same formats)")
+
+    add_command("index", "Build or update the index and report its size")
+    runs_command = add_command("runs", "List indexed runs")
+    add_filters(runs_command)
+    runs_command.add_argument("--limit", type=int, default=None, help="Show only the most recent N runs")
+    runs_command.add_argument("--json", action="store_true", help="Print JSON lines instead of a table")
+    stats_command = add_command("stats", "Run counts and duration percentiles per group")
+    add_filters(stats_command)
+    stats_command.add_argument(
+        "--by", default="script", help=f"Comma-separated group columns: {', '.join(GROUP_COLUMNS)} (default: script)"
+    )
+    show_command = add_command("show", "Print the log lines of one run")
+    show_command.add_argument("run_id", type=int, help="Run id from the runs command")
+    tail_command = add_command("tail", "Follow the log, indexing and printing runs as they finish")
+    tail_command.add_argument("--interval", type=float, default=2.0, help="Seconds between checks (default: 2)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        parser.error(f"No such log: {args.log}")
+    index = LogIndex(args.log, args.index)
+    try:
+        started = time.monotonic()
+        added = index.update()
+        if args.command == "index":
+            total = index._conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            print(f"{len(added)} new runs indexed in {time.monotonic() - started:.2f}s; "
+                  f"{total} runs in {index.index_path}")
+        elif args.command == "runs":
+            runs = index.runs(args.script, args.device, args.outcome, args.since, args.until, limit=args.limit)
+            if args.json:
+                for run in runs:
+                    print(json.dumps(run))
+            else:
+                print_runs(runs)
+        elif args.command == "stats":
+            by = [column.strip() for column in args.by.split(",") if column.strip()]
+            by = ["device_id" if column == "device" else column for column in by]
+            try:
+                rows = index.stats(by, args.script, args.device, args.outcome, args.since, args.until)
+            except ValueError as e:
+                parser.error(str(e))
+            print_stats(rows, by)
+        elif args.command == "show":
+            try:
+                sys.stdout.write(index.span(args.run_id).decode("utf-8", "replace"))
+            except KeyError:
+                parser.error(f"No run {args.run_id} in the index")
+            run_log = index.run(args.run_id)["run_log"]
+            if run_log:
+                print(f"Run output: {run_log}")
+        elif args.command == "tail":
+            last_id = index._conn.execute("SELECT COALESCE(MAX(id), 0) FROM runs").fetchone()[0]
+            print(f"Following {args.log} (Ctrl+C to stop)")
+            while True:
+                time.sleep(args.interval)
+                index.update()
+                runs = index.runs(after_id=last_id)
+                if runs:
+                    print_runs(runs)
+                    last_id = max(run["id"] for run in runs)
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Adaptive polling for the device checker service.
+
+AdaptivePoller picks the delay before the next device API request from what
+the last polls showed: jittered exponential backoff on errors and 429s
+(honouring Retry-After), short intervals right after a device changed state
+(or while one is CLEANING), and progressively longer intervals while every
+device has been IN_USE for a while. HostRateBudget is a token bucket stored in a lock-protected
+file so all checker instances on a host share one request budget.
+"""
+
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows: the budget is only shared within the process
+    fcntl = None
+
+# States after which a device is expected to become AVAILABLE soon
+ABOUT_TO_FREE_STATES = {"CLEANING", "REBOOTING"}
+
+
+class HostRateBudget:
+    """Token bucket shared by every process on the host through a state file."""
+
+    def __init__(self, key: str, requests_per_minute: float, burst: Optional[int] = None):
+        """
+        Initialize the budget.
+
+        Args:
+            key: Name of the shared budget (e.g. the API host)
+            requests_per_minute: Sustained request rate allowed across the host
+            burst: Bucket size (default: a tenth of a minute's budget, at least 1)
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(requests_per_minute / 10)))
+        safe_key = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+        self.path = os.path.join(tempfile.gettempdir(), f"sauce-device-checker-{safe_key}.budget")
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Try to take a token; return 0 on success or the seconds to wait."""
+        with self._lock, open(self.path, "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except ValueError:
+                    state = {}
+                now = time.time()
+                tokens = state.get("tokens", self.capacity)
+                updated = state.get("updated", now)
+                tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({"tokens": tokens, "updated": now}))
+                f.flush()
+                return wait
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def acquire(self) -> float:
+        """
+        Block until a request may be sent.
+
+        Returns:
+            Seconds spent waiting for the budget
+        """
+        waited = 0.0
+        while True:
+            wait = self._take()
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+
+class AdaptivePoller:
+    """Chooses the delay between device API polls."""
+
+    def __init__(
+        self,
+        base_interval: float,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        busy_after: float = 120.0,
+        recent_window: Optional[float] = None,
+        backoff_cap: float = 300.0,
+        budget: Optional[HostRateBudget] = None
+    ):
+        """
+        Initialize the poller.
+
+        Args:
+            base_interval: Interval used when nothing interesting is happening
+            min_interval: Interval right after a state change (default: base / 5)
+            max_interval: Longest interval while every device is busy
+                (default: base * 6)
+            busy_after: Seconds every device must be IN_USE before intervals
+                start growing
+            recent_window: Seconds a state change keeps the short interval
+                (default: 3 * base)
+            backoff_cap: Longest delay after repeated errors
+            budget: Optional host-wide request budget
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval if min_interval is not None else max(1.0, base_interval / 5)
+        self.max_interval = max_interval if max_interval is not None else base_interval * 6
+        self.busy_after = busy_after
+        self.recent_window = recent_window if recent_window is not None else base_interval * 3
+        self.backoff_cap = backoff_cap
+        self.budget = budget
+
+        self.consecutive_errors = 0
+        self.retry_after: Optional[float] = None
+        self._states: Dict[str, Optional[str]] = {}
+        self._last_transition: Optional[float] = None
+        self._all_busy_since: Optional[float] = None
+        self._busy_polls = 0
+        self._wake = threading.Event()
+
+    def before_request(self) -> float:
+        """
+        Wait for the host-wide budget before an API request.
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.budget is None:
+            return 0.0
+        return self.budget.acquire()
+
+    def record_error(self, status_code: Optional[int] = None, retry_after: Optional[float] = None) -> None:
+        """
+        Note a failed poll.
+
+        Args:
+            status_code: HTTP status of the failure, if any (429 = throttled)
+            retry_after: Seconds from a Retry-After header, if any
+        """
+        # Throttling backs off twice as fast as other errors
+        self.consecutive_errors += 2 if status_code == 429 else 1
+        self.retry_after = retry_after
+
+    def record_states(self, states: Dict[str, Optional[str]]) -> None:
+        """
+        Note a successful poll.
+
+        Args:
+            states: Current state of every monitored device
+        """
+        now = time.monotonic()
+        self.consecutive_errors = 0
+        self.retry_after = None
+
+        if self._states and states != self._states:
+            self._last_transition = now
+        self._states = dict(states)
+
+        if states and all(state == "IN_USE" for state in states.values()):
+            if self._all_busy_since is None:
+                self._all_busy_since = now
+            elif now - self._all_busy_since >= self.busy_after:
+                self._busy_polls += 1
+        else:
+            self._all_busy_since = None
+            self._busy_polls = 0
+
+    def note_transition(self) -> None:
+        """Note a state change seen outside the API (e.g. a run just ended)."""
+        self._last_transition = time.monotonic()
+
+    def next_interval(self) -> float:
+        """Return the seconds to wait before the next poll."""
+        now = time.monotonic()
+
+        if self.consecutive_errors:
+            ceiling = min(self.backoff_cap, self.base_interval * 2 ** self.consecutive_errors)
+            delay = random.uniform(self.base_interval, max(self.base_interval, ceiling))
+            if self.retry_after is not None:
+                delay = max(delay, self.retry_after)
+            return delay
+
+        if any(state in ABOUT_TO_FREE_STATES for state in self._states.values()):
+            interval = self.min_interval
+        elif self._last_transition is not None and now - self._last_transition < self.recent_window:
+            interval = self.min_interval
+        elif self._busy_polls:
+            interval = min(self.max_interval, self.base_interval * 1.5 ** self._busy_polls)
+        else:
+            interval = self.base_interval
+
+        # Small jitter so instances started together do not poll in lockstep
+        return interval * random.uniform(0.9, 1.1)
+
+    def sleep(self, seconds: float) -> bool:
+        """
+        Sleep until the next poll or until wake() is called.
+
+        Returns:
+            True if woken early
+        """
+        woken = self._wake.wait(seconds)
+        self._wake.clear()
+        return woken
+
+    def wake(self) -> None:
+        """Cut the current sleep short so the next poll happens now."""
+        self.note_transition()
+        self._wake.set()
+
+
+def budget_for(api_url: str, requests_per_minute: Optional[float]) -> Optional[HostRateBudget]:
+    """
+    Build the host-wide budget for an API URL.
+
+    Args:
+        api_url: Device API URL; instances polling the same host share a budget
+        requests_per_minute: Budget size, or None/0 for no budget
+
+    Returns:
+        The budget, or None when disabled
+    """
+    if not requests_per_minute:
+        return None
+    return HostRateBudget(urlparse(api_url).netloc or api_url, requests_per_minute)
@@ -0,0 +1,276 @@
+"""
+Ways to execute a pytest run for the device checker service.
+
+- SubprocessRunner: ``python -m pytest`` in a fresh interpreter per run (full
+  isolation; pays interpreter start-up and heavy imports every time).
+- InProcessRunner: ``pytest.main`` inside the service process, with Appium /
+  Selenium already imported. Runs are serialised because pytest and
+  ``os.environ`` are process-global.
+- WarmWorkerPool: pre-started worker processes that import the heavy modules
+  once and then accept runs over a multiprocessing pipe. Runs stay isolated
+  from the service process, and ``max_runs_per_worker`` recycles workers.
+
+Given a ``log_path``, every runner writes the run's output to that file
+(run_output.RunLog) instead of the service's stdout.
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from run_output import DEFAULT_MAX_BYTES, RunLog, captured_fds, captured_streams, pump
+
+# Imported up front by in-process and warm runners so runs do not pay for them
+WARM_IMPORTS = (
+    "pytest",
+    "urllib3",
+    "selenium.webdriver",
+    "appium.webdriver",
+    "appium.options.ios",
+)
+
+RUNNER_MODES = ("subprocess", "inprocess", "warm")
+
+
+def warm_up() -> None:
+    """Import the heavy test dependencies that are installed."""
+    import importlib
+
+    for name in WARM_IMPORTS:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+@contextmanager
+def _run_environment(env: Dict[str, str], cwd: Optional[str]) -> Iterator[None]:
+    """Temporarily replace os.environ and the working directory."""
+    saved_env = dict(os.environ)
+    saved_cwd = os.getcwd()
+    os.environ.clear()
+    os.environ.update(env)
+    if cwd:
+        os.chdir(cwd)
+    try:
+        yield
+    finally:
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+
+def _run_pytest_main(args: List[str], plugins: Optional[list] = None) -> int:
+    """
+    Call pytest.main and drop the test modules it imported.
+
+    Test modules and conftests are removed from ``sys.modules`` afterwards so
+    the next run re-imports them; library modules stay loaded.
+
+    Returns:
+        pytest exit code
+    """
+    import pytest
+
+    before = set(sys.modules)
+    roots = {os.getcwd()} | {
+        os.path.dirname(os.path.abspath(arg)) for arg in args if os.path.isfile(arg)
+    }
+    try:
+        return int(pytest.main(["-p", "no:cacheprovider", *args], plugins=plugins or []))
+    finally:
+        for name in set(sys.modules) - before:
+            module_file = getattr(sys.modules[name], "__file__", None) or ""
+            if "site-packages" in module_file:
+                continue
+            if any(module_file.startswith(root + os.sep) for root in roots):
+                del sys.modules[name]
+
+
+class SubprocessRunner:
+    """Runs every pytest invocation in a new interpreter."""
+
+    mode = "subprocess"
+
+    def __init__(self, log_max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the runner.
+
+        Args:
+            log_max_bytes: Size at which a run's log file is rotated
+        """
+        self.log_max_bytes = log_max_bytes
+
+    def run(
+        self,
+        args: List[str],
+        env: Dict[str, str],
+        cwd: Optional[str] = None,
+        log_path: Optional[str] = None
+    ) -> int:
+        """
+        Run pytest with the given arguments.
+
+        Args:
+            args: pytest arguments (options and script path)
+            env: Environment for the run
+            cwd: Working directory (default: current)
+            log_path: File for the run's output (default: inherit stdout)
+
+        Returns:
+            pytest exit code
+        """
+        command = [sys.executable, "-m", "pytest", *args]
+        if log_path is None:
+            return subprocess.run(command, env=env, cwd=cwd, check=False).returncode
+        process = subprocess.Popen(command, env=env, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        with process, RunLog(log_path, self.log_max_bytes) as run_log:
+            pump(process.stdout, run_log)
+            return process.wait()
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+class InProcessRunner:
+    """Runs pytest.main inside the current process, one run at a time."""
+
+    mode = "inprocess"
+
+    def __init__(self, plugins: Optional[list] = None, log_max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the runner and pre-import the heavy test dependencies.
+
+        Args:
+            plugins: Plugin objects passed to every pytest.main call
+            log_max_bytes: Size at which a run's log file is rotated
+        """
+        self.plugins = plugins or []
+        self.log_max_bytes = log_max_bytes
+        self._lock = threading.Lock()
+        warm_up()
+
+    def run(
+        self,
+        args: List[str],
+        env: Dict[str, str],
+        cwd: Optional[str] = None,
+        log_path: Optional[str] = None
+    ) -> int:
+        """
+        Run pytest with the given arguments in this process.
+
+        Args:
+            args: pytest arguments (options and script path)
+            env: Environment for the run (applied to os.environ for its duration)
+            cwd: Working directory (default: current)
+            log_path: File for the run's output (``sys.stdout``/``sys.stderr``
+                are redirected; default: the service's stdout)
+
+        Returns:
+            pytest exit code
+        """
+        with self._lock, _run_environment(env, cwd):
+            if log_path is None:
+                return _run_pytest_main(args, self.plugins)
+            with RunLog(log_path, self.log_max_bytes) as run_log, captured_streams(run_log):
+                return _run_pytest_main(args, self.plugins)
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+def _worker_run(
+    args: List[str],
+    env: Dict[str, str],
+    cwd: Optional[str],
+    log_path: Optional[str] = None,
+    log_max_bytes: int = DEFAULT_MAX_BYTES
+) -> int:
+    """Entry point of a warm worker for one run."""
+    with _run_environment(env, cwd):
+        if log_path is None:
+            return _run_pytest_main(args)
+        with RunLog(log_path, log_max_bytes) as run_log, captured_fds(run_log):
+            return _run_pytest_main(args)
+
+
+class WarmWorkerPool:
+    """Pool of pre-started worker processes with the heavy imports loaded."""
+
+    mode = "warm"
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_runs_per_worker: Optional[int] = None,
+        log_max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        """
+        Start the workers.
+
+        Args:
+            workers: Number of worker processes (runs that can execute at once)
+            max_runs_per_worker: Replace a worker after this many runs (None
+                keeps workers for the life of the pool)
+            log_max_bytes: Size at which a run's log file is rotated
+        """
+        self.workers = workers
+        self.log_max_bytes = log_max_bytes
+        self._pool = multiprocessing.get_context().Pool(
+            processes=workers,
+            initializer=warm_up,
+            maxtasksperchild=max_runs_per_worker,
+        )
+
+    def run(
+        self,
+        args: List[str],
+        env: Dict[str, str],
+        cwd: Optional[str] = None,
+        log_path: Optional[str] = None
+    ) -> int:
+        """
+        Run pytest in the next free worker and wait for the result.
+
+        Args:
+            args: pytest arguments (options and script path)
+            env: Environment for the run
+            cwd: Working directory (default: current)
+            log_path: File for the run's output (the worker's file
+                descriptors are redirected; default: the service's stdout)
+
+        Returns:
+            pytest exit code
+        """
+        return self._pool.apply(_worker_run, (args, env, cwd or os.getcwd(), log_path, self.log_max_bytes))
+
+    def close(self) -> None:
+        """Stop the workers."""
+        self._pool.terminate()
+        self._pool.join()
+
+
+def make_runner(mode: str = "subprocess", workers: int = 2, log_max_bytes: int = DEFAULT_MAX_BYTES):
+    """
+    Build a runner by mode name.
+
+    Args:
+        mode: One of ``subprocess``, ``inprocess`` or ``warm``
+        workers: Worker processes for the ``warm`` mode
+        log_max_bytes: Size at which a run's log file is rotated
+
+    Returns:
+        The runner
+    """
+    if mode == "subprocess":
+        return SubprocessRunner(log_max_bytes=log_max_bytes)
+    if mode == "inprocess":
+        return InProcessRunner(log_max_bytes=log_max_bytes)
+    if mode == "warm":
+        return WarmWorkerPool(workers=workers, log_max_bytes=log_max_bytes)
+    raise ValueError(f"Unknown runner mode {mode!r}; expected one of {', '.join(RUNNER_MODES)}")
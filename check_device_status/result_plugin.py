@@ -0,0 +1,103 @@
+"""
+pytest plugin that streams machine-readable test results to a JSON-lines file.
+
+Load it with ``-p result_plugin --result-log results.jsonl``. One line is
+written (and flushed) as soon as each test finishes, with the outcome, phase
+durations, the Sauce Labs session id of the test's ``driver`` fixture and the
+device the run was bound to (``SELECTED_DEVICE_ID``).
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, Optional
+
+import pytest
+
+SAUCE_SESSION_RE = re.compile(r"app\.saucelabs\.com/tests/([0-9a-fA-F-]{16,})")
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--result-log",
+        action="store",
+        default=None,
+        help="Write one JSON line per finished test to this file",
+    )
+
+
+def pytest_configure(config):
+    path = config.getoption("result_log")
+    if path:
+        config.pluginmanager.register(ResultLog(path), "result-log-writer")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    driver = getattr(item, "funcargs", {}).get("driver")
+    session_id = getattr(driver, "session_id", None)
+    if session_id:
+        report.user_properties.append(("sauce_session_id", session_id))
+
+
+class ResultLog:
+    """Collects the phases of each test and writes one record per test."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.device_id = os.environ.get("SELECTED_DEVICE_ID")
+        self._tests: Dict[str, Dict[str, Any]] = {}
+        self._file = open(path, "a", encoding="utf-8")
+
+    def pytest_runtest_logreport(self, report):
+        record = self._tests.setdefault(report.nodeid, {
+            "nodeid": report.nodeid,
+            "outcome": "passed",
+            "duration": 0.0,
+            "phases": {},
+            "error": None,
+            "sauce_session_id": None,
+            "device_id": self.device_id,
+        })
+        record["phases"][report.when] = round(report.duration, 3)
+        record["duration"] = round(record["duration"] + report.duration, 3)
+
+        session_id = dict(report.user_properties).get("sauce_session_id") or _session_from_output(report)
+        if session_id:
+            record["sauce_session_id"] = session_id
+
+        if report.failed:
+            record["outcome"] = "failed" if report.when == "call" else "error"
+            record["error"] = record["error"] or _error_summary(report)
+        elif report.skipped and record["outcome"] == "passed":
+            record["outcome"] = "skipped"
+
+        if report.when == "teardown":
+            self._write(self._tests.pop(report.nodeid))
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        # Tests interrupted before teardown still get a record
+        for record in self._tests.values():
+            self._write(record)
+        self._tests.clear()
+        self._file.close()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+
+def _session_from_output(report) -> Optional[str]:
+    """Find a "Sauce Session: .../tests/<id>" line in the captured output."""
+    match = SAUCE_SESSION_RE.search(getattr(report, "capstdout", "") or "")
+    return match.group(1) if match else None
+
+
+def _error_summary(report) -> Optional[str]:
+    """Short "ExceptionType: message" description of a failure."""
+    crash = getattr(report.longrepr, "reprcrash", None)
+    if crash is not None:
+        return crash.message.splitlines()[0][:300] if crash.message else None
+    return str(report.longrepr).splitlines()[-1][:300] if report.longrepr else None
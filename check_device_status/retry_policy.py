@@ -0,0 +1,544 @@
+"""
+Retry policies with a shared retry budget and circuit breaking.
+
+A RetryEngine maps each request to an endpoint policy (method + URL pattern,
+e.g. WebDriver new-session, WebDriver reads, the device API) and turns the
+policy into a BudgetedRetry, a urllib3 Retry that additionally:
+
+- draws every retry from a process-wide RetryBudget: at most ``ratio``
+  retries per request seen in the last ``window`` seconds (plus a small
+  floor), so a struggling hub gets fewer retries under load, not more;
+- gives up once the cumulative backoff of one request would exceed
+  ``max_backoff_total`` instead of sleeping for minutes;
+- counts retries, give-ups and budget denials in RetryMetrics.
+
+A CircuitBreaker per host opens after consecutive failures (connection
+errors, timeouts, 502/503/504) and rejects requests with CircuitOpenError
+until ``reset_timeout`` has passed; then one probe request decides whether
+it closes again. PolicyPoolManager (urllib3, for the WebDriver connection)
+and PolicyAdapter (requests, for the device API) apply all of this.
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError, InvalidHeader, MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+# Responses that mean the server (not the request) is unhealthy
+FAILURE_STATUSES = (502, 503, 504)
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+class CircuitOpenError(HTTPError):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how long one kind of request may be retried."""
+
+    total: int = 3
+    connect: int = 2
+    read: int = 0
+    status: int = 0
+    redirect: int = 5
+    status_forcelist: Tuple[int, ...] = ()
+    # Methods whose read errors and listed statuses are retried; connection
+    # errors are retried for every method (nothing reached the server)
+    allowed_methods: Tuple[str, ...] = IDEMPOTENT_METHODS
+    backoff_factor: float = 0.5
+    backoff_max: float = 4.0
+    # Longest cumulative backoff of one request before giving up
+    max_backoff_total: float = 15.0
+    respect_retry_after_header: bool = True
+
+
+@dataclass(frozen=True)
+class EndpointPolicy:
+    """A retry policy for the requests matching a method and URL pattern."""
+
+    name: str
+    policy: RetryPolicy
+    method: Optional[str] = None
+    # Regular expression searched in the URL path
+    path: Optional[str] = None
+    # Substring of the host
+    host: Optional[str] = None
+
+    def matches(self, method: str, url: str) -> bool:
+        """Whether a request falls under this policy."""
+        if self.method and method.upper() != self.method.upper():
+            return False
+        parts = urlsplit(url)
+        if self.host and self.host not in (parts.hostname or ""):
+            return False
+        return not self.path or re.search(self.path, parts.path) is not None
+
+
+DEFAULT_POLICIES = (
+    # A retried POST /session can start a second session: connection errors only
+    EndpointPolicy("webdriver:new-session", RetryPolicy(total=2, connect=2), method="POST", path=r"/session/?$"),
+    EndpointPolicy("device-api", RetryPolicy(
+        total=3, connect=2, read=1, status=1, status_forcelist=FAILURE_STATUSES,
+        allowed_methods=("GET",), backoff_factor=1.0, max_backoff_total=10.0,
+    ), path=r"/device-management/"),
+    EndpointPolicy("webdriver:read", RetryPolicy(
+        total=3, connect=2, read=1, status=2, status_forcelist=FAILURE_STATUSES,
+    ), method="GET"),
+    # Element commands, scripts, deletes: not safe to replay after a read error
+    EndpointPolicy("webdriver:command", RetryPolicy(total=2, connect=2)),
+)
+
+
+class RetryBudget:
+    """Caps retries to a ratio of recent requests (sliding window)."""
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        window: float = 10.0,
+        min_retries: int = 10,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the budget.
+
+        Args:
+            ratio: Retries allowed per request in the window
+            window: Seconds of history the ratio is computed over
+            min_retries: Retries always allowed per window (low traffic)
+            clock: Time source
+        """
+        self.ratio = ratio
+        self.window = window
+        self.min_retries = min_retries
+        self._clock = clock
+        # [second, requests, retries] buckets, oldest first
+        self._buckets: Deque[List[int]] = deque()
+        self._lock = threading.Lock()
+
+    def _bucket(self) -> List[int]:
+        now = int(self._clock())
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] != now:
+            self._buckets.append([now, 0, 0])
+        return self._buckets[-1]
+
+    def record_request(self) -> None:
+        """Count a first attempt."""
+        with self._lock:
+            self._bucket()[1] += 1
+
+    def try_acquire(self) -> bool:
+        """Take one retry from the budget; False when it is spent."""
+        with self._lock:
+            bucket = self._bucket()
+            requests = sum(b[1] for b in self._buckets)
+            retries = sum(b[2] for b in self._buckets)
+            if retries >= max(self.min_retries, self.ratio * requests):
+                return False
+            bucket[2] += 1
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        """Requests and retries in the current window."""
+        with self._lock:
+            self._bucket()
+            return {
+                "requests": sum(b[1] for b in self._buckets),
+                "retries": sum(b[2] for b in self._buckets),
+            }
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open probe -> closed."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe
+            clock: Time source
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state (an open circuit reports half-open once it may probe)."""
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probing = False
+            # Half-open: one probe at a time
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        """A request got a healthy answer."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_neutral(self) -> None:
+        """A request ended without telling whether the server is healthy."""
+        with self._lock:
+            # Free the half-open probe so the next request can decide
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """A request failed in a way that points at the server."""
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened += 1
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class RetryMetrics:
+    """Counters of requests, retries and give-ups per endpoint policy."""
+
+    def __init__(self):
+        self.counts: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, event: str, count: int = 1) -> None:
+        """Count an event (request, retry:<cause>, gave_up, budget_exhausted, ...)."""
+        with self._lock:
+            key = (endpoint, event)
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def get(self, endpoint: str, event: str) -> int:
+        """One counter's value."""
+        with self._lock:
+            return self.counts.get((endpoint, event), 0)
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        """Counters grouped by endpoint."""
+        with self._lock:
+            items = sorted(self.counts.items())
+        result: Dict[str, Dict[str, int]] = {}
+        for (endpoint, event), count in items:
+            result.setdefault(endpoint, {})[event] = count
+        return result
+
+    def prometheus(self, name: str = "http_retry_events_total") -> str:
+        """Prometheus text exposition of the counters."""
+        with self._lock:
+            items = sorted(self.counts.items())
+        lines = [f"# HELP {name} HTTP requests, retries and give-ups by endpoint policy.", f"# TYPE {name} counter"]
+        lines += [f'{name}{{endpoint="{endpoint}",event="{event}"}} {count}' for (endpoint, event), count in items]
+        return "\n".join(lines) + "\n"
+
+
+class BudgetedRetry(Retry):
+    """urllib3 Retry drawing from a RetryBudget, with a cumulative backoff cap."""
+
+    def __init__(
+        self,
+        *args,
+        engine: Optional["RetryEngine"] = None,
+        endpoint: str = "default",
+        max_backoff_total: Optional[float] = None,
+        backoff_spent: float = 0.0,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.engine = engine
+        self.endpoint = endpoint
+        self.max_backoff_total = max_backoff_total
+        self.backoff_spent = backoff_spent
+
+    def new(self, **kw: Any) -> "BudgetedRetry":
+        kw.setdefault("engine", self.engine)
+        kw.setdefault("endpoint", self.endpoint)
+        kw.setdefault("max_backoff_total", self.max_backoff_total)
+        kw.setdefault("backoff_spent", self.backoff_spent)
+        return super().new(**kw)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        metrics = self.engine.metrics if self.engine is not None else None
+        try:
+            new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        except MaxRetryError:
+            if metrics is not None:
+                metrics.add(self.endpoint, "gave_up")
+            raise
+
+        cause = self._cause(error, response)
+        if cause != "redirect" and self.engine is not None and not self.engine.budget.try_acquire():
+            metrics.add(self.endpoint, "budget_exhausted")
+            reason = error or ResponseError("retry budget exhausted")
+            raise MaxRetryError(_pool, url, reason) from reason
+
+        wait = new_retry.get_backoff_time()
+        if response is not None and self.respect_retry_after_header:
+            try:
+                wait = max(wait, new_retry.get_retry_after(response) or 0.0)
+            except InvalidHeader:
+                pass
+        if self.max_backoff_total is not None and self.backoff_spent + wait > self.max_backoff_total:
+            if metrics is not None:
+                metrics.add(self.endpoint, "gave_up")
+            reason = error or ResponseError("retry backoff limit reached")
+            raise MaxRetryError(_pool, url, reason) from reason
+        new_retry.backoff_spent = self.backoff_spent + wait
+
+        if metrics is not None:
+            metrics.add(self.endpoint, f"retry:{cause}")
+        return new_retry
+
+    def _cause(self, error: Optional[Exception], response) -> str:
+        if error is not None:
+            if self._is_connection_error(error):
+                return "connect"
+            return "read" if self._is_read_error(error) else "other"
+        if response is not None and response.get_redirect_location():
+            return "redirect"
+        return "status"
+
+
+class RetryEngine:
+    """Endpoint policies plus the budget, breakers and metrics they share."""
+
+    def __init__(
+        self,
+        policies: Sequence[EndpointPolicy] = DEFAULT_POLICIES,
+        budget: Optional[RetryBudget] = None,
+        breaker_factory: Callable[[], CircuitBreaker] = CircuitBreaker,
+        metrics: Optional[RetryMetrics] = None,
+        failure_statuses: Sequence[int] = FAILURE_STATUSES
+    ):
+        """
+        Initialize the engine.
+
+        Args:
+            policies: Endpoint policies, first match wins (unmatched requests
+                get urllib3's connection-error-only default)
+            budget: Retry budget (default: 20% of requests per 10 s)
+            breaker_factory: Creates the circuit breaker of each host
+            metrics: Counters (default: a new RetryMetrics)
+            failure_statuses: Response statuses counted as host failures
+        """
+        self.policies = list(policies)
+        self.budget = budget or RetryBudget()
+        self.metrics = metrics or RetryMetrics()
+        self.failure_statuses = frozenset(failure_statuses)
+        self._breaker_factory = breaker_factory
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def with_policies(self, *policies: EndpointPolicy) -> "RetryEngine":
+        """An engine trying ``policies`` first, sharing this one's budget, breakers and metrics."""
+        engine = RetryEngine([*policies, *self.policies], self.budget, self._breaker_factory,
+                             self.metrics, self.failure_statuses)
+        engine._breakers = self._breakers
+        engine._lock = self._lock
+        return engine
+
+    def policy_for(self, method: str, url: str) -> EndpointPolicy:
+        """The first endpoint policy matching a request."""
+        for endpoint in self.policies:
+            if endpoint.matches(method, url):
+                return endpoint
+        return EndpointPolicy("default", RetryPolicy(total=2, connect=2))
+
+    def retry_for(self, method: str, url: str) -> BudgetedRetry:
+        """A fresh Retry for one request."""
+        endpoint = self.policy_for(method, url)
+        policy = endpoint.policy
+        return BudgetedRetry(
+            total=policy.total,
+            connect=policy.connect,
+            read=policy.read,
+            status=policy.status,
+            redirect=policy.redirect,
+            status_forcelist=policy.status_forcelist,
+            allowed_methods=frozenset(policy.allowed_methods),
+            backoff_factor=policy.backoff_factor,
+            backoff_max=policy.backoff_max,
+            respect_retry_after_header=policy.respect_retry_after_header,
+            raise_on_status=False,
+            engine=self,
+            endpoint=endpoint.name,
+            max_backoff_total=policy.max_backoff_total,
+        )
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Circuit breaker of a URL's host."""
+        host = urlsplit(url).netloc.rsplit("@", 1)[-1]
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = self._breaker_factory()
+            return self._breakers[host]
+
+    def before_request(self, method: str, url: str) -> str:
+        """
+        Admit a first attempt.
+
+        Returns:
+            The endpoint policy name
+
+        Raises:
+            CircuitOpenError: The host's circuit is open
+        """
+        endpoint = self.policy_for(method, url).name
+        if not self.breaker(url).allow():
+            self.metrics.add(endpoint, "circuit_rejected")
+            raise CircuitOpenError(f"Circuit open for {urlsplit(url).hostname}; not sending {method} {endpoint}")
+        self.budget.record_request()
+        self.metrics.add(endpoint, "request")
+        return endpoint
+
+    def after_request(self, method: str, url: str, status: Optional[int] = None,
+                      error: Optional[BaseException] = None) -> None:
+        """Feed a request's final outcome to the host's breaker."""
+        breaker = self.breaker(url)
+        if error is not None and not isinstance(error, CircuitOpenError):
+            unhealthy = isinstance(error, (HTTPError, OSError))
+            reason = getattr(error, "reason", None)
+            if isinstance(error, MaxRetryError) and isinstance(reason, ResponseError):
+                unhealthy = False
+            if unhealthy:
+                self.metrics.add(self.policy_for(method, url).name, "failure")
+                breaker.record_failure()
+                return
+        if status is not None and status in self.failure_statuses:
+            self.metrics.add(self.policy_for(method, url).name, "failure")
+            breaker.record_failure()
+        elif error is None:
+            breaker.record_success()
+        elif not isinstance(error, CircuitOpenError):
+            # E.g. too many redirects or the retry budget ran out
+            breaker.record_neutral()
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget window, breaker states and counters."""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            "budget": self.budget.stats(),
+            "breakers": {host: {"state": b.state, "opened": b.opened} for host, b in breakers.items()},
+            "endpoints": self.metrics.to_dict(),
+        }
+
+
+class PolicyPoolManager(urllib3.PoolManager):
+    """PoolManager that applies a RetryEngine to every request."""
+
+    def __init__(self, engine: Optional[RetryEngine] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.engine = engine or default_engine()
+
+    def urlopen(self, method, url, redirect=True, **kw):
+        # Clients sharing this manager's connections pass their own engine
+        engine = kw.pop("engine", None) or self.engine
+        if isinstance(kw.get("retries"), BudgetedRetry):
+            # A redirect this manager is already following
+            return super().urlopen(method, url, redirect=redirect, **kw)
+        engine.before_request(method, url)
+        kw["retries"] = engine.retry_for(method, url)
+        try:
+            response = super().urlopen(method, url, redirect=redirect, **kw)
+        except Exception as e:
+            engine.after_request(method, url, error=e)
+            raise
+        engine.after_request(method, url, status=response.status)
+        return response
+
+
+def policy_http_client(*policies: EndpointPolicy, **pool_kwargs) -> PolicyPoolManager:
+    """
+    HTTP client for DriverParams.http_client.
+
+    Args:
+        policies: Extra endpoint policies tried before the defaults
+        pool_kwargs: urllib3.PoolManager arguments
+
+    Returns:
+        A PolicyPoolManager on the process-wide engine
+    """
+    engine = default_engine()
+    return PolicyPoolManager(engine.with_policies(*policies) if policies else engine, **pool_kwargs)
+
+
+class PolicyAdapter(HTTPAdapter):
+    """requests adapter with the retry policy of one endpoint."""
+
+    def __init__(self, url: str, method: str = "GET", engine: Optional[RetryEngine] = None, **kwargs):
+        """
+        Initialize the adapter.
+
+        Args:
+            url: Endpoint whose policy the adapter's retries follow
+            method: Method the policy is looked up for
+            engine: Engine (default: the process-wide one)
+            kwargs: HTTPAdapter arguments (pool sizes)
+        """
+        self.engine = engine or default_engine()
+        super().__init__(max_retries=self.engine.retry_for(method, url), **kwargs)
+
+    def send(self, request, **kwargs):
+        self.engine.before_request(request.method, request.url)
+        try:
+            response = super().send(request, **kwargs)
+        except Exception as e:
+            # requests exceptions are OSErrors: the host counts as unhealthy
+            self.engine.after_request(request.method, request.url, error=e)
+            raise
+        self.engine.after_request(request.method, request.url, status=response.status_code)
+        return response
+
+
+_default: Optional[RetryEngine] = None
+_default_lock = threading.Lock()
+
+
+def default_engine() -> RetryEngine:
+    """Process-wide engine shared by every client, so the budget is global."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RetryEngine()
+        return _default
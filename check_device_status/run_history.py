@@ -0,0 +1,280 @@
+"""
+Historical runtime store and batch planner for the device checker service.
+
+Every pytest run is recorded in a small SQLite database (script, device,
+duration, exit code, queue wait). The store predicts duration percentiles per
+script, and the planner uses those predictions to spread a batch of scripts
+over devices longest-processing-time-first and to size the device pool for a
+deadline.
+"""
+
+import heapq
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    script TEXT NOT NULL,
+    device_id TEXT,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    exit_code INTEGER NOT NULL,
+    queue_wait REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_script_device ON runs (script, device_id);
+"""
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """
+    Linear-interpolated percentile of a sequence.
+
+    Args:
+        values: Observations (any order)
+        q: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or None for an empty sequence
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class RunHistory:
+    """SQLite-backed record of past pytest runs."""
+
+    def __init__(self, path: str = "run_history.db"):
+        """
+        Open (or create) the history database.
+
+        Args:
+            path: SQLite file path (":memory:" for a throwaway store)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def record(
+        self,
+        script: str,
+        device_id: Optional[str],
+        duration: float,
+        exit_code: int,
+        queue_wait: float = 0.0,
+        started_at: Optional[float] = None
+    ) -> None:
+        """
+        Store one finished run.
+
+        Args:
+            script: pytest script that ran
+            device_id: Device it ran on
+            duration: Wall-clock seconds of the run
+            exit_code: pytest exit code
+            queue_wait: Seconds the script waited for a device
+            started_at: Epoch seconds the run started (default: now - duration)
+        """
+        if started_at is None:
+            started_at = time.time() - duration
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs (script, device_id, started_at, duration, exit_code, queue_wait) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (script, device_id, started_at, duration, exit_code, queue_wait),
+            )
+            self._conn.commit()
+
+    def durations(
+        self,
+        script: str,
+        device_id: Optional[str] = None,
+        limit: int = 500
+    ) -> List[float]:
+        """
+        Most recent run durations of a script.
+
+        Args:
+            script: pytest script
+            device_id: Restrict to one device (default: all devices)
+            limit: Maximum number of runs to return
+
+        Returns:
+            Durations in seconds, newest first
+        """
+        query = "SELECT duration FROM runs WHERE script = ?"
+        params: list = [script]
+        if device_id is not None:
+            query += " AND device_id = ?"
+            params.append(device_id)
+        query += " ORDER BY started_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+    def predict(
+        self,
+        script: str,
+        device_id: Optional[str] = None,
+        percentiles: Sequence[float] = (50, 90, 95)
+    ) -> Dict[str, float]:
+        """
+        Predict duration percentiles for a script.
+
+        Falls back to all devices when the given device has no history.
+
+        Args:
+            script: pytest script
+            device_id: Device the script would run on
+            percentiles: Percentiles to compute
+
+        Returns:
+            Mapping such as ``{"p50": 22.4, "p90": 31.0, "p95": 283.2}``;
+            empty if the script has never run
+        """
+        values = self.durations(script, device_id)
+        if not values and device_id is not None:
+            values = self.durations(script)
+        if not values:
+            return {}
+        return {f"p{q:g}": percentile(values, q) for q in percentiles}
+
+    def summary(self) -> List[Dict[str, object]]:
+        """
+        Per-script, per-device run counts, failures and mean duration/queue wait.
+
+        Returns:
+            One dict per (script, device) pair
+        """
+        query = (
+            "SELECT script, device_id, COUNT(*), SUM(exit_code != 0), AVG(duration), AVG(queue_wait) "
+            "FROM runs GROUP BY script, device_id ORDER BY script, device_id"
+        )
+        with self._lock:
+            rows = self._conn.execute(query).fetchall()
+        return [
+            {
+                "script": script,
+                "device_id": device_id,
+                "runs": runs,
+                "failures": failures,
+                "mean_duration": mean_duration,
+                "mean_queue_wait": mean_queue_wait,
+            }
+            for script, device_id, runs, failures, mean_duration, mean_queue_wait in rows
+        ]
+
+
+class HistoryEstimator:
+    """Runtime estimator for the scheduler backed by a RunHistory."""
+
+    def __init__(self, history: RunHistory, quantile: float = 50, default: float = 60.0):
+        """
+        Initialize the estimator.
+
+        Args:
+            history: Store to read durations from
+            quantile: Percentile used as the expected duration
+            default: Seconds assumed for a script that has never run
+        """
+        self.history = history
+        self.quantile = quantile
+        self.default = default
+
+    def estimate(self, script: str, device_id: Optional[str] = None) -> float:
+        """Return the expected duration of a script in seconds."""
+        prediction = self.history.predict(script, device_id, percentiles=(self.quantile,))
+        return prediction.get(f"p{self.quantile:g}", self.default)
+
+    def record(self, script: str, device_id: Optional[str], duration: float) -> None:
+        """No-op: the service writes finished runs to the history itself."""
+
+
+@dataclass
+class BatchPlan:
+    """Assignment of a batch of scripts to devices."""
+
+    assignments: Dict[str, List[str]] = field(default_factory=dict)
+    loads: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def makespan(self) -> float:
+        """Expected seconds until the last device finishes."""
+        return max(self.loads.values(), default=0.0)
+
+
+def plan_batch(
+    scripts: Sequence[str],
+    device_ids: Sequence[str],
+    estimate
+) -> BatchPlan:
+    """
+    Spread scripts over devices longest-processing-time-first.
+
+    Each script, longest expected duration first, goes to the device with the
+    least expected work so far.
+
+    Args:
+        scripts: Scripts in the batch (repeat a script to run it several times)
+        device_ids: Devices available to the batch
+        estimate: Callable ``(script, device_id) -> seconds``, e.g.
+            ``HistoryEstimator.estimate``
+
+    Returns:
+        The plan with per-device script lists and expected loads
+    """
+    plan = BatchPlan(
+        assignments={device_id: [] for device_id in device_ids},
+        loads={device_id: 0.0 for device_id in device_ids},
+    )
+    if not device_ids:
+        return plan
+
+    heap = [(0.0, index, device_id) for index, device_id in enumerate(device_ids)]
+    ordered = sorted(scripts, key=lambda script: estimate(script, None), reverse=True)
+    for script in ordered:
+        load, index, device_id = heapq.heappop(heap)
+        load += estimate(script, device_id)
+        plan.assignments[device_id].append(script)
+        plan.loads[device_id] = load
+        heapq.heappush(heap, (load, index, device_id))
+    return plan
+
+
+def devices_needed(
+    scripts: Sequence[str],
+    deadline: float,
+    estimate,
+    max_devices: int = 64
+) -> Optional[int]:
+    """
+    Smallest number of devices that finishes a batch within a deadline.
+
+    Args:
+        scripts: Scripts in the batch
+        deadline: Seconds available for the batch
+        estimate: Callable ``(script, device_id) -> seconds``
+        max_devices: Largest pool size to consider
+
+    Returns:
+        Device count, or None if even ``max_devices`` devices miss the deadline
+    """
+    for count in range(1, max_devices + 1):
+        device_ids = [f"device-{index + 1}" for index in range(count)]
+        if plan_batch(scripts, device_ids, estimate).makespan <= deadline:
+            return count
+    return None
@@ -0,0 +1,180 @@
+"""
+Per-run capture of pytest output for the device checker service.
+
+Instead of every pytest child writing into the service's stdout (one
+interleaved log for all runs), each run's stdout and stderr go to their own
+file under the run log directory. The output is read from a pipe in fixed
+size chunks as it is produced, so memory stays bounded however much a run
+prints and the child never blocks on a full pipe; the file is rotated by
+size (``.1`` is the newest backup). Warm worker processes redirect their file
+descriptors into the same kind of pipe for the length of a run, and
+in-process runs redirect ``sys.stdout``/``sys.stderr``.
+"""
+
+import io
+import os
+import re
+import sys
+import threading
+import uuid
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from datetime import datetime
+from typing import BinaryIO, Iterator, Optional
+
+# Bytes read from a run's pipe at a time
+CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_BACKUPS = 2
+
+
+class RunLog:
+    """Output of one run, written to its own file and rotated by size."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS):
+        """
+        Open the run's log file.
+
+        Args:
+            path: Log file of the run
+            max_bytes: Size that triggers a rotation (0 disables)
+            backups: Rotated files kept; older output is discarded
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "ab")
+
+    def write(self, data: bytes) -> None:
+        """Append output, rotating the file first when it would grow too big."""
+        with self._lock:
+            size = self._file.tell()
+            if self.max_bytes and size and size + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self.bytes_written += len(data)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        if self.backups:
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "wb")
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "RunLog":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _TextSink(io.TextIOBase):
+    """Text stream that encodes into a RunLog (for redirect_stdout)."""
+
+    def __init__(self, run_log: RunLog):
+        self._run_log = run_log
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self._run_log.write(text.encode("utf-8", "replace"))
+        return len(text)
+
+
+def run_log_path(directory: str, script: str, device_id: Optional[str] = None) -> str:
+    """Unique log file path for a run of a script on a device."""
+    stem = os.path.splitext(os.path.basename(script))[0]
+    name = "-".join([
+        datetime.now().strftime("%Y%m%d-%H%M%S"),
+        re.sub(r"[^\w.-]+", "_", stem),
+        re.sub(r"[^\w.-]+", "_", device_id or "any"),
+        uuid.uuid4().hex[:8],
+    ])
+    return os.path.join(directory, f"{name}.log")
+
+
+def pump(stream: BinaryIO, run_log: RunLog, chunk_size: int = CHUNK_SIZE) -> None:
+    """Copy a pipe into a run log until EOF, one bounded chunk at a time."""
+    read = getattr(stream, "read1", stream.read)
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            return
+        run_log.write(chunk)
+
+
+async def pump_async(reader, run_log: RunLog, chunk_size: int = CHUNK_SIZE) -> None:
+    """Copy an asyncio StreamReader into a run log until EOF."""
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            return
+        run_log.write(chunk)
+
+
+def tail(path: str, max_bytes: int = 4096) -> str:
+    """Last lines of a run log (at most ``max_bytes``), without reading it all."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - max_bytes))
+            data = f.read()
+    except OSError:
+        return ""
+    if len(data) == max_bytes and b"\n" in data:
+        # Drop the partial first line
+        data = data.split(b"\n", 1)[1]
+    return data.decode("utf-8", "replace").rstrip()
+
+
+@contextmanager
+def captured_fds(run_log: RunLog) -> Iterator[None]:
+    """
+    Send this process's stdout and stderr file descriptors to a run log.
+
+    For worker processes only: everything the process writes to fd 1 and 2
+    (including C extensions and ``print``) goes through a pipe into the run
+    log until the block exits.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    read_fd, write_fd = os.pipe()
+    stream = os.fdopen(read_fd, "rb")
+    reader = threading.Thread(target=pump, args=(stream, run_log), daemon=True)
+    reader.start()
+    saved = [os.dup(1), os.dup(2)]
+    os.dup2(write_fd, 1)
+    os.dup2(write_fd, 2)
+    os.close(write_fd)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in saved:
+            os.close(fd)
+        # The last write end is closed: the reader sees EOF
+        reader.join()
+        stream.close()
+
+
+@contextmanager
+def captured_streams(run_log: RunLog) -> Iterator[None]:
+    """Send ``sys.stdout``/``sys.stderr`` to a run log (in-process runs)."""
+    sink = _TextSink(run_log)
+    with redirect_stdout(sink), redirect_stderr(sink):
+        yield
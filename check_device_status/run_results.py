@@ -0,0 +1,171 @@
+"""
+Structured results of pytest runs dispatched by the device checker service.
+
+Each run writes per-test JSON lines through ``result_plugin``; this module
+reads them back into a RunResult and aggregates every run of the service in
+a RunSummary: running totals that can be exported as JSON, with the detail
+of every run appended to a JSON-lines file.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class RunResult:
+    """Outcome of one pytest run on one device."""
+
+    script: str
+    device_id: Optional[str]
+    exit_code: int
+    started_at: float
+    duration: float
+    queue_wait: float = 0.0
+    tests: List[Dict[str, Any]] = field(default_factory=list)
+    # File with the run's output, when the service captured it
+    log_path: Optional[str] = None
+
+    @property
+    def outcomes(self) -> Dict[str, int]:
+        """Number of tests per outcome (passed, failed, error, skipped)."""
+        return dict(Counter(test["outcome"] for test in self.tests))
+
+    @property
+    def sauce_session_ids(self) -> List[str]:
+        """Distinct Sauce Labs session ids seen in the run, in order."""
+        ids = [test["sauce_session_id"] for test in self.tests if test.get("sauce_session_id")]
+        return list(dict.fromkeys(ids))
+
+    def describe(self) -> str:
+        """One-line summary for the service log."""
+        outcomes = ", ".join(f"{count} {name}" for name, count in sorted(self.outcomes.items()))
+        line = f"{outcomes or 'no tests reported'} in {self.duration:.1f}s"
+        if self.sauce_session_ids:
+            line += " — sessions: " + ", ".join(self.sauce_session_ids)
+        return line
+
+
+def new_result_log() -> str:
+    """Create an empty per-run result file and return its path."""
+    fd, path = tempfile.mkstemp(prefix="pytest-results-", suffix=".jsonl")
+    os.close(fd)
+    return path
+
+
+def read_result_log(path: str, remove: bool = True) -> List[Dict[str, Any]]:
+    """
+    Read the per-test records written by result_plugin.
+
+    Args:
+        path: JSON-lines file of the run
+        remove: Delete the file afterwards
+
+    Returns:
+        Test records in completion order
+    """
+    tests = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        tests.append(json.loads(line))
+                    except ValueError:
+                        continue
+    except FileNotFoundError:
+        return []
+    finally:
+        if remove and os.path.exists(path):
+            os.remove(path)
+    return tests
+
+
+class RunSummary:
+    """Running totals of every run the service dispatched."""
+
+    def __init__(self, keep_runs: bool = True, results_path: Optional[str] = None):
+        """
+        Initialize the summary.
+
+        Args:
+            keep_runs: Keep every RunResult (with its tests) in ``runs``; the
+                service turns this off so memory does not grow with each run
+            results_path: JSON-lines file that gets one line per run with its
+                tests, appended as runs finish; lines from earlier service
+                runs are kept
+        """
+        self.keep_runs = keep_runs
+        self.results_path = results_path
+        self.runs: List[RunResult] = []
+        self.run_count = 0
+        self.failed_runs = 0
+        self.tests: Counter = Counter()
+        # Per script: runs, failed_runs, total_duration, devices
+        self._scripts: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, result: RunResult) -> None:
+        """Add a finished run to the totals (and to the results file)."""
+        line = json.dumps(asdict(result)) + "\n" if self.results_path else None
+        with self._lock:
+            self.run_count += 1
+            self.failed_runs += result.exit_code != 0
+            self.tests.update(result.outcomes)
+            entry = self._scripts.setdefault(result.script, {
+                "runs": 0, "failed_runs": 0, "total_duration": 0.0, "devices": Counter(),
+            })
+            entry["runs"] += 1
+            entry["failed_runs"] += result.exit_code != 0
+            entry["total_duration"] += result.duration
+            if result.device_id:
+                entry["devices"][result.device_id] += 1
+            if self.keep_runs:
+                self.runs.append(result)
+            if line is not None:
+                with open(self.results_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Totals and per-script aggregates, plus every run when they are kept."""
+        with self._lock:
+            scripts = {
+                script: {
+                    "runs": entry["runs"],
+                    "failed_runs": entry["failed_runs"],
+                    "devices": dict(entry["devices"]),
+                    "mean_duration": round(entry["total_duration"] / entry["runs"], 3),
+                }
+                for script, entry in self._scripts.items()
+            }
+            summary = {
+                "generated_at": datetime.now().isoformat(timespec="seconds"),
+                "runs": self.run_count,
+                "failed_runs": self.failed_runs,
+                "tests": dict(self.tests),
+                "scripts": scripts,
+            }
+            if self.keep_runs:
+                summary["results"] = [asdict(run) for run in self.runs]
+            if self.results_path:
+                summary["results_file"] = self.results_path
+        return summary
+
+    def write_json(self, path: str) -> None:
+        """Export the summary, replacing the file atomically."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def results_path_for(summary_json: str) -> str:
+    """Per-run results file written next to a summary file."""
+    return os.path.splitext(summary_json)[0] + ".runs.jsonl"
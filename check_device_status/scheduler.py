@@ -0,0 +1,245 @@
+"""
+Job scheduler for the device checker service.
+
+Holds a queue of test jobs (a script plus the device capabilities it needs)
+and assigns them to free devices from the current device snapshot. Jobs are
+ordered by priority, then fair share between apps, then shortest expected
+duration first; each job goes to the matching free device that the fewest
+other pending jobs could use, so constrained jobs are not starved.
+"""
+
+import itertools
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Capability names accepted in job specs and the device record fields they
+# are matched against (first field present wins).
+CAPABILITY_FIELDS = {
+    "model": ("modelName", "name", "id"),
+    "platform_version": ("osVersion", "platformVersion", "os_version"),
+}
+
+
+@dataclass
+class Job:
+    """A test script and the device capabilities it requires."""
+
+    script: str
+    app: Optional[str] = None
+    priority: int = 0
+    capabilities: Dict[str, str] = field(default_factory=dict)
+    seq: int = 0
+    submitted_at: float = field(default_factory=time.monotonic)
+
+    def matches(self, device: Dict[str, Any]) -> bool:
+        """
+        Check whether a device record satisfies every required capability.
+
+        Capability values are regular expressions searched in the mapped
+        device field; ``platform_version`` is matched as a prefix.
+
+        Args:
+            device: Device record from the API snapshot
+
+        Returns:
+            True if the device can run this job
+        """
+        for name, pattern in self.capabilities.items():
+            fields = CAPABILITY_FIELDS.get(name, (name,))
+            value = next((device[f] for f in fields if device.get(f) is not None), None)
+            if value is None:
+                return False
+            if name == "platform_version":
+                pattern = "^" + re.escape(str(pattern))
+            if not re.search(pattern, str(value)):
+                return False
+        return True
+
+
+class RuntimeEstimator:
+    """Exponentially weighted moving average of run durations per script."""
+
+    def __init__(self, default: float = 60.0, alpha: float = 0.3):
+        """
+        Initialize the estimator.
+
+        Args:
+            default: Seconds assumed for a script that has never run
+            alpha: Weight of the newest observation
+        """
+        self.default = default
+        self.alpha = alpha
+        self._estimates: Dict[str, float] = {}
+
+    def estimate(self, script: str, device_id: Optional[str] = None) -> float:
+        """Return the expected duration of a script in seconds."""
+        return self._estimates.get(script, self.default)
+
+    def record(self, script: str, device_id: Optional[str], duration: float) -> None:
+        """Fold an observed duration into the script's estimate."""
+        previous = self._estimates.get(script)
+        if previous is None:
+            self._estimates[script] = duration
+        else:
+            self._estimates[script] = self.alpha * duration + (1 - self.alpha) * previous
+
+
+class Scheduler:
+    """Priority / fair-share / shortest-expected-duration-first job matcher."""
+
+    def __init__(
+        self,
+        jobs: Optional[Iterable[Job]] = None,
+        estimator: Optional[RuntimeEstimator] = None
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            jobs: Initial jobs to queue
+            estimator: Source of expected durations (default: in-memory EWMA)
+        """
+        self.estimator = estimator or RuntimeEstimator()
+        self._pending: List[Job] = []
+        self._seq = itertools.count()
+        # Device-seconds dispatched per app, used for fair share
+        self._usage: Dict[Optional[str], float] = {}
+        self._expected: Dict[int, float] = {}
+        for job in jobs or []:
+            self.submit(job)
+
+    def submit(self, job: Job) -> None:
+        """Add a job to the queue."""
+        job.seq = next(self._seq)
+        self._pending.append(job)
+        self._usage.setdefault(job.app, 0.0)
+
+    def has_pending(self) -> bool:
+        """True while there are jobs waiting for a device."""
+        return bool(self._pending)
+
+    @property
+    def pending(self) -> List[Job]:
+        """Jobs waiting for a device, in submission order."""
+        return list(self._pending)
+
+    def _order_key(self, job: Job) -> Tuple[int, float, float, int]:
+        return (
+            -job.priority,
+            self._usage.get(job.app, 0.0),
+            self.estimator.estimate(job.script),
+            job.seq,
+        )
+
+    def assign(
+        self,
+        free_devices: Dict[str, Dict[str, Any]],
+        limit: Optional[int] = None
+    ) -> List[Tuple[Job, str]]:
+        """
+        Match pending jobs to free devices.
+
+        Args:
+            free_devices: Device ID to record for every device that can take
+                a job now (AVAILABLE and not claimed)
+            limit: Maximum number of assignments to make
+
+        Returns:
+            (job, device_id) pairs; assigned jobs leave the queue
+        """
+        free = dict(free_devices)
+        assignments: List[Tuple[Job, str]] = []
+
+        while free and self._pending and (limit is None or len(assignments) < limit):
+            candidates = [
+                job for job in self._pending
+                if any(job.matches(device) for device in free.values())
+            ]
+            if not candidates:
+                break
+            job = min(candidates, key=self._order_key)
+            device_id = self._best_device(job, free)
+
+            self._pending.remove(job)
+            del free[device_id]
+            expected = self.estimator.estimate(job.script, device_id)
+            self._expected[job.seq] = expected
+            self._usage[job.app] = self._usage.get(job.app, 0.0) + expected
+            assignments.append((job, device_id))
+
+        return assignments
+
+    def _best_device(self, job: Job, free: Dict[str, Dict[str, Any]]) -> str:
+        """Pick the matching device that the fewest other pending jobs can use."""
+        def contention(device_id: str) -> int:
+            device = free[device_id]
+            return sum(1 for other in self._pending if other is not job and other.matches(device))
+
+        matching = [device_id for device_id, device in free.items() if job.matches(device)]
+        return min(matching, key=contention)
+
+    def drop_unschedulable(self, devices: Dict[str, Dict[str, Any]]) -> List[Job]:
+        """
+        Remove pending jobs that no device in the pool could ever run.
+
+        Args:
+            devices: Records of every monitored device, whatever their state
+
+        Returns:
+            The dropped jobs
+        """
+        dropped = [
+            job for job in self._pending
+            if not any(job.matches(device) for device in devices.values())
+        ]
+        for job in dropped:
+            self._pending.remove(job)
+        return dropped
+
+    def complete(self, job: Job, device_id: str, duration: float) -> None:
+        """
+        Record a finished job.
+
+        Replaces the expected duration charged to the job's app with the real
+        one and updates the runtime estimate.
+
+        Args:
+            job: The job that ran
+            device_id: Device it ran on
+            duration: Wall-clock seconds of the run
+        """
+        expected = self._expected.pop(job.seq, 0.0)
+        self._usage[job.app] = self._usage.get(job.app, 0.0) - expected + duration
+        self.estimator.record(job.script, device_id, duration)
+
+
+def load_jobs(path: str) -> List[Job]:
+    """
+    Load a job list from a JSON file.
+
+    The file holds a list of objects with ``script`` and optional ``app``,
+    ``priority``, ``capabilities`` (e.g. ``{"model": "iPhone_SE",
+    "platform_version": "16"}``) and ``repeat`` (number of copies to queue).
+
+    Args:
+        path: Path to the JSON job file
+
+    Returns:
+        Jobs in file order
+    """
+    with open(path) as f:
+        specs = json.load(f)
+
+    jobs = []
+    for spec in specs:
+        for _ in range(int(spec.get("repeat", 1))):
+            jobs.append(Job(
+                script=spec["script"],
+                app=spec.get("app"),
+                priority=int(spec.get("priority", 0)),
+                capabilities=dict(spec.get("capabilities", {})),
+            ))
+    return jobs
@@ -0,0 +1,203 @@
+"""
+Non-blocking structured logging for the device checker service.
+
+Callers only put records on a bounded queue (QueueHandler); a QueueListener
+thread formats them and writes the console and the service log file, so a
+slow terminal or disk never stalls polling or run dispatch. The log file
+gets one JSON object per line (time, level, logger, message and any
+``extra`` fields such as script, device_id or exit_code) and is rotated by
+size and, optionally, by age. When the queue is full, records are dropped
+and counted instead of blocking the caller.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+LOGGER_NAME = "device_checker"
+
+LOG_FORMATS = ("text", "json")
+
+# Records waiting for the listener thread before new ones are dropped
+QUEUE_SIZE = 10000
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+
+TEXT_FORMAT = "[%(asctime)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Attributes every LogRecord has; anything else came from ``extra``
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object, ``extra`` fields included."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RotatingLogHandler(RotatingFileHandler):
+    """File handler that rotates on size or once the file is too old."""
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backups: int = DEFAULT_BACKUPS,
+        max_age: Optional[float] = None
+    ):
+        """
+        Initialize the handler.
+
+        Args:
+            filename: Log file path
+            max_bytes: Size that triggers a rotation (0 disables)
+            backups: Rotated files kept (``.1`` is the newest)
+            max_age: Seconds after which the file is rotated (None disables)
+        """
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        self.max_age = max_age
+        self._opened_at = time.time()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.max_age and time.time() - self._opened_at >= self.max_age:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self._opened_at = time.time()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking on a full queue."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # emit() runs under the handler lock
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than fail when stopping with a full queue
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_lock = threading.Lock()
+_atexit_registered = False
+
+
+def setup_logging(
+    log_file: Optional[str] = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    backups: int = DEFAULT_BACKUPS,
+    max_age: Optional[float] = None,
+    console_format: str = "text",
+    level: int = logging.INFO,
+    queue_size: int = QUEUE_SIZE
+) -> logging.Logger:
+    """
+    (Re)configure the service logger.
+
+    Args:
+        log_file: JSON-lines service log (None logs to the console only)
+        max_bytes: Size that rotates the service log (0 disables)
+        backups: Rotated service logs kept
+        max_age: Seconds after which the service log is rotated
+        console_format: "text" (timestamped lines) or "json"
+        level: Lowest level logged
+        queue_size: Records buffered for the listener thread
+
+    Returns:
+        The service logger
+    """
+    global _listener, _queue_handler, _atexit_registered
+    if console_format not in LOG_FORMATS:
+        raise ValueError(f"Log format must be one of {', '.join(LOG_FORMATS)}")
+    with _lock:
+        _stop()
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(
+            JsonFormatter() if console_format == "json" else logging.Formatter(TEXT_FORMAT, DATE_FORMAT)
+        )
+        handlers = [console]
+        if log_file:
+            file_handler = RotatingLogHandler(log_file, max_bytes, backups, max_age)
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+
+        log_queue: queue.Queue = queue.Queue(queue_size)
+        _queue_handler = DroppingQueueHandler(log_queue)
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.addHandler(_queue_handler)
+        logger.setLevel(level)
+        logger.propagate = False
+        _listener = _Listener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        if not _atexit_registered:
+            atexit.register(stop_logging)
+            _atexit_registered = True
+        return logger
+
+
+def get_logger() -> logging.Logger:
+    """The service logger, configured for the console on first use."""
+    with _lock:
+        configured = _listener is not None
+    return logging.getLogger(LOGGER_NAME) if configured else setup_logging()
+
+
+def dropped_records() -> int:
+    """Records dropped so far because the queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def stop_logging() -> None:
+    """Write out the queued records and close the handlers."""
+    with _lock:
+        _stop()
+
+
+def _stop() -> None:
+    # Caller holds _lock
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    if _queue_handler.dropped:
+        sys.stderr.write(f"{_queue_handler.dropped} log records dropped (queue full)\n")
+    _listener = None
+    _queue_handler = None
@@ -0,0 +1,276 @@
+"""
+Prometheus metrics for the device checker service.
+
+ServiceMetrics counts what the checker does: device API polls (by result,
+with a latency histogram) and API errors (by HTTP status), the time from a
+device showing up AVAILABLE to the pytest start on it, how long every device
+spent running this checker's runs (busy) or sat AVAILABLE without one (idle),
+run durations by script and outcome, queue waits by script, and the run
+count against ``max_runs``. MetricsServer serves them as Prometheus text on
+``/metrics`` from a background thread, using only the standard library.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from command_metrics import PROMETHEUS_BUCKETS, LatencyHistogram
+
+# Bucket boundaries (seconds) of the wait between AVAILABLE and pytest start
+DISPATCH_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Bucket boundaries (seconds) of run durations and queue waits
+RUN_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class ServiceMetrics:
+    """Counters and histograms of one checker instance."""
+
+    def __init__(self, max_runs: Optional[int] = None):
+        """
+        Initialize the registry.
+
+        Args:
+            max_runs: The checker's run limit (None for unlimited)
+        """
+        self.max_runs = max_runs
+        self.run_count = 0
+        self.polls: Dict[str, int] = {}
+        self.api_errors: Dict[str, int] = {}
+        self.poll_latency = LatencyHistogram()
+        self.dispatch_latency = LatencyHistogram()
+        self.runs: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.queue_waits: Dict[str, LatencyHistogram] = {}
+        # Per device: (busy | idle | other, monotonic time it started)
+        self._device_state: Dict[str, Tuple[str, float]] = {}
+        self._device_seconds: Dict[Tuple[str, str], float] = {}
+        # Wall-clock time each device was first seen AVAILABLE and not yet used
+        self._available_since: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record_poll(self, seconds: float, result: str, status: Optional[int] = None) -> None:
+        """
+        Record one device API request.
+
+        Args:
+            seconds: Request latency
+            result: "ok", "not_modified" or "error"
+            status: HTTP status of a failed request (None for network errors)
+        """
+        with self._lock:
+            self.polls[result] = self.polls.get(result, 0) + 1
+            self.poll_latency.record(seconds)
+            if result == "error":
+                label = str(status) if status else "network"
+                self.api_errors[label] = self.api_errors.get(label, 0) + 1
+
+    def record_states(self, states: Dict[str, Optional[str]], fetched_at: float) -> None:
+        """
+        Note the device states of a new device list.
+
+        Args:
+            states: State of every monitored device (None when not found)
+            fetched_at: Epoch seconds the list was fetched
+        """
+        now = time.monotonic()
+        with self._lock:
+            for device_id, state in states.items():
+                if self._device_state.get(device_id, ("",))[0] == "busy":
+                    continue
+                if state == "AVAILABLE":
+                    self._available_since.setdefault(device_id, fetched_at)
+                    self._enter(device_id, "idle", now)
+                else:
+                    self._available_since.pop(device_id, None)
+                    self._enter(device_id, "other", now)
+
+    def run_started(self, device_id: Optional[str], script: str, queue_wait: float = 0.0) -> None:
+        """Note a pytest start on a device."""
+        device_id = device_id or ""
+        with self._lock:
+            available_since = self._available_since.pop(device_id, None)
+            if available_since is not None:
+                self.dispatch_latency.record(max(0.0, time.time() - available_since))
+            self.queue_waits.setdefault(script, LatencyHistogram()).record(queue_wait)
+            self._enter(device_id, "busy", time.monotonic())
+
+    def run_finished(
+        self, device_id: Optional[str], script: str, outcome: str, duration: Optional[float] = None
+    ) -> None:
+        """
+        Note the end of a run started with run_started().
+
+        Args:
+            device_id: Device of the run
+            script: Script of the run
+            outcome: "passed", "failed" or "error"
+            duration: Run duration (default: time since run_started)
+        """
+        device_id = device_id or ""
+        now = time.monotonic()
+        with self._lock:
+            state, since = self._device_state.get(device_id, ("", now))
+            if state != "busy":
+                # Already counted (an error after the results were recorded)
+                return
+            self.runs.setdefault((script, outcome), LatencyHistogram()).record(
+                now - since if duration is None else duration
+            )
+            # Unknown until the next device list shows it again
+            self._enter(device_id, "other", now)
+
+    def set_run_count(self, run_count: int) -> None:
+        """Update the run counter compared against ``max_runs``."""
+        with self._lock:
+            self.run_count = run_count
+
+    def _enter(self, device_id: str, state: str, now: float) -> None:
+        # Caller holds self._lock
+        previous, since = self._device_state.get(device_id, ("", now))
+        if previous in ("busy", "idle"):
+            key = (device_id, previous)
+            self._device_seconds[key] = self._device_seconds.get(key, 0.0) + now - since
+        self._device_state[device_id] = (state, now)
+
+    def device_seconds(self) -> Dict[Tuple[str, str], float]:
+        """Busy and idle seconds per device, the current stretch included."""
+        now = time.monotonic()
+        with self._lock:
+            seconds = dict(self._device_seconds)
+            for device_id, (state, since) in self._device_state.items():
+                if state in ("busy", "idle"):
+                    seconds[(device_id, state)] = seconds.get((device_id, state), 0.0) + now - since
+        return seconds
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition of every metric."""
+        device_seconds = self.device_seconds()
+        with self._lock:
+            lines: List[str] = []
+            _counter(lines, "device_checker_polls_total", "Device API requests by result.",
+                     [({"result": result}, count) for result, count in sorted(self.polls.items())])
+            _histogram(lines, "device_checker_poll_duration_seconds", "Device API request latency.",
+                       [({}, self.poll_latency)], PROMETHEUS_BUCKETS)
+            _counter(lines, "device_checker_api_errors_total", "Failed device API requests by HTTP status.",
+                     [({"status": status}, count) for status, count in sorted(self.api_errors.items())])
+            _histogram(lines, "device_checker_dispatch_latency_seconds",
+                       "Time from a device showing AVAILABLE to the pytest start on it.",
+                       [({}, self.dispatch_latency)], DISPATCH_BUCKETS)
+            for state in ("busy", "idle"):
+                _counter(lines, f"device_checker_device_{state}_seconds_total",
+                         "Seconds a device ran this checker's pytest runs." if state == "busy"
+                         else "Seconds a device was AVAILABLE without a run of this checker.",
+                         [({"device": device_id}, round(seconds, 3))
+                          for (device_id, key), seconds in sorted(device_seconds.items()) if key == state])
+            _histogram(lines, "device_checker_run_duration_seconds", "Pytest run duration by script and outcome.",
+                       [({"script": script, "outcome": outcome}, histogram)
+                        for (script, outcome), histogram in sorted(self.runs.items())], RUN_BUCKETS)
+            _histogram(lines, "device_checker_queue_wait_seconds", "Time a script waited for a device.",
+                       [({"script": script}, histogram) for script, histogram in sorted(self.queue_waits.items())],
+                       RUN_BUCKETS)
+            in_progress = sum(state == "busy" for state, _ in self._device_state.values())
+            _gauge(lines, "device_checker_runs_in_progress", "Pytest runs going on now.", in_progress)
+            _gauge(lines, "device_checker_run_count", "Runs counted against max_runs.", self.run_count)
+            if self.max_runs:
+                _gauge(lines, "device_checker_max_runs", "Run limit of the service.", self.max_runs)
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _counter(lines: List[str], name: str, help: str, samples: List[Tuple[Dict[str, str], float]]) -> None:
+    lines += [f"# HELP {name} {help}", f"# TYPE {name} counter"]
+    lines += [f"{name}{_format_labels(labels)} {value:g}" for labels, value in samples]
+
+
+def _gauge(lines: List[str], name: str, help: str, value: float) -> None:
+    lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {value:g}"]
+
+
+def _histogram(
+    lines: List[str], name: str, help: str, samples: List[Tuple[Dict[str, str], LatencyHistogram]], bounds
+) -> None:
+    lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+    for labels, histogram in samples:
+        for bound, count in histogram.cumulative(bounds):
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': f'{bound:g}'})} {count}")
+        lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+
+class MetricsServer:
+    """Serves a ServiceMetrics registry on ``/metrics`` from a background thread."""
+
+    def __init__(self, metrics: ServiceMetrics, port: int, host: str = "127.0.0.1"):
+        """
+        Initialize the server.
+
+        Args:
+            metrics: Registry to expose
+            port: Port to bind (0 picks a free port)
+            host: Interface to bind ("0.0.0.0" for remote scrapers)
+        """
+        self.metrics = metrics
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Full URL of the metrics endpoint."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> "MetricsServer":
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and release its socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "MetricsServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _make_handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self._send(404, b"", "text/plain")
+                    return
+                self._send(200, metrics.prometheus().encode("utf-8"), CONTENT_TYPE)
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,226 @@
+"""
+Pool of pre-started WebDriver sessions.
+
+Session creation on Sauce Labs takes tens of seconds. SessionPool starts the
+next sessions for a key (e.g. DriverParams or a platform name) in background
+threads while the current tests run, hands a ready one out on acquire(), and
+quits sessions that stay idle longer than ``idle_timeout``. Sessions are
+never handed out twice: release() quits them, also in the background, and
+close() waits for every start and quit still going on.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+
+class SessionPool:
+    """Keeps up to ``size`` sessions per key started ahead of demand."""
+
+    def __init__(
+        self,
+        factory: Callable[[Any], Any],
+        size: int = 1,
+        idle_timeout: float = 60.0,
+        quit: Optional[Callable[[Any], None]] = None
+    ):
+        """
+        Initialize the pool and its idle reaper.
+
+        Args:
+            factory: Creates a session for a key (blocking)
+            size: Sessions kept ready or starting per key
+            idle_timeout: Seconds a ready session may wait for a test before
+                it is quit (keep it below the hub's newCommandTimeout)
+            quit: Ends a session (default: ``session.quit()``)
+        """
+        self.factory = factory
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._quit = quit or (lambda session: session.quit())
+
+        self.created = 0
+        self.warm_hits = 0
+        self.cold_starts = 0
+        self.expired = 0
+        self.errors = 0
+
+        self._cond = threading.Condition()
+        self._idle: Dict[Hashable, Deque[Tuple[Any, float]]] = {}
+        self._starting: Dict[Hashable, int] = {}
+        # Released sessions whose quit is still going on
+        self._quitting = 0
+        self._active_keys = set()
+        self._closed = False
+        self._reaper = threading.Thread(target=self._reap, name="session-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def prewarm(self, key: Hashable) -> None:
+        """Start sessions for a key in the background, up to the pool size."""
+        with self._cond:
+            self._active_keys.add(key)
+            self._top_up(key)
+
+    def acquire(self, key: Hashable, timeout: Optional[float] = None) -> Any:
+        """
+        Return a session for a key.
+
+        A ready session is returned at once; otherwise the call waits for
+        one that is already starting, or creates one itself. Afterwards the
+        pool starts a replacement in the background.
+
+        Args:
+            key: What the session is for
+            timeout: Longest wait for a starting session before creating one
+                directly (None waits as long as it takes)
+
+        Returns:
+            The session
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._active_keys.add(key)
+            while True:
+                idle = self._idle.get(key)
+                if idle:
+                    session, _ = idle.popleft()
+                    self.warm_hits += 1
+                    self._top_up(key)
+                    return session
+                if not self._starting.get(key):
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            self.cold_starts += 1
+            # Count the direct start so the top-up does not start one more
+            self._starting[key] = self._starting.get(key, 0) + 1
+            self._top_up(key)
+
+        try:
+            session = self.factory(key)
+        finally:
+            with self._cond:
+                self._starting[key] -= 1
+                self._cond.notify_all()
+        with self._cond:
+            self.created += 1
+            self._top_up(key)
+        return session
+
+    def release(self, session: Any) -> None:
+        """Quit a session the tests are done with, in the background."""
+        with self._cond:
+            self._quitting += 1
+        threading.Thread(
+            target=self._quit_released, args=(session,), name="session-pool-quit", daemon=True
+        ).start()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop warming, quit every idle session and wait for the rest.
+
+        Sessions still starting are quit as soon as they are up, so none is
+        left running on the hub when the process exits.
+
+        Args:
+            timeout: Longest wait for starting sessions and quits in progress
+                (None waits as long as it takes)
+        """
+        with self._cond:
+            self._closed = True
+            sessions = [session for idle in self._idle.values() for session, _ in idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for session in sessions:
+            self._safe_quit(session)
+        with self._cond:
+            self._cond.wait_for(lambda: not any(self._starting.values()) and not self._quitting, timeout)
+        self._reaper.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters of the pool."""
+        with self._cond:
+            return {
+                "created": self.created,
+                "warm_hits": self.warm_hits,
+                "cold_starts": self.cold_starts,
+                "expired": self.expired,
+                "errors": self.errors,
+                "idle": sum(len(idle) for idle in self._idle.values()),
+                "starting": sum(self._starting.values()),
+            }
+
+    def _top_up(self, key: Hashable) -> None:
+        """Start background sessions until the key has ``size`` ready or starting."""
+        if self._closed or key not in self._active_keys:
+            return
+        missing = self.size - len(self._idle.get(key, ())) - self._starting.get(key, 0)
+        for _ in range(max(0, missing)):
+            self._starting[key] = self._starting.get(key, 0) + 1
+            threading.Thread(
+                target=self._start, args=(key,), name="session-pool-start", daemon=True
+            ).start()
+
+    def _start(self, key: Hashable) -> None:
+        try:
+            session = self.factory(key)
+        except Exception:
+            with self._cond:
+                self.errors += 1
+                self._starting[key] -= 1
+                # Stop warming this key; the next acquire() surfaces the error
+                self._active_keys.discard(key)
+                self._cond.notify_all()
+            return
+
+        with self._cond:
+            self.created += 1
+            if not self._closed:
+                self._starting[key] -= 1
+                self._idle.setdefault(key, deque()).append((session, time.monotonic()))
+                self._cond.notify_all()
+                return
+        # Closed while starting: still counted, so close() waits for the quit
+        try:
+            self._safe_quit(session)
+        finally:
+            with self._cond:
+                self._starting[key] -= 1
+                self._cond.notify_all()
+
+    def _reap(self) -> None:
+        """Quit sessions that waited longer than idle_timeout."""
+        interval = max(0.05, min(5.0, self.idle_timeout / 4))
+        while True:
+            expired = []
+            with self._cond:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                for key, idle in self._idle.items():
+                    while idle and now - idle[0][1] >= self.idle_timeout:
+                        expired.append(idle.popleft()[0])
+                        # No demand for this key lately; stop warming it
+                        self._active_keys.discard(key)
+                self.expired += len(expired)
+                self._cond.wait(interval)
+            for session in expired:
+                self._safe_quit(session)
+
+    def _quit_released(self, session: Any) -> None:
+        try:
+            self._safe_quit(session)
+        finally:
+            with self._cond:
+                self._quitting -= 1
+                self._cond.notify_all()
+
+    def _safe_quit(self, session: Any) -> None:
+        try:
+            self._quit(session)
+        except Exception:
+            pass
@@ -0,0 +1,82 @@
+"""AsyncDeviceDispatcher with the fake device API and stubbed pytest runs."""
+
+import asyncio
+
+import pytest
+
+from async_dispatcher import AsyncDeviceDispatcher
+
+DEVICES = ["iPhone_SE_2022_16_POC07", "iPhone_14_Plus_16_POC46"]
+
+
+@pytest.fixture
+def checker(device_checker, fake_device_api):
+    for device_id in DEVICES:
+        fake_device_api.set_state(device_id, "AVAILABLE")
+    # Poll again right after a run instead of after a full interval
+    device_checker.poller.min_interval = 0.05
+    return device_checker
+
+
+def test_a_queued_run_is_not_cut_off_when_another_finishes(checker, fake_device_api, monkeypatch):
+    checker.max_runs = 1
+    fake_device_api.set_state(DEVICES[1], "IN_USE")
+    dispatcher = AsyncDeviceDispatcher(checker, ["first.py", "second.py"])
+    results = []
+
+    async def run_script(test_script, device_id, queue_wait=0.0):
+        if test_script == "first.py":
+            # Finish right after the last job was queued, before a worker takes it
+            fake_device_api.set_state(DEVICES[1], "AVAILABLE")
+            while not dispatcher._exhausted:
+                await asyncio.sleep(0)
+        else:
+            await asyncio.sleep(0.05)
+        results.append(test_script)
+        return True
+
+    monkeypatch.setattr(dispatcher, "_run_script", run_script)
+    asyncio.run(asyncio.wait_for(dispatcher.run(), 10))
+
+    assert results == ["first.py", "second.py"]
+
+
+def test_runs_are_spread_until_max_runs(checker, monkeypatch):
+    checker.max_runs = 2
+    dispatcher = AsyncDeviceDispatcher(checker, ["pass.py", "fail.py"], concurrency=1)
+    runs = []
+
+    async def run_script(test_script, device_id, queue_wait=0.0):
+        runs.append(test_script)
+        return test_script == "pass.py"
+
+    monkeypatch.setattr(dispatcher, "_run_script", run_script)
+    results = asyncio.run(asyncio.wait_for(dispatcher.run(), 10))
+
+    assert runs == ["pass.py", "fail.py", "pass.py", "fail.py"]
+    assert results == [True, False, True, False]
+    assert dispatcher.run_count == 4
+    assert dispatcher._claimed == set()
+
+
+def test_watcher_survives_a_failed_poll(checker, monkeypatch):
+    checker.max_runs = 1
+    checker.poller.base_interval = 0.05
+    dispatcher = AsyncDeviceDispatcher(checker, ["pass.py"], concurrency=1)
+    get_device_snapshot = checker.get_device_snapshot
+    calls = []
+
+    def flaky_snapshot():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError("lease file locked")
+        return get_device_snapshot()
+
+    async def run_script(test_script, device_id, queue_wait=0.0):
+        return True
+
+    monkeypatch.setattr(checker, "get_device_snapshot", flaky_snapshot)
+    monkeypatch.setattr(dispatcher, "_run_script", run_script)
+
+    assert asyncio.run(asyncio.wait_for(dispatcher.run(), 10)) == [True]
+    assert len(calls) >= 2
@@ -0,0 +1,44 @@
+"""SauceLabsDeviceChecker against the fake device API."""
+
+
+def test_one_request_per_poll_cycle(device_checker, fake_device_api):
+    fake_device_api.set_state("iPhone_SE_2022_16_POC07", "IN_USE")
+    fake_device_api.set_state("iPhone_14_Plus_16_POC46", "AVAILABLE")
+
+    assert device_checker.wait_for_devices() == "iPhone_14_Plus_16_POC46"
+    # Both devices were looked up in the index of a single device list
+    assert fake_device_api.request_count == 1
+
+
+def test_lookups_inside_the_ttl_reuse_the_snapshot(device_checker, fake_device_api):
+    device_checker.snapshot_ttl = 60
+
+    for _ in range(3):
+        for device_id in device_checker.device_ids:
+            device_checker.get_device(device_id)
+
+    assert fake_device_api.request_count == 1
+    assert device_checker._get_device_status("iPhone_14_Plus_16_POC46") == "IN_USE"
+
+
+def test_not_modified_reuses_the_cached_index(device_checker, fake_device_api):
+    first = device_checker.get_device_snapshot()
+    second = device_checker.get_device_snapshot()
+
+    assert fake_device_api.request_count == 2
+    assert fake_device_api.not_modified_count == 1
+    assert second is first
+
+    fake_device_api.set_state("iPhone_14_Plus_16_POC46", "AVAILABLE")
+    third = device_checker.get_device_snapshot()
+    assert third is not first
+    assert third["iPhone_14_Plus_16_POC46"]["state"] == "AVAILABLE"
+    assert device_checker.metrics.polls == {"ok": 2, "not_modified": 1}
+
+
+def test_polls_reuse_the_pooled_connection(device_checker, fake_device_api):
+    for _ in range(5):
+        device_checker.get_device_snapshot(force_refresh=True)
+
+    assert fake_device_api.request_count == 5
+    assert fake_device_api.connection_count == 1
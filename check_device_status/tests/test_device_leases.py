@@ -0,0 +1,102 @@
+"""LeaseManager instances sharing one lease file."""
+
+import time
+
+import pytest
+
+from device_leases import LeaseManager
+
+
+@pytest.fixture
+def make_manager(tmp_path):
+    managers = []
+
+    def make(**kwargs):
+        managers.append(LeaseManager(str(tmp_path / "leases.sqlite"), owner=f"checker-{len(managers)}", **kwargs))
+        return managers[-1]
+
+    yield make
+    for manager in managers:
+        manager.close()
+
+
+def test_a_device_is_leased_by_one_instance(make_manager):
+    first, second = make_manager(), make_manager()
+
+    assert first.acquire("POC07", script="test_features.py")
+    assert first.acquire("POC07")
+    assert not second.acquire("POC07")
+    assert second.holder("POC07").owner == "checker-0"
+    assert [lease.device_id for lease in second.leases()] == ["POC07"]
+
+
+def test_released_device_needs_a_newer_device_list(make_manager):
+    first, second = make_manager(), make_manager()
+    seen_at = time.time()
+    first.acquire("POC07")
+    first.release("POC07")
+
+    # The list fetched before the release still shows the device AVAILABLE
+    assert not second.acquire("POC07", seen_at=seen_at)
+    assert second.acquire("POC07", seen_at=time.time())
+
+
+def test_unused_release_keeps_older_device_lists_valid(make_manager):
+    first, second = make_manager(), make_manager()
+    seen_at = time.time()
+    first.acquire("POC07")
+    first.release("POC07", used=False)
+
+    assert second.acquire("POC07", seen_at=seen_at)
+
+
+def test_heartbeat_keeps_the_lease(make_manager):
+    first, second = make_manager(ttl=0.3), make_manager(ttl=0.3)
+    first.acquire("POC07")
+    time.sleep(0.6)
+    assert not second.acquire("POC07")
+
+
+def test_expired_lease_is_taken_over_and_reported_lost(make_manager, monkeypatch):
+    lost = []
+    crashed = make_manager(ttl=0.2, on_lost=lost.append)
+    # No heartbeat, as if the instance had hung
+    monkeypatch.setattr(crashed, "_start_heartbeat", lambda: None)
+    other = make_manager()
+    crashed.acquire("POC07")
+    time.sleep(0.3)
+
+    assert other.holder("POC07") is None
+    assert other.acquire("POC07")
+    assert crashed.renew() == ["POC07"]
+
+
+def test_close_releases_held_leases(make_manager):
+    first, second = make_manager(), make_manager()
+    first.acquire("POC07")
+    first.close()
+    assert second.acquire("POC07", seen_at=time.time())
+
+
+def test_instances_share_one_device_list(make_manager):
+    first, second = make_manager(), make_manager()
+    fetches = []
+
+    def fetch():
+        fetches.append(None)
+        return [{"id": "POC07", "state": "AVAILABLE"}]
+
+    devices, fetched_at = first.snapshot("user@api", 10, fetch)
+    shared, shared_at = second.snapshot("user@api", 10, fetch)
+
+    assert len(fetches) == 1
+    assert shared == devices == [{"id": "POC07", "state": "AVAILABLE"}]
+    assert shared_at == fetched_at
+
+
+def test_failed_refresh_lets_another_instance_poll(make_manager):
+    first, second = make_manager(), make_manager()
+
+    assert first.snapshot("user@api", 10, lambda: None) == (None, None)
+    devices, _ = second.snapshot("user@api", 10, lambda: [{"id": "POC07"}])
+    assert devices == [{"id": "POC07"}]
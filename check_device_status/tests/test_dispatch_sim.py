@@ -0,0 +1,86 @@
+"""Dispatch policy simulator on recorded durations."""
+
+import pytest
+
+from dispatch_sim import POLICIES, RecordedData, batch_jobs, load_log, make_policy, simulate, stream_jobs
+
+DEVICES = ["A", "B"]
+
+
+@pytest.fixture
+def data():
+    data = RecordedData()
+    for _ in range(3):
+        data.add_run("short.py", "A", 10.0)
+        data.add_run("long.py", "A", 100.0)
+    return data
+
+
+def test_durations_fall_back_from_device_to_script_to_default(data):
+    data.add_run("short.py", "B", 20.0)
+
+    assert data.duration("short.py", "B", 0.5) == 20.0
+    assert data.duration("long.py", "B", 0.5) == 100.0
+    assert data.duration("new.py", "B", 0.0) == 10.0
+    assert RecordedData().duration("new.py", "B", 0.5) == 60.0
+
+
+def test_job_lists_are_reproducible():
+    assert batch_jobs(["a.py", "b.py"], runs=3, seed=1) == batch_jobs(["a.py", "b.py"], runs=3, seed=1)
+    assert [script for _, script, _ in batch_jobs(["a.py", "b.py"], runs=2)] == ["a.py", "b.py"] * 2
+
+    jobs = stream_jobs(["a.py"], hours=10, arrivals_per_hour=6, seed=2)
+    assert jobs == stream_jobs(["a.py"], hours=10, arrivals_per_hour=6, seed=2)
+    assert all(0 < arrival <= 36000 for arrival, _, _ in jobs)
+    assert 30 <= len(jobs) <= 90
+
+
+@pytest.mark.parametrize("policy", POLICIES)
+def test_every_policy_runs_every_job(policy, data):
+    result = simulate(policy, batch_jobs(["short.py", "long.py"], runs=4), DEVICES, data, poll_interval=5)
+
+    assert result.runs == 8
+    assert sum(result.busy.values()) == pytest.approx(4 * 10 + 4 * 100)
+    assert 0 < result.mean_utilisation <= 1
+
+
+def test_async_uses_every_device(data):
+    jobs = batch_jobs(["long.py"], runs=4)
+    sequential = simulate("sequential", jobs, DEVICES, data, poll_interval=5)
+    parallel = simulate("async", jobs, DEVICES, data, poll_interval=5)
+
+    assert sequential.makespan >= 400
+    assert parallel.makespan < 0.6 * sequential.makespan
+    assert parallel.busy["B"] > 0
+
+
+def test_shortest_first_waits_less_than_longest_first(data):
+    jobs = batch_jobs(["long.py", "short.py", "long.py", "short.py"], runs=1)
+    shortest = simulate("shortest-first", jobs, ["A"], data, poll_interval=5)
+    longest = simulate("longest-first", jobs, ["A"], data, poll_interval=5)
+
+    assert shortest.makespan == pytest.approx(longest.makespan)
+    assert sum(shortest.queue_waits) < sum(longest.queue_waits)
+
+
+def test_unknown_policy(data):
+    with pytest.raises(ValueError):
+        make_policy("random", data)
+
+
+def test_load_log_reads_durations_and_recoveries(tmp_path):
+    path = tmp_path / "service.log"
+    path.write_text(
+        "[2026-03-06 10:00:00] Device A is AVAILABLE — proceeding with test run.\n"
+        "[2026-03-06 10:00:00] Executing pytest script: test_features.py\n"
+        "[2026-03-06 10:00:30] Pytest test_features.py completed successfully\n"
+        "[2026-03-06 10:00:40] [A] Status: CLEANING\n"
+        "[2026-03-06 10:00:50] [A] Status: AVAILABLE\n",
+        encoding="utf-8",
+    )
+
+    data = load_log(str(path))
+
+    assert data.durations[("test_features.py", "A")] == [30.0]
+    assert data.recoveries == {"A": [20.0]}
+    assert data.devices() == ["A"]
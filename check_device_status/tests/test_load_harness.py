@@ -0,0 +1,26 @@
+"""Loading scenarios the way load_harness.py does, outside pytest."""
+
+import json
+import os
+import subprocess
+import sys
+
+CHECKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOAD_SCENARIO = """
+import json
+from load_harness import Scenario
+scenario = Scenario("test_features_sim.py", hub_url="http://127.0.0.1:1")
+print(json.dumps([[cls.__name__, tests] for _, cls, tests in scenario.steps]))
+"""
+
+
+def test_scenario_imports_the_shared_wait_engine_outside_pytest():
+    # A fresh interpreter, without the sys.path pytest.ini gives this process
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+    result = subprocess.run(
+        [sys.executable, "-c", LOAD_SCENARIO],
+        cwd=CHECKER_DIR, env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout) == [["TestAlerts", ["test_should_tap_on_alerts"]]]
@@ -0,0 +1,134 @@
+"""LogIndex over text and JSON-lines service logs."""
+
+import argparse
+import json
+import time
+
+import pytest
+
+from log_index import LogIndex, parse_time
+
+TEXT_LOG = """\
+[2026-03-06 10:00:00] Device Availability Checker Service Started
+[2026-03-06 10:00:01] Device iPhone_SE is AVAILABLE — proceeding with test run.
+[2026-03-06 10:00:01] Executing pytest script: test_features.py
+Sauce Session: https://app.saucelabs.com/tests/abc123
+1 passed in 20.00s
+[2026-03-06 10:00:31] Pytest test_features.py completed successfully
+[2026-03-06 10:01:00] Device iPhone_14 is AVAILABLE — proceeding with test run.
+[2026-03-06 10:01:00] Executing pytest script: test_foodtruck.py
+Sauce Session: https://app.saucelabs.com/tests/def456
+===== 1 failed, 1 passed in 40.00s =====
+[2026-03-06 10:02:00] Pytest test_foodtruck.py failed with exit code 1
+"""
+
+NEXT_RUN = """\
+[2026-03-06 10:03:00] Device iPhone_SE is AVAILABLE — proceeding with test run.
+[2026-03-06 10:03:00] Executing pytest script: test_features.py
+"""
+
+NEXT_RUN_END = """\
+1 passed in 10.00s
+[2026-03-06 10:03:15] Pytest test_features.py completed successfully
+"""
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / "service.log"
+    path.write_text(TEXT_LOG, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def index(log_path):
+    index = LogIndex(str(log_path))
+    yield index
+    index.close()
+
+
+def test_text_log_runs(index):
+    added = index.update()
+
+    assert [(run.script, run.device_id, run.outcome, run.exit_code) for run in added] == [
+        ("test_features.py", "iPhone_SE", "passed", 0),
+        ("test_foodtruck.py", "iPhone_14", "failed", 1),
+    ]
+    runs = index.runs()
+    assert [run["duration"] for run in runs] == [30, 60]
+    assert [run["tests"] for run in runs] == ["1 passed", "1 failed, 1 passed"]
+    assert [run["sauce_session_ids"] for run in runs] == ["abc123", "def456"]
+
+
+def test_filters_and_stats(index):
+    index.update()
+
+    assert [run["script"] for run in index.runs(outcome="failed")] == ["test_foodtruck.py"]
+    assert [run["script"] for run in index.runs(device_id="se")] == ["test_features.py"]
+    stats = index.stats(by=("outcome",))
+    assert [(row["outcome"], row["runs"], row["max"]) for row in stats] == [("failed", 1, 60), ("passed", 1, 30)]
+    with pytest.raises(ValueError):
+        index.stats(by=("host",))
+
+
+def test_updates_continue_from_the_last_offset(index, log_path):
+    index.update()
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(NEXT_RUN)
+    # The run is still going on
+    assert index.update() == []
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(NEXT_RUN_END)
+
+    added = index.update()
+
+    assert [(run.script, run.duration, run.tests) for run in added] == [("test_features.py", 15, "1 passed")]
+    assert len(index.runs()) == 3
+
+
+def test_truncated_log_is_reindexed(index, log_path):
+    index.update()
+    log_path.write_text(NEXT_RUN + NEXT_RUN_END, encoding="utf-8")
+
+    index.update()
+
+    assert [run["started_at"] for run in index.runs()] == [
+        time.mktime(time.strptime("2026-03-06 10:03:00", "%Y-%m-%d %H:%M:%S"))
+    ]
+
+
+def test_span_is_the_runs_slice_of_the_log(index):
+    index.update()
+    run = index.runs(script="foodtruck")[0]
+
+    span = index.span(run["id"]).decode("utf-8")
+
+    assert span.startswith("[2026-03-06 10:01:00] Executing pytest script: test_foodtruck.py")
+    assert span.endswith("failed with exit code 1\n")
+
+
+def test_json_log_results_lines(tmp_path):
+    lines = [
+        {"time": "2026-03-06T10:00:00", "message": "[worker 0] Run 1: test_features.py on iPhone_SE"},
+        {"time": "2026-03-06T10:00:20", "message": "Results for test_features.py: 2 passed in 19.0s — sessions: s1, s2",
+         "device_id": "iPhone_SE", "duration": 19.5, "outcomes": {"passed": 2}, "run_log": "runs/1.log"},
+        {"time": "2026-03-06T10:00:21", "message": "Pytest test_features.py on iPhone_SE completed successfully"},
+    ]
+    path = tmp_path / "service.jsonl"
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines), encoding="utf-8")
+    index = LogIndex(str(path))
+    try:
+        index.update()
+        [run] = index.runs()
+    finally:
+        index.close()
+
+    assert (run["device_id"], run["duration"], run["tests"]) == ("iPhone_SE", 19.5, "2 passed")
+    assert (run["sauce_session_ids"], run["run_log"]) == ("s1,s2", "runs/1.log")
+
+
+def test_parse_time():
+    assert parse_time("2026-03-06 17:30") == time.mktime(time.strptime("2026-03-06 17:30", "%Y-%m-%d %H:%M"))
+    assert time.time() - parse_time("2h") == pytest.approx(7200, abs=5)
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_time("yesterday")
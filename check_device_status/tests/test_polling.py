@@ -0,0 +1,88 @@
+"""AdaptivePoller and HostRateBudget."""
+
+import time
+
+import pytest
+
+from polling import AdaptivePoller, HostRateBudget, budget_for
+
+
+def busy(poller, devices=("a", "b")):
+    poller.record_states({device_id: "IN_USE" for device_id in devices})
+
+
+def test_base_interval_with_jitter():
+    poller = AdaptivePoller(10)
+    busy(poller)
+    assert 9 <= poller.next_interval() <= 11
+
+
+def test_state_change_polls_at_the_minimum_interval():
+    poller = AdaptivePoller(10)
+    busy(poller)
+    poller.record_states({"a": "AVAILABLE", "b": "IN_USE"})
+    assert poller.min_interval == 2
+    assert 1.8 <= poller.next_interval() <= 2.2
+
+
+def test_cleaning_device_polls_at_the_minimum_interval():
+    poller = AdaptivePoller(10, min_interval=1)
+    poller.record_states({"a": "CLEANING"})
+    assert poller.next_interval() <= 1.1
+
+
+def test_all_busy_grows_up_to_max_interval():
+    poller = AdaptivePoller(10, max_interval=20, busy_after=0)
+    for _ in range(10):
+        busy(poller)
+    assert 18 <= poller.next_interval() <= 22
+
+
+def test_errors_back_off_and_success_resets():
+    poller = AdaptivePoller(1, backoff_cap=8)
+    for _ in range(5):
+        poller.record_error()
+    assert all(1 <= poller.next_interval() <= 8 for _ in range(20))
+    poller.record_error(status_code=429, retry_after=30)
+    assert poller.next_interval() >= 30
+
+    busy(poller)
+    assert poller.consecutive_errors == 0
+    assert poller.next_interval() <= 1.1
+
+
+def test_wake_cuts_the_sleep_short():
+    poller = AdaptivePoller(10)
+    poller.wake()
+    started = time.monotonic()
+    assert poller.sleep(5)
+    assert time.monotonic() - started < 1
+
+
+def test_host_budget_spaces_requests(monkeypatch, tmp_path):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    budget = HostRateBudget("api.example", requests_per_minute=600, burst=2)
+    assert budget.acquire() == 0
+    assert budget.acquire() == 0
+    # The bucket is empty; the next token takes a tenth of a second
+    assert budget.acquire() == pytest.approx(0.1, abs=0.05)
+
+
+def test_budget_for_disabled():
+    assert budget_for("https://api.example/devices", 0) is None
+
+
+@pytest.mark.parametrize("snapshot_ttl, expected", [(None, 2), (30, 2), (0.5, 0.5)])
+def test_checker_snapshot_ttl_is_at_most_the_minimum_interval(snapshot_ttl, expected, fake_device_api, monkeypatch):
+    from device_check_service import SauceLabsDeviceChecker
+
+    monkeypatch.setenv("SAUCE_USERNAME", "fake-user")
+    monkeypatch.setenv("SAUCE_ACCESS_KEY", "fake-key")
+    checker = SauceLabsDeviceChecker(
+        device_ids=["iPhone_SE_2022_16_POC07"], api_url=fake_device_api.url,
+        poll_interval=10, snapshot_ttl=snapshot_ttl, rate_limit=0,
+    )
+    try:
+        assert checker.snapshot_ttl == expected
+    finally:
+        checker.close()
@@ -0,0 +1,130 @@
+"""Retry budget, circuit breaker and the device API adapter."""
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, ResponseError
+
+from retry_policy import CircuitBreaker, CircuitOpenError, PolicyAdapter, RetryBudget, RetryEngine
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    # One probe at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.opened == 1
+
+
+def test_failed_probe_reopens_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=clock)
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.opened == 2
+
+
+@pytest.mark.parametrize("error", [
+    MaxRetryError(None, "/", ResponseError("too many redirects")),
+    ValueError("unexpected answer"),
+])
+def test_neutral_probe_outcome_frees_the_half_open_probe(error):
+    clock = FakeClock()
+    engine = RetryEngine(breaker_factory=lambda: CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=clock))
+    url = "http://hub/wd/hub/session/1/title"
+    engine.after_request("GET", url, status=503)
+    clock.now += 5
+
+    engine.before_request("GET", url)
+    engine.after_request("GET", url, error=error)
+    assert engine.breaker(url).state == CircuitBreaker.HALF_OPEN
+    # The next request probes instead of being rejected for good
+    engine.before_request("GET", url)
+    engine.after_request("GET", url, status=200)
+    assert engine.breaker(url).state == CircuitBreaker.CLOSED
+
+
+def test_budget_allows_a_floor_then_a_ratio_of_requests():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=0.5, window=10, min_retries=2, clock=clock)
+    assert budget.try_acquire()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+
+    for _ in range(10):
+        budget.record_request()
+    assert sum(budget.try_acquire() for _ in range(10)) == 3
+    # The window slides: old requests and retries no longer count
+    clock.now += 10
+    assert budget.stats() == {"requests": 0, "retries": 0}
+
+
+def test_endpoint_policies():
+    engine = RetryEngine()
+    assert engine.policy_for("GET", "https://api.saucelabs.com/v1/rdc/device-management/devices").name == "device-api"
+    assert engine.policy_for("POST", "https://hub/wd/hub/session").name == "webdriver:new-session"
+    assert engine.policy_for("GET", "https://hub/wd/hub/session/1/title").name == "webdriver:read"
+    assert engine.policy_for("POST", "https://hub/wd/hub/session/1/element").name == "webdriver:command"
+
+
+@pytest.fixture
+def api_session(fake_device_api):
+    engine = RetryEngine(breaker_factory=lambda: CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    session = requests.Session()
+    session.mount("http://", PolicyAdapter(fake_device_api.url, engine=engine))
+    yield session, engine
+    session.close()
+
+
+def test_adapter_retries_failure_statuses_once(api_session, fake_device_api):
+    session, engine = api_session
+    fake_device_api.status_override = 503
+
+    assert session.get(fake_device_api.url).status_code == 503
+    assert fake_device_api.request_count == 2
+    assert engine.metrics.get("device-api", "retry:status") == 1
+
+
+def test_open_circuit_rejects_requests_without_sending_them(api_session, fake_device_api):
+    session, engine = api_session
+    fake_device_api.status_override = 503
+    session.get(fake_device_api.url)
+    session.get(fake_device_api.url)
+    sent = fake_device_api.request_count
+
+    with pytest.raises(CircuitOpenError):
+        session.get(fake_device_api.url)
+    assert fake_device_api.request_count == sent
+    assert engine.metrics.get("device-api", "circuit_rejected") == 1
+
+
+def test_checker_backs_off_while_the_circuit_is_open(device_checker, fake_device_api):
+    fake_device_api.status_override = 503
+    for _ in range(8):
+        assert device_checker.get_device_snapshot() == {}
+
+    # The circuit opened after five failed polls; the later ones never reached the API
+    assert fake_device_api.request_count == 10
+    assert device_checker.poller.consecutive_errors == 8
+    assert device_checker.metrics.polls == {"error": 8}
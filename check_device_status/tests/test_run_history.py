@@ -0,0 +1,54 @@
+"""Duration percentiles, predictions and batch planning."""
+
+import pytest
+
+from run_history import RunHistory, devices_needed, percentile, plan_batch
+
+DURATIONS = {"long.py": 50.0, "mid.py": 30.0, "short.py": 20.0}
+
+
+def estimate(script, device_id):
+    return DURATIONS[script]
+
+
+@pytest.fixture
+def history():
+    history = RunHistory(":memory:")
+    yield history
+    history.close()
+
+
+def test_percentile_interpolates_between_observations():
+    assert percentile([], 50) is None
+    assert percentile([7.0], 90) == 7.0
+    assert percentile([40.0, 10.0, 30.0, 20.0], 50) == 25.0
+    assert percentile([10.0, 20.0, 30.0, 40.0], 90) == pytest.approx(37.0)
+    assert percentile([10.0, 20.0], 100) == 20.0
+
+
+def test_predict_falls_back_to_every_device(history):
+    history.record("a.py", "iphone", 10, 0)
+    history.record("a.py", "iphone", 20, 0)
+    history.record("a.py", "pixel", 100, 0)
+
+    assert history.predict("a.py", "pixel", percentiles=(50,)) == {"p50": 100}
+    assert history.predict("a.py", "ipad", percentiles=(50,)) == {"p50": 20}
+    assert history.predict("b.py", "iphone") == {}
+
+
+def test_plan_batch_places_the_longest_scripts_first():
+    plan = plan_batch(["short.py", "mid.py", "long.py", "short.py", "mid.py"], ["a", "b"], estimate)
+    # Each script goes to the device with the least work: 50+20 and 30+30+20
+    assert plan.assignments == {"a": ["long.py", "short.py"], "b": ["mid.py", "mid.py", "short.py"]}
+    assert plan.loads == {"a": 70.0, "b": 80.0}
+    assert plan.makespan == 80.0
+    assert plan_batch(["long.py"], [], estimate).makespan == 0.0
+
+
+def test_devices_needed_for_a_deadline():
+    scripts = ["long.py", "mid.py", "short.py"]
+    assert devices_needed(scripts, 100, estimate) == 1
+    assert devices_needed(scripts, 50, estimate) == 2
+    # No pool size beats the longest script
+    assert devices_needed(scripts, 40, estimate, max_devices=8) is None
+    assert devices_needed(scripts * 4, 100, estimate, max_devices=2) is None
@@ -0,0 +1,62 @@
+"""RunSummary totals and per-run results file."""
+
+import json
+
+from run_results import RunResult, RunSummary, results_path_for
+
+
+def result(script, device_id, exit_code, duration, outcomes):
+    tests = [{"nodeid": f"{script}::test_{i}", "outcome": outcome} for i, outcome in enumerate(outcomes)]
+    return RunResult(script=script, device_id=device_id, exit_code=exit_code, started_at=0.0,
+                     duration=duration, tests=tests)
+
+
+def test_totals_without_keeping_runs(tmp_path):
+    results_path = str(tmp_path / "results.runs.jsonl")
+    summary = RunSummary(keep_runs=False, results_path=results_path)
+    summary.add(result("a.py", "POC07", 0, 10.0, ["passed", "passed"]))
+    summary.add(result("a.py", "POC46", 1, 20.0, ["passed", "failed"]))
+    summary.add(result("b.py", "POC07", 0, 5.0, ["skipped"]))
+
+    data = summary.to_dict()
+
+    assert summary.runs == []
+    assert (data["runs"], data["failed_runs"]) == (3, 1)
+    assert data["tests"] == {"passed": 3, "failed": 1, "skipped": 1}
+    assert data["scripts"]["a.py"] == {
+        "runs": 2, "failed_runs": 1, "devices": {"POC07": 1, "POC46": 1}, "mean_duration": 15.0,
+    }
+    assert "results" not in data
+    with open(results_path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert [(line["script"], line["device_id"], len(line["tests"])) for line in lines] == [
+        ("a.py", "POC07", 2), ("a.py", "POC46", 2), ("b.py", "POC07", 1),
+    ]
+
+
+def test_results_file_keeps_earlier_runs(tmp_path):
+    path = tmp_path / "results.runs.jsonl"
+    path.write_text('{"script": "earlier.py"}\n', encoding="utf-8")
+    # A restarted service appends to the file instead of replacing it
+    summary = RunSummary(keep_runs=False, results_path=str(path))
+    summary.add(result("a.py", "POC07", 0, 1.0, ["passed"]))
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [line["script"] for line in lines] == ["earlier.py", "a.py"]
+    assert summary.run_count == 1
+
+
+def test_kept_runs_are_exported(tmp_path):
+    summary = RunSummary()
+    summary.add(result("pom", "ios", 0, 3.0, ["passed"]))
+    path = tmp_path / "summary.json"
+
+    summary.write_json(str(path))
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert [run["device_id"] for run in data["results"]] == ["ios"]
+    assert [run.device_id for run in summary.runs] == ["ios"]
+
+
+def test_results_path_for():
+    assert results_path_for("out/results.json") == "out/results.runs.jsonl"
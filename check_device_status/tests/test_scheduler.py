@@ -0,0 +1,79 @@
+"""Scheduler ordering, device choice and job files."""
+
+import json
+
+from scheduler import Job, RuntimeEstimator, Scheduler, load_jobs
+
+IPHONE_16 = {"modelName": "iPhone_SE", "osVersion": "16.4"}
+IPHONE_17 = {"modelName": "iPhone_13", "osVersion": "17.0"}
+
+
+def scripts(assignments):
+    return [job.script for job, _ in assignments]
+
+
+def test_higher_priority_goes_first():
+    scheduler = Scheduler([Job("low.py"), Job("high.py", priority=5), Job("mid.py", priority=1)])
+    assert scripts(scheduler.assign({"a": IPHONE_16}, limit=1)) == ["high.py"]
+    assert scripts(scheduler.assign({"a": IPHONE_16, "b": IPHONE_17})) == ["mid.py", "low.py"]
+
+
+def test_shortest_expected_first_within_a_priority():
+    estimator = RuntimeEstimator()
+    estimator.record("slow.py", None, 300)
+    estimator.record("fast.py", None, 10)
+    scheduler = Scheduler([Job("slow.py"), Job("fast.py")], estimator)
+    assert scripts(scheduler.assign({"a": IPHONE_16}, limit=1)) == ["fast.py"]
+
+
+def test_fair_share_charges_the_real_duration_on_complete():
+    scheduler = Scheduler([Job("a1.py", app="a"), Job("b1.py", app="b")])
+    [(job, device_id)] = scheduler.assign({"x": IPHONE_16}, limit=1)
+    assert job.app == "a"
+    # a1 was expected to take 60 s but took 1 s; app b has used nothing yet
+    scheduler.complete(job, device_id, 1)
+    scheduler.submit(Job("a2.py", app="a"))
+    assert scripts(scheduler.assign({"x": IPHONE_16}, limit=1)) == ["b1.py"]
+    assert scheduler.estimator.estimate("a1.py") == 1
+
+    # b1 now has 60 s of expected usage against a's 1 s
+    assert scripts(scheduler.assign({"x": IPHONE_16}, limit=1)) == ["a2.py"]
+
+
+def test_constrained_job_gets_the_only_device_it_can_use():
+    scheduler = Scheduler([
+        Job("any.py", priority=1),
+        Job("ios16.py", capabilities={"platform_version": "16"}),
+    ])
+    assignments = dict((job.script, device_id) for job, device_id in
+                       scheduler.assign({"old": IPHONE_16, "new": IPHONE_17}))
+    assert assignments == {"any.py": "new", "ios16.py": "old"}
+
+
+def test_platform_version_is_a_prefix_match():
+    job = Job("x.py", capabilities={"platform_version": "1"})
+    assert job.matches(IPHONE_16)
+    assert not Job("x.py", capabilities={"platform_version": "6"}).matches(IPHONE_16)
+    assert Job("x.py", capabilities={"model": "iPhone_(SE|13)"}).matches(IPHONE_17)
+    assert not Job("x.py", capabilities={"model": "Pixel"}).matches({"osVersion": "14"})
+
+
+def test_unschedulable_jobs_are_dropped():
+    android = Job("android.py", capabilities={"model": "Pixel"})
+    scheduler = Scheduler([Job("ios.py"), android])
+    assert scheduler.drop_unschedulable({"a": IPHONE_16, "b": IPHONE_17}) == [android]
+    assert [job.script for job in scheduler.pending] == ["ios.py"]
+
+
+def test_load_jobs_repeats_specs(tmp_path):
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps([
+        {"script": "a.py", "app": "shop", "priority": 2, "repeat": 3,
+         "capabilities": {"platform_version": "16"}},
+        {"script": "b.py"},
+    ]))
+    jobs = load_jobs(str(path))
+    assert [job.script for job in jobs] == ["a.py", "a.py", "a.py", "b.py"]
+    assert jobs[0].app == "shop" and jobs[0].priority == 2
+    assert jobs[0].capabilities == {"platform_version": "16"}
+    assert jobs[3].app is None and jobs[3].priority == 0
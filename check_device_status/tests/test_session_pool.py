@@ -0,0 +1,101 @@
+"""SessionPool against the stub WebDriver hub."""
+
+import time
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from appium_sessions import DriverParams, create_driver
+from session_pool import SessionPool
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def params(fake_webdriver):
+    return DriverParams(device_name="iPhone_Stub", hub_url=fake_webdriver.url)
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(**kwargs):
+        pools.append(SessionPool(create_driver, **kwargs))
+        return pools[-1]
+
+    yield make
+    for pool in pools:
+        pool.close(timeout=10)
+
+
+def test_prewarm_starts_sessions_up_to_size(make_pool, params, fake_webdriver):
+    pool = make_pool(size=2)
+    pool.prewarm(params)
+    wait_for(lambda: pool.stats()["idle"] == 2)
+    assert fake_webdriver.sessions_created == 2
+
+
+def test_acquire_hands_out_a_warm_session_and_starts_a_replacement(make_pool, params, fake_webdriver):
+    pool = make_pool(size=1)
+    pool.prewarm(params)
+    wait_for(lambda: pool.stats()["idle"] == 1)
+
+    driver = pool.acquire(params)
+
+    assert driver.session_id in fake_webdriver.sessions
+    assert pool.stats()["warm_hits"] == 1
+    assert pool.stats()["cold_starts"] == 0
+    wait_for(lambda: pool.stats()["idle"] == 1)
+    assert fake_webdriver.sessions_created == 2
+    pool.release(driver)
+
+
+def test_idle_sessions_are_reaped(make_pool, params, fake_webdriver):
+    pool = make_pool(size=1, idle_timeout=0.2)
+    pool.prewarm(params)
+    wait_for(lambda: pool.stats()["expired"] == 1)
+    wait_for(lambda: fake_webdriver.active_sessions == 0)
+    # No demand for the key since: it is not warmed again
+    assert pool.stats()["idle"] == 0
+    assert fake_webdriver.sessions_created == 1
+
+
+def test_factory_error_stops_warming_and_surfaces_on_acquire(make_pool, params, fake_webdriver):
+    fake_webdriver.fail_session_start = True
+    pool = make_pool(size=1)
+    pool.prewarm(params)
+    wait_for(lambda: pool.stats()["errors"] == 1)
+    assert pool.stats()["starting"] == 0
+
+    with pytest.raises(WebDriverException):
+        pool.acquire(params)
+    assert pool.stats()["cold_starts"] == 1
+
+
+def test_close_quits_sessions_still_starting(params, fake_webdriver):
+    fake_webdriver.session_delay = 0.3
+    pool = SessionPool(create_driver, size=2)
+    pool.prewarm(params)
+
+    pool.close()
+
+    assert fake_webdriver.sessions_created == 2
+    assert fake_webdriver.active_sessions == 0
+
+
+def test_close_waits_for_released_sessions(params, fake_webdriver):
+    fake_webdriver.command_latency = 0.2
+    pool = SessionPool(create_driver, size=0)
+    driver = pool.acquire(params)
+    pool.release(driver)
+
+    pool.close()
+
+    assert fake_webdriver.active_sessions == 0
@@ -0,0 +1,61 @@
+"""SmartWait labels and SourceSnapshot XPath support."""
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+
+from smart_wait import SmartWait, SourceSnapshot
+
+SOURCE = '<hierarchy><node content-desc="test-LOGIN" displayed="true"/></hierarchy>'
+
+
+class Executor:
+    def execute(self, command, params):
+        return {}
+
+
+class StubDriver:
+    """Driver with no elements and a fixed page source."""
+
+    def __init__(self):
+        self.command_executor = Executor()
+        self.page_source = SOURCE
+        self.title = ""
+
+    def find_element(self, by, value):
+        raise NoSuchElementException(value)
+
+
+def test_timeout_names_the_expected_condition_and_locator():
+    wait = SmartWait(StubDriver(), timeout=0.05, poll=0.01)
+    with pytest.raises(TimeoutException, match="presence_of_element_located test-LOGIN"):
+        wait.until(EC.presence_of_element_located(("accessibility id", "test-LOGIN")))
+    assert wait.history[-1].label == "presence_of_element_located test-LOGIN"
+    assert wait.history[-1].timed_out
+
+
+def test_timeout_names_text_conditions():
+    wait = SmartWait(StubDriver(), timeout=0.05, poll=0.01)
+    with pytest.raises(TimeoutException, match="title_is Products"):
+        wait.until(EC.title_is("Products"))
+
+
+def test_plain_functions_keep_their_name():
+    def logged_in(driver):
+        return False
+
+    wait = SmartWait(StubDriver(), timeout=0.05, poll=0.01)
+    with pytest.raises(TimeoutException, match="logged_in"):
+        wait.until(logged_in)
+
+
+def test_descendant_xpath_is_answered_from_the_source():
+    snapshot = SourceSnapshot(SOURCE)
+    locator = ("xpath", "//node[@content-desc='test-LOGIN']")
+    assert snapshot.supports(locator)
+    assert len(snapshot.match(locator)) == 1
+
+
+def test_absolute_xpath_falls_back_to_a_find():
+    snapshot = SourceSnapshot(SOURCE)
+    assert not snapshot.supports(("xpath", "/hierarchy/node"))
@@ -0,0 +1,37 @@
+"""
+Command line options shared by the check_device_status, pom and parallel suites.
+
+pytest refuses an option registered twice, so the options more than one
+suite reads are added here, once, instead of in each suite's conftest.py.
+pytest.ini next to this file makes this directory the rootdir, so it is
+loaded whichever suite directory pytest runs from.
+"""
+
+import os
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--hub-url",
+        default=os.environ.get("HUB_URL"),
+        help="WebDriver hub to use instead of Sauce Labs (default: $HUB_URL)",
+    )
+    parser.addoption(
+        "--capabilities",
+        default=os.environ.get("CAPABILITIES_FILE"),
+        help="Capability profiles file for driver(profile=...) markers "
+             "(default: $CAPABILITIES_FILE or check_device_status/capabilities.json)",
+    )
+    parser.addoption(
+        "--session-pool",
+        type=int,
+        default=int(os.environ.get("SESSION_POOL", "0")),
+        help="Appium sessions started in the background ahead of the tests, per "
+             "set of driver params (default: $SESSION_POOL or 0, disabled)",
+    )
+    parser.addoption(
+        "--session-idle-timeout",
+        type=float,
+        default=60.0,
+        help="Seconds a pre-started session may wait for a test before it is quit (default: 60)",
+    )
@@ -0,0 +1,44 @@
+import pytest
+
+from page_check import create_driver
+
+# Set once any test of the worker fails; the shared session reports it at the end
+SESSION_FAILED = pytest.StashKey[bool]()
+
+
+def pytest_addoption(parser):
+    # --hub-url comes from the root conftest.py
+    parser.addoption('--shard-file', action='store', default=None,
+                     help='Run only the node ids listed in this file, one per line (set by shard.py)')
+
+
+def pytest_collection_modifyitems(config, items):
+    path = config.getoption('shard_file')
+    if not path:
+        return
+    with open(path, encoding='utf-8') as f:
+        selected = {line.rstrip('\n') for line in f if line.strip()}
+    deselected = [item for item in items if item.nodeid not in selected]
+    items[:] = [item for item in items if item.nodeid in selected]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    if outcome.get_result().failed:
+        item.session.stash[SESSION_FAILED] = True
+
+
+@pytest.fixture(scope="session")
+def driver(request):
+    # One browser session per worker process, shared by all of its tests
+    driver = create_driver(request.config.getoption('hub_url'))
+    yield driver
+    # One job result for the whole session: failed if any of its tests failed
+    status = 'failed' if request.session.stash.get(SESSION_FAILED, False) else 'passed'
+    try:
+        driver.execute_script('sauce:job-result={}'.format(status))
+    finally:
+        driver.quit()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Check many pages with few browser sessions.
+
+Instead of one remote browser per (url, expected title) pair, each session
+visits a batch of URLs in turn and records per page the title, load timing
+from the Navigation Timing API and any error. Batches are pulled from a
+shared queue by ``--sessions`` concurrent sessions; a session is replaced
+after ``--recycle-after`` pages (and as soon as it dies) so long runs do not
+hit Sauce Labs session limits or browser memory growth.
+
+The pages file is CSV: ``url`` or ``url,expected_title`` per row (a header
+row naming ``url`` is skipped). Results are streamed as JSON lines.
+
+    python page_check.py sitemap.csv --sessions 4 --batch-size 50 --recycle-after 200 --output results.jsonl
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from selenium import webdriver
+from selenium.common.exceptions import InvalidSessionIdException, WebDriverException
+from selenium.webdriver.edge.options import Options
+
+remote_url = "https://ondemand.us-west-1.saucelabs.com:443/wd/hub"
+
+# Phases (milliseconds) of the page's navigation entry, with a fallback to
+# the legacy performance.timing object
+NAVIGATION_TIMING_SCRIPT = """
+var nav = performance.getEntriesByType ? performance.getEntriesByType('navigation')[0] : null;
+if (nav) {
+    return {
+        dns: nav.domainLookupEnd - nav.domainLookupStart,
+        connect: nav.connectEnd - nav.connectStart,
+        ttfb: nav.responseStart - nav.requestStart,
+        response: nav.responseEnd - nav.responseStart,
+        dom_content_loaded: nav.domContentLoadedEventEnd,
+        load: nav.loadEventEnd,
+        transfer_size: nav.transferSize
+    };
+}
+var t = performance.timing;
+return {
+    dns: t.domainLookupEnd - t.domainLookupStart,
+    connect: t.connectEnd - t.connectStart,
+    ttfb: t.responseStart - t.requestStart,
+    response: t.responseEnd - t.responseStart,
+    dom_content_loaded: t.domContentLoadedEventEnd - t.navigationStart,
+    load: t.loadEventEnd - t.navigationStart,
+    transfer_size: null
+};
+"""
+
+
+def create_driver(hub_url=None, name='Check Page Title'):
+    options = Options()
+    options.browser_version = 'latest'
+    options.platform_name = 'Windows 10'
+
+    sauce_options = {}
+    sauce_options['username'] = os.environ.get("SAUCE_USERNAME")
+    sauce_options['accessKey'] = os.environ.get("SAUCE_ACCESS_KEY")
+    sauce_options['build'] = 'Pytest Parallel Test'
+    sauce_options['name'] = name
+    options.set_capability('sauce:options', sauce_options)
+
+    return webdriver.Remote(command_executor=hub_url or remote_url, options=options)
+
+
+@dataclass
+class PageResult:
+    """What one page visit found."""
+
+    url: str
+    expected_title: Optional[str]
+    title: Optional[str]
+    ok: bool
+    started_at: float
+    duration: float
+    # Navigation Timing phases in milliseconds (None when unavailable)
+    timing: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    session_id: Optional[str] = None
+
+    @property
+    def load_time(self) -> Optional[float]:
+        """Milliseconds until the load event, from Navigation Timing."""
+        load = (self.timing or {}).get('load')
+        return load if isinstance(load, (int, float)) and load > 0 else None
+
+
+def load_pages(path: str) -> List[Tuple[str, Optional[str]]]:
+    """Read (url, expected title or None) rows from a CSV file."""
+    pages = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            row = [cell.strip() for cell in row]
+            if not row or not row[0] or row[0].startswith('#'):
+                continue
+            if not pages and row[0].lower() == 'url':
+                continue
+            pages.append((row[0], row[1] if len(row) > 1 and row[1] else None))
+    return pages
+
+
+def batches(pages: Sequence[Tuple[str, Optional[str]]], size: int) -> Iterator[List[Tuple[str, Optional[str]]]]:
+    """Consecutive batches of at most ``size`` pages."""
+    for start in range(0, len(pages), size):
+        yield list(pages[start:start + size])
+
+
+def check_page(driver, url: str, expected_title: Optional[str]) -> PageResult:
+    """Visit one page and record its title, timing and error."""
+    started_at = time.time()
+    started = time.monotonic()
+    title = timing = error = None
+    try:
+        driver.get(url)
+        title = driver.title
+        timing = driver.execute_script(NAVIGATION_TIMING_SCRIPT)
+    except WebDriverException as e:
+        message = (e.msg or '').strip().splitlines()
+        error = f"{type(e).__name__}: {message[0]}" if message else type(e).__name__
+    ok = error is None and (expected_title is None or title == expected_title)
+    if error is None and not ok:
+        error = f"Page title mismatch. Expected: {expected_title}, Actual: {title}"
+    return PageResult(url, expected_title, title, ok, started_at, time.monotonic() - started,
+                      timing if isinstance(timing, dict) else None, error, driver.session_id)
+
+
+class PageChecker:
+    """Runs page batches over a few recycled browser sessions."""
+
+    def __init__(
+        self,
+        factory: Callable[[], Any] = create_driver,
+        sessions: int = 1,
+        batch_size: int = 50,
+        recycle_after: int = 200,
+        page_timeout: float = 60.0,
+        on_result: Optional[Callable[[PageResult], None]] = None
+    ):
+        """
+        Initialize the checker.
+
+        Args:
+            factory: Starts a new browser session
+            sessions: Sessions visiting pages at the same time
+            batch_size: Pages a session takes from the queue at once
+            recycle_after: Pages after which a session is replaced
+            page_timeout: Page load timeout in seconds
+            on_result: Called with every result as soon as it is known
+        """
+        self.factory = factory
+        self.sessions = max(1, sessions)
+        self.batch_size = max(1, batch_size)
+        self.recycle_after = max(1, recycle_after)
+        self.page_timeout = page_timeout
+        self.on_result = on_result
+        self.sessions_started = 0
+        self.results: List[PageResult] = []
+        self._lock = threading.Lock()
+
+    def run(self, pages: Sequence[Tuple[str, Optional[str]]]) -> List[PageResult]:
+        """Check every page and return the results in completion order."""
+        work: "queue.Queue[List[Tuple[str, Optional[str]]]]" = queue.Queue()
+        for batch in batches(pages, self.batch_size):
+            work.put(batch)
+        threads = [
+            threading.Thread(target=self._session_loop, args=(work,), name=f'page-session-{index}', daemon=True)
+            for index in range(min(self.sessions, work.qsize()))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.results
+
+    def _session_loop(self, work: queue.Queue) -> None:
+        driver = None
+        visited = 0
+        failed = False
+        try:
+            while True:
+                try:
+                    batch = work.get_nowait()
+                except queue.Empty:
+                    return
+                for url, expected_title in batch:
+                    if driver is not None and visited >= self.recycle_after:
+                        self._quit(driver, failed)
+                        driver = None
+                    if driver is None:
+                        try:
+                            driver = self._start()
+                        except WebDriverException as e:
+                            self._record(PageResult(url, expected_title, None, False, time.time(), 0.0,
+                                                    error=f'session: {type(e).__name__}'))
+                            continue
+                        visited, failed = 0, False
+                    result = check_page(driver, url, expected_title)
+                    visited += 1
+                    failed = failed or not result.ok
+                    self._record(result)
+                    if result.error and result.error.startswith(InvalidSessionIdException.__name__):
+                        # The session died; the next page gets a new one
+                        self._quit(driver, True)
+                        driver = None
+        finally:
+            if driver is not None:
+                self._quit(driver, failed)
+
+    def _start(self):
+        driver = self.factory()
+        with self._lock:
+            self.sessions_started += 1
+        try:
+            driver.set_page_load_timeout(self.page_timeout)
+        except WebDriverException:
+            self._quit(driver, True)
+            raise
+        return driver
+
+    def _quit(self, driver, failed: bool) -> None:
+        try:
+            driver.execute_script("sauce:job-result={}".format("failed" if failed else "passed"))
+        except WebDriverException:
+            pass
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def _record(self, result: PageResult) -> None:
+        with self._lock:
+            self.results.append(result)
+            if self.on_result is not None:
+                self.on_result(result)
+
+
+def summarize(results: Sequence[PageResult], sessions_started: int, wall_time: float) -> Dict[str, Any]:
+    """Totals, load time percentiles and the failed pages."""
+    load_times = sorted(result.load_time for result in results if result.load_time is not None)
+
+    def percentile(q):
+        return load_times[min(len(load_times) - 1, int(len(load_times) * q / 100))] if load_times else None
+
+    return {
+        'pages': len(results),
+        'ok': sum(result.ok for result in results),
+        'failed': sum(not result.ok for result in results),
+        'sessions': sessions_started,
+        'wall_time': round(wall_time, 3),
+        'pages_per_min': round(len(results) / wall_time * 60, 1) if wall_time > 0 else 0.0,
+        'mean_visit': round(statistics.mean(result.duration for result in results), 3) if results else None,
+        'load_ms': {'p50': percentile(50), 'p95': percentile(95), 'max': load_times[-1] if load_times else None},
+        'failures': [{'url': result.url, 'error': result.error} for result in results if not result.ok],
+    }
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Check page titles and load timing over few browser sessions')
+    parser.add_argument('pages', help='CSV file of url[,expected_title] rows')
+    parser.add_argument('--sessions', type=int, default=1, help='Concurrent browser sessions (default: 1)')
+    parser.add_argument('--batch-size', type=int, default=50, help='Pages a session takes at once (default: 50)')
+    parser.add_argument('--recycle-after', type=int, default=200,
+                        help='Start a new session after this many pages (default: 200)')
+    parser.add_argument('--page-timeout', type=float, default=60.0, help='Page load timeout in seconds (default: 60)')
+    parser.add_argument('--hub-url', default=os.environ.get('HUB_URL'), help='WebDriver hub to use instead of Sauce Labs')
+    parser.add_argument('--output', default=None, help='Write one JSON line per page to this file')
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages)
+    if not pages:
+        parser.error(f'No pages in {args.pages}')
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else None
+
+    def on_result(result):
+        if output is not None:
+            output.write(json.dumps({**asdict(result), 'load_time': result.load_time}) + '\n')
+            output.flush()
+        if not result.ok:
+            print(f'FAIL {result.url}: {result.error}')
+
+    checker = PageChecker(
+        factory=lambda: create_driver(args.hub_url, name='Check Page Titles (batch)'),
+        sessions=args.sessions,
+        batch_size=args.batch_size,
+        recycle_after=args.recycle_after,
+        page_timeout=args.page_timeout,
+        on_result=on_result,
+    )
+    started = time.monotonic()
+    try:
+        results = checker.run(pages)
+    finally:
+        if output is not None:
+            output.close()
+    summary = summarize(results, checker.sessions_started, time.monotonic() - started)
+    print(json.dumps({key: value for key, value in summary.items() if key != 'failures'}, indent=2))
+    sys.exit(0 if summary['failed'] == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
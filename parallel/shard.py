@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Split a pytest suite across local worker processes (no pytest-xdist needed).
+
+The coordinator collects the node ids once, gives each of N workers a shard
+so their expected run times are even (longest cases first onto the least
+loaded worker), starts one pytest process per shard and merges the workers'
+junit-xml into one file. Expected run times come from earlier junit-xml
+results (by default the merged file of the previous run); cases without
+history count as the median known duration. Each worker keeps one browser
+session for all of its tests (session-scoped ``driver`` fixture), so wall
+time for a large URL matrix drops close to 1/N.
+
+    python shard.py --workers 4
+    python shard.py --workers 8 --junitxml results.xml -- -k page_title
+"""
+
+import argparse
+import heapq
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_JUNITXML = os.path.join(HERE, 'shard-results.xml')
+# Expected duration of a case nothing is known about
+DEFAULT_DURATION = 1.0
+
+
+@dataclass
+class Shard:
+    """Node ids assigned to one worker."""
+
+    index: int
+    nodeids: List[str] = field(default_factory=list)
+    expected: float = 0.0
+    exit_code: Optional[int] = None
+    duration: float = 0.0
+
+
+def collect(pytest_args: Sequence[str], cwd: str = HERE) -> List[str]:
+    """Node ids pytest would run, in collection order."""
+    result = subprocess.run(
+        [sys.executable, '-m', 'pytest', '--collect-only', '-q', '-p', 'no:cacheprovider', f'--rootdir={cwd}',
+         *pytest_args],
+        cwd=cwd, capture_output=True, text=True, check=False
+    )
+    nodeids = [line.strip() for line in result.stdout.splitlines() if '::' in line]
+    if result.returncode not in (0, 5) or (result.returncode == 0 and not nodeids):
+        raise RuntimeError(f'Collection failed:\n{result.stdout}{result.stderr}')
+    return nodeids
+
+
+def junit_key(nodeid: str) -> Tuple[str, str]:
+    """(classname, name) junit-xml uses for a node id."""
+    parts = nodeid.split('::')
+    path = parts[0][:-3] if parts[0].endswith('.py') else parts[0]
+    classname = '.'.join([path.replace('/', '.'), *parts[1:-1]])
+    return classname, parts[-1]
+
+
+def load_durations(paths: Sequence[str]) -> Dict[Tuple[str, str], float]:
+    """Test durations from junit-xml files; later files win."""
+    durations: Dict[Tuple[str, str], float] = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            root = ET.parse(path).getroot()
+        except ET.ParseError:
+            continue
+        for case in root.iter('testcase'):
+            try:
+                durations[(case.get('classname', ''), case.get('name', ''))] = float(case.get('time', 0))
+            except ValueError:
+                continue
+    return durations
+
+
+def plan(nodeids: Sequence[str], durations: Dict[Tuple[str, str], float], workers: int) -> List[Shard]:
+    """
+    Assign node ids to workers, balancing expected time (longest first).
+
+    Returns:
+        Up to ``workers`` non-empty shards; node ids keep collection order
+        inside each shard
+    """
+    known = [durations[junit_key(nodeid)] for nodeid in nodeids if junit_key(nodeid) in durations]
+    default = statistics.median(known) if known else DEFAULT_DURATION
+    expected = {nodeid: durations.get(junit_key(nodeid), default) for nodeid in nodeids}
+    order = {nodeid: position for position, nodeid in enumerate(nodeids)}
+
+    shards = [Shard(index) for index in range(max(1, min(workers, len(nodeids))))]
+    heap = [(0.0, shard.index) for shard in shards]
+    for nodeid in sorted(nodeids, key=lambda nodeid: (-expected[nodeid], order[nodeid])):
+        load, index = heapq.heappop(heap)
+        shards[index].nodeids.append(nodeid)
+        shards[index].expected = load + expected[nodeid]
+        heapq.heappush(heap, (shards[index].expected, index))
+    for shard in shards:
+        shard.nodeids.sort(key=order.__getitem__)
+    return [shard for shard in shards if shard.nodeids]
+
+
+def merge_junit(paths: Sequence[str], output: str) -> None:
+    """Combine the workers' junit-xml test suites into one file."""
+    merged = ET.Element('testsuites')
+    for path in paths:
+        try:
+            root = ET.parse(path).getroot()
+        except (ET.ParseError, OSError):
+            continue
+        merged.extend(root.iter('testsuite') if root.tag == 'testsuites' else [root])
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output)), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        ET.ElementTree(merged).write(f, encoding='utf-8', xml_declaration=True)
+    os.replace(tmp_path, output)
+
+
+def run_shards(shards: List[Shard], pytest_args: Sequence[str], workdir: str, cwd: str = HERE) -> List[str]:
+    """
+    Run one pytest worker process per shard and wait for all of them.
+
+    Returns:
+        The workers' junit-xml paths
+    """
+    processes = []
+    junit_paths = []
+    for shard in shards:
+        shard_file = os.path.join(workdir, f'shard-{shard.index}.txt')
+        with open(shard_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(shard.nodeids) + '\n')
+        junit_path = os.path.join(workdir, f'shard-{shard.index}.xml')
+        junit_paths.append(junit_path)
+        log = open(os.path.join(workdir, f'shard-{shard.index}.log'), 'w+', encoding='utf-8')
+        command = [
+            sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider', f'--rootdir={cwd}',
+            # Node ids are relative to the rootdir, so it must match the collection run's
+            f'--shard-file={shard_file}', f'--junitxml={junit_path}', *pytest_args,
+        ]
+        processes.append((shard, subprocess.Popen(command, cwd=cwd, stdout=log, stderr=subprocess.STDOUT), log, time.monotonic()))
+
+    for shard, process, log, started in processes:
+        shard.exit_code = process.wait()
+        shard.duration = time.monotonic() - started
+        log.seek(0)
+        print(f'----- worker {shard.index} ({len(shard.nodeids)} tests, exit {shard.exit_code}) -----')
+        print(log.read().rstrip())
+        log.close()
+    return junit_paths
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Run a pytest suite in N balanced worker processes')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--junitxml', default=DEFAULT_JUNITXML,
+                        help='Merged junit-xml output, also read as duration history (default: shard-results.xml)')
+    parser.add_argument('--durations', action='append', default=[],
+                        help='More junit-xml files with past durations (repeatable)')
+    parser.add_argument('pytest_args', nargs='*', help='pytest arguments (after --), e.g. test paths or -k')
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    started = time.monotonic()
+    nodeids = collect(args.pytest_args)
+    if not nodeids:
+        print('No tests collected')
+        sys.exit(5)
+    durations = load_durations([*args.durations, args.junitxml])
+    shards = plan(nodeids, durations, args.workers)
+    for shard in shards:
+        print(f'worker {shard.index}: {len(shard.nodeids)} tests, expected {shard.expected:.1f}s')
+
+    with tempfile.TemporaryDirectory(prefix='shards-') as workdir:
+        junit_paths = run_shards(shards, args.pytest_args, workdir)
+        merge_junit(junit_paths, args.junitxml)
+
+    wall_time = time.monotonic() - started
+    busy = sum(shard.duration for shard in shards)
+    print('=' * 60)
+    for shard in shards:
+        print(f'worker {shard.index}: exit {shard.exit_code}, {shard.duration:.1f}s (expected {shard.expected:.1f}s)')
+    print(f'{len(nodeids)} tests on {len(shards)} workers in {wall_time:.1f}s '
+          f'(worker time {busy:.1f}s); results in {args.junitxml}')
+    print('=' * 60)
+    sys.exit(max(shard.exit_code or 0 for shard in shards))
+
+
+if __name__ == '__main__':
+    main()
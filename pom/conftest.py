@@ -1,69 +1,138 @@
 import pytest
 import os
-from appium import webdriver
-from appium.options.common import AppiumOptions
-
-from views.home_view import HomeView
-
-IOS_APP = 'storage:filename=iOS.RealDevice.SauceLabs.Mobile.Sample.app.2.7.1.ipa'
-ANDROID_APP = 'storage:filename=Android.SauceLabs.Mobile.Sample.app.2.7.1.apk'
-APPIUM = 'https://ondemand.us-west-1.saucelabs.com:443/wd/hub'
-
-
-def create_ios_caps():
-    IOS_CAPS = {}
-    IOS_CAPS['platformName'] = 'iOS'
-    IOS_CAPS['appium:deviceName'] = 'iPhone.*'
-    IOS_CAPS['appium:automationName'] = 'XCUITest'
-    IOS_CAPS['appium:app'] = IOS_APP
-    IOS_CAPS['sauce:options'] = {}
-    IOS_CAPS['sauce:options']['appiumVersion'] = 'latest'
-    IOS_CAPS['sauce:options']['username'] = os.environ.get("SAUCE_USERNAME")
-    IOS_CAPS['sauce:options']['accessKey'] = os.environ.get("SAUCE_ACCESS_KEY")
-    IOS_CAPS['sauce:options']['build'] = 'SwagLabs pytest'
-    IOS_CAPS['sauce:options']['name'] = 'Sign In - iOS'
-    return IOS_CAPS
-
-
-def create_android_caps():
-    ANDROID_CAPS = {}
-    ANDROID_CAPS['platformName'] = 'Android'
-    ANDROID_CAPS['appium:deviceName'] = 'Google.*'
-    ANDROID_CAPS['appium:automationName'] = 'UIAutomator2'
-    ANDROID_CAPS['appium:app'] = ANDROID_APP
-    ANDROID_CAPS['sauce:options'] = {}
-    ANDROID_CAPS['sauce:options']['appiumVersion'] = 'latest'
-    ANDROID_CAPS['sauce:options']['username'] = os.environ.get("SAUCE_USERNAME")
-    ANDROID_CAPS['sauce:options']['accessKey'] = os.environ.get("SAUCE_ACCESS_KEY")
-    ANDROID_CAPS['sauce:options']['build'] = 'SwagLabs pytest'
-    ANDROID_CAPS['sauce:options']['name'] = 'Sign In - Android'
-    return ANDROID_CAPS
+import sys
+from dataclasses import replace
+
+# Driver creation, the session pool and capability profiles come from the device
+# checker, so this conftest still imports from check_device_status. The views only
+# need the smart_wait package, which is on sys.path from the root pytest.ini.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'check_device_status'))
+from appium_sessions import DriverParams, create_driver, reset_app  # noqa: E402
+from capabilities import CapabilityRegistry  # noqa: E402
+from session_pool import SessionPool  # noqa: E402
+from views.home_view import HomeView  # noqa: E402
+
+SESSION_POOL = pytest.StashKey[SessionPool]()
+PLATFORM_SESSIONS = pytest.StashKey[dict]()
+CAPABILITIES = pytest.StashKey[CapabilityRegistry]()
+
+PLATFORMS = ('ios', 'android')
+SESSION_SCOPES = ('test', 'platform')
+# capabilities.json profile of each platform
+PROFILES = {'ios': 'swaglabs-ios', 'android': 'swaglabs-android'}
+
+
+def driver_params(config, platform, markers=()):
+    # Only the requested platform's profile is resolved; markers override it
+    profile = pytest.mark.driver(profile=PROFILES[platform]).mark
+    params = DriverParams.from_markers([*markers, profile], registry=config.stash[CAPABILITIES])
+    hub_url = config.getoption('hub_url')
+    return replace(params, hub_url=hub_url) if hub_url else params
+
+
+def selected_platforms(config):
+    value = config.getoption('platform').lower()
+    platforms = list(PLATFORMS) if value == 'all' else [p.strip() for p in value.split(',') if p.strip()]
+    if not platforms or any(p not in PLATFORMS for p in platforms):
+        raise pytest.UsageError('--platform value must be ios, android, all or a comma-separated list')
+    return list(dict.fromkeys(platforms))
 
 
 def pytest_addoption(parser):
-    parser.addoption('--platform', action='store', default='android')
+    parser.addoption('--platform', action='store', default='android',
+                     help='ios, android, all or a comma-separated list; tests run once per platform')
+    parser.addoption('--session-scope', action='store', choices=SESSION_SCOPES,
+                     default=os.environ.get('SESSION_SCOPE', 'test'),
+                     help='New session per test (default) or one session per platform, '
+                          'with the app restarted between tests')
+    # --hub-url, --capabilities, --session-pool and --session-idle-timeout
+    # come from the root conftest.py
 
 
-@pytest.fixture
-def platform(request):
-    plat = request.config.getoption('platform').lower()
-    if plat not in ['ios', 'android']:
-        raise ValueError('--platform value must be ios or android')
-    return plat
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'driver(**params): overrides of the platform profile (device_name, app, ...)')
+    selected_platforms(config)
+    config.stash[CAPABILITIES] = CapabilityRegistry(config.getoption('capabilities'))
+    config.stash[PLATFORM_SESSIONS] = {}
+    if config.getoption('session_pool') > 0:
+        config.stash[SESSION_POOL] = SessionPool(
+            create_driver,
+            size=config.getoption('session_pool'),
+            idle_timeout=config.getoption('session_idle_timeout'),
+        )
+
+
+def pytest_collection_finish(session):
+    pool = session.config.stash.get(SESSION_POOL, None)
+    if session.config.option.collectonly:
+        return
+    if pool is not None:
+        for params in dict.fromkeys(
+            driver_params(session.config, item.callspec.params['platform'], item.iter_markers('driver'))
+            for item in session.items if 'driver' in getattr(item, 'fixturenames', ())
+        ):
+            pool.prewarm(params)
+
+
+def pytest_unconfigure(config):
+    for driver in config.stash.get(PLATFORM_SESSIONS, {}).values():
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    pool = config.stash.get(SESSION_POOL, None)
+    if pool is not None:
+        pool.close()
+
+
+def pytest_generate_tests(metafunc):
+    # One test per selected platform, e.g. test_sign_in[ios] and test_sign_in[android]
+    if 'platform' in metafunc.fixturenames:
+        metafunc.parametrize('platform', selected_platforms(metafunc.config), scope='session')
+
+
+def _new_driver(config, params):
+    pool = config.stash.get(SESSION_POOL, None)
+    if pool is None:
+        return create_driver(params)
+    # A pre-started session; the pool starts the next one right away
+    return pool.acquire(params)
+
+
+def _platform_driver(config, params):
+    # Reuse the platform's session with a restarted app; replace it if it died
+    sessions = config.stash[PLATFORM_SESSIONS]
+    driver = sessions.get(params)
+    if driver is not None:
+        try:
+            reset_app(driver, params.bundle_id)
+            return driver
+        except Exception:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+    sessions[params] = _new_driver(config, params)
+    return sessions[params]
 
 
 @pytest.fixture
-def driver(platform):
-    ios_caps = create_ios_caps()
-    android_caps = create_android_caps()
-    if platform == 'ios':
-        caps = ios_caps
-    else:
-        caps = android_caps
-    driver = webdriver.Remote(APPIUM, options=AppiumOptions().load_capabilities(caps))
+def driver(request, platform):
+    config = request.config
+    params = driver_params(config, platform, request.node.iter_markers('driver'))
+    if config.getoption('session_scope') == 'platform':
+        driver = _platform_driver(config, params)
+        driver._platform = platform
+        yield driver
+        return
+    pool = config.stash.get(SESSION_POOL, None)
+    driver = _new_driver(config, params)
     driver._platform = platform
     yield driver
-    driver.quit()
+    if pool is None:
+        driver.quit()
+    else:
+        pool.release(driver)
 
 
 @pytest.fixture
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Run the POM suite on iOS and Android at the same time.
+
+One pytest worker per platform runs concurrently (``--platform <name>``,
+``--session-scope platform``), so each worker opens one Appium session and
+reuses it, restarting the app, for every test of its platform. The workers'
+per-test results are merged into one report: a table per test and platform,
+and optionally a JSON file in the device checker's summary format.
+
+    python run_platforms.py
+    python run_platforms.py --platforms ios,android --json report.json -- -k sign_in
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+POM_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKER_DIR = os.path.join(POM_DIR, '..', 'check_device_status')
+sys.path.insert(0, CHECKER_DIR)
+
+from pytest_runners import make_runner  # noqa: E402
+from run_results import RunResult, RunSummary, new_result_log, read_result_log  # noqa: E402
+
+PLATFORMS = ('ios', 'android')
+WORKER_MODES = ('subprocess', 'warm')
+
+
+def _worker_args(platform: str, result_log: str, session_scope: str, extra: List[str]) -> List[str]:
+    return [
+        '-q', '-p', 'result_plugin', '--result-log', result_log,
+        '--platform', platform, '--session-scope', session_scope, *extra,
+    ]
+
+
+def _worker_env() -> Dict[str, str]:
+    env = os.environ.copy()
+    # Make result_plugin importable in the workers
+    env['PYTHONPATH'] = os.pathsep.join(
+        path for path in (os.path.abspath(CHECKER_DIR), env.get('PYTHONPATH')) if path
+    )
+    return env
+
+
+def run_platforms(
+    platforms: List[str],
+    session_scope: str = 'platform',
+    mode: str = 'subprocess',
+    extra_args: Optional[List[str]] = None
+) -> RunSummary:
+    """
+    Run the suite once per platform, all platforms at once.
+
+    Args:
+        platforms: Platforms to run (each gets its own worker)
+        session_scope: "platform" to share one session per worker, or "test"
+        mode: "subprocess" (fresh interpreters) or "warm" (pre-started workers)
+        extra_args: More pytest arguments (test selection, -k, ...)
+
+    Returns:
+        Summary with one run per platform
+    """
+    runner = make_runner(mode, workers=len(platforms))
+    summary = RunSummary()
+    env = _worker_env()
+
+    def run(platform: str) -> RunResult:
+        result_log = new_result_log()
+        started_at = time.time()
+        started = time.monotonic()
+        exit_code = runner.run(_worker_args(platform, result_log, session_scope, extra_args or []), env, POM_DIR)
+        return RunResult(
+            script='pom',
+            device_id=platform,
+            exit_code=exit_code,
+            started_at=started_at,
+            duration=time.monotonic() - started,
+            tests=read_result_log(result_log),
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(platforms)) as executor:
+            for result in executor.map(run, platforms):
+                summary.add(result)
+    finally:
+        runner.close()
+    return summary
+
+
+def print_report(summary: RunSummary, wall_time: float) -> None:
+    """Print the merged per-test, per-platform outcomes."""
+    platforms = [run.device_id for run in summary.runs]
+    outcomes: Dict[str, Dict[str, str]] = {}
+    for run in summary.runs:
+        for test in run.tests:
+            # test_login.py::test_sign_in[ios] -> test_login.py::test_sign_in
+            nodeid = test['nodeid'].replace(f'[{run.device_id}]', '')
+            outcomes.setdefault(nodeid, {})[run.device_id] = f"{test['outcome']} {test['duration']:.1f}s"
+
+    width = max([len(nodeid) for nodeid in outcomes] + [4])
+    print('=' * 60)
+    print('test'.ljust(width) + ''.join(f'  {platform:<16}' for platform in platforms))
+    for nodeid, by_platform in sorted(outcomes.items()):
+        print(nodeid.ljust(width) + ''.join(f"  {by_platform.get(p, '-'):<16}" for p in platforms))
+    for run in summary.runs:
+        print(f'{run.device_id}: exit {run.exit_code}, {run.describe()}')
+    sequential = sum(run.duration for run in summary.runs)
+    print(f'Wall time: {wall_time:.1f}s (platforms back to back: {sequential:.1f}s)')
+    print('=' * 60)
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description='Run the POM suite on several platforms concurrently')
+    parser.add_argument('--platforms', default=','.join(PLATFORMS),
+                        help='Comma-separated platforms (default: ios,android)')
+    parser.add_argument('--session-scope', choices=('test', 'platform'), default='platform',
+                        help='One session per platform (default) or per test')
+    parser.add_argument('--mode', choices=WORKER_MODES, default='subprocess',
+                        help='Workers as fresh interpreters (default) or pre-started processes')
+    parser.add_argument('--json', dest='json_path', default=None, help='Also write the merged report to this JSON file')
+    parser.add_argument('pytest_args', nargs='*', help='Extra pytest arguments (after --)')
+    args = parser.parse_args()
+
+    platforms = [p.strip() for p in args.platforms.split(',') if p.strip()]
+    unknown = [p for p in platforms if p not in PLATFORMS]
+    if not platforms or unknown:
+        parser.error(f"--platforms must list {' and/or '.join(PLATFORMS)}")
+
+    started = time.monotonic()
+    summary = run_platforms(platforms, args.session_scope, args.mode, args.pytest_args)
+    print_report(summary, time.monotonic() - started)
+    if args.json_path:
+        summary.write_json(args.json_path)
+    sys.exit(0 if all(run.exit_code == 0 for run in summary.runs) else 1)
+
+
+if __name__ == '__main__':
+    main()
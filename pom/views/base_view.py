@@ -1,16 +1,94 @@
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import StaleElementReferenceException
+
+from smart_wait import SmartWait, batch_find
+
+
+class CachedElement(object):
+    """Cached element that finds itself again once if it went stale."""
+
+    def __init__(self, view, locator, element):
+        self._view = view
+        self._locator = locator
+        self._element = element
+
+    def _refresh(self):
+        self._element = self._view.driver.find_element(*self._locator)
+
+    def __getattr__(self, name):
+        try:
+            attribute = getattr(self._element, name)
+        except StaleElementReferenceException:
+            self._refresh()
+            attribute = getattr(self._element, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            try:
+                return getattr(self._element, name)(*args, **kwargs)
+            except StaleElementReferenceException:
+                self._refresh()
+                return getattr(self._element, name)(*args, **kwargs)
+
+        return call
 
 
 class BaseView(object):
-    def __init__(self, driver):
+    def __init__(self, driver, timeout=10):
         self.driver = driver
-        self.wait = WebDriverWait(self.driver, 10)
+        self.wait = SmartWait(self.driver, timeout)
+        # Elements found on the current screen; cleared on navigation
+        self._elements = {}
+
+    @classmethod
+    def locators(cls):
+        # Locators declared as upper-case class attributes, e.g. LOGIN_BUTTON
+        return [
+            value for name, value in vars(cls).items()
+            if name.isupper() and isinstance(value, tuple) and len(value) == 2
+        ]
+
+    def _cache(self, locator, element):
+        self._elements[locator] = CachedElement(self, locator, element)
+        return self._elements[locator]
 
     def wait_for(self, locator):
-        return self.wait.until(EC.presence_of_element_located(locator))
+        if locator not in self._elements:
+            self._cache(locator, self.wait.presence(locator))
+        return self._elements[locator]
+
+    def wait_for_all(self, *locators):
+        # One page-source check per poll for all locators, then one batched find
+        missing = [locator for locator in locators if locator not in self._elements]
+        if len(missing) > 1:
+            self.wait.all_present(missing)
+            self.resolve(*missing, snapshot=self.wait.last_snapshot)
+        return [self.wait_for(locator) for locator in locators]
+
+    def resolve(self, *locators, snapshot=None):
+        # Find several locators (default: all declared ones on screen) in as
+        # few calls as possible; the rest are found one by one when used
+        locators = locators or self.locators()
+        missing = [locator for locator in locators if locator not in self._elements]
+        if len(missing) > 1:
+            snapshot = snapshot or self.wait.snapshot()
+            for locator, element in batch_find(self.driver, missing, snapshot).items():
+                self._cache(locator, element)
+        return {locator: self._elements.get(locator) for locator in locators}
 
     def find(self, locator):
-        return self.driver.find_element(*locator)
+        if locator not in self._elements:
+            self._cache(locator, self.driver.find_element(*locator))
+        return self._elements[locator]
+
+    def tap(self, locator, navigates=True):
+        self.wait_for(locator).click()
+        if navigates:
+            self.invalidate()
 
+    def invalidate(self):
+        self._elements.clear()
 
+    @property
+    def round_trips(self):
+        return self.wait.round_trips
@@ -11,9 +11,13 @@ class HomeView(BaseView):
     DISPLAY_PRODUCTS = (AppiumBy.ACCESSIBILITY_ID, 'test-PRODUCTS')
 
     def sign_in(self):
-        self.wait_for(self.USERNAME_FIELD).send_keys('standard_user')
-        self.wait_for(self.PASSWORD_FIELD).send_keys('secret_sauce')
-        self.wait_for(self.LOGIN_BUTTON).click()
+        username, password, login = self.wait_for_all(
+            self.USERNAME_FIELD, self.PASSWORD_FIELD, self.LOGIN_BUTTON
+        )
+        username.send_keys('standard_user')
+        password.send_keys('secret_sauce')
+        login.click()
+        self.invalidate()
         try:
             if self.wait_for(self.DISPLAY_PRODUCTS).is_displayed():
                 status = "passed"
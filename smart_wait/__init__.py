@@ -0,0 +1,25 @@
+"""
+Wait engine shared by the device checker tests and the POM views.
+
+See ``smart_wait.wait`` for how SmartWait and batch_find() save Appium round
+trips. The repository root is on ``sys.path`` for every suite (pytest.ini),
+so both import it as ``from smart_wait import SmartWait``.
+"""
+
+from smart_wait.wait import (
+    Locator,
+    SmartWait,
+    SourceSnapshot,
+    WaitRecord,
+    batch_find,
+    round_trips,
+)
+
+__all__ = [
+    "Locator",
+    "SmartWait",
+    "SourceSnapshot",
+    "WaitRecord",
+    "batch_find",
+    "round_trips",
+]
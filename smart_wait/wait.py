@@ -0,0 +1,365 @@
+"""
+Wait engine with fewer Appium round trips than WebDriverWait.
+
+SmartWait is a drop-in for ``WebDriverWait(driver, timeout).until(condition)``
+(expected_conditions keep working) with three differences:
+
+- Adaptive polling: the first check runs at once, then the interval grows
+  from ``poll`` to ``max_poll``. It never drops below twice the latency of
+  the last check, so slow links poll less often, and time spent in the
+  remote call counts towards the interval instead of being added to it.
+- Combined conditions: all_present()/any_present() check several locators
+  against a single page-source fetch per poll instead of one find per
+  locator, falling back to individual finds for locators the source cannot
+  answer (e.g. iOS predicates).
+- Round-trip accounting: every HTTP command the driver sends is counted, and
+  each wait records how many it took (``history``).
+
+batch_find() resolves several accessibility-id locators with one combined
+find_elements call (an iOS predicate or an Android UiSelector regex), using
+a page-source snapshot to tell which returned element belongs to which
+locator.
+"""
+
+import re
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+
+Locator = Tuple[str, str]
+
+# Page-source attributes that hold each locator strategy's value (iOS, Android)
+SOURCE_ATTRIBUTES = {
+    "accessibility id": ("name", "content-desc"),
+    "id": ("name", "resource-id"),
+    "name": ("name",),
+}
+
+# Page-source attributes telling whether a node is on screen (iOS, Android)
+VISIBILITY_ATTRIBUTES = ("visible", "displayed")
+
+IGNORED_EXCEPTIONS = (NoSuchElementException, StaleElementReferenceException)
+
+# Strategies batch_find() can combine, and the source attribute they match
+BATCH_STRATEGIES = {
+    "ios": (("accessibility id", "name", "id"), "name"),
+    "android": (("accessibility id",), "content-desc"),
+}
+
+
+def round_trips(driver) -> int:
+    """
+    Number of commands the driver has sent since counting was enabled.
+
+    The first call wraps ``driver.command_executor.execute`` with a counter.
+    """
+    executor = driver.command_executor
+    if not hasattr(executor, "_round_trips"):
+        execute = executor.execute
+        executor._round_trips = 0
+
+        def counted_execute(command, params):
+            executor._round_trips += 1
+            return execute(command, params)
+
+        executor.execute = counted_execute
+    return executor._round_trips
+
+
+class SourceSnapshot:
+    """Parsed page source answering locator queries without remote calls."""
+
+    def __init__(self, xml: str):
+        self.root = ET.fromstring(xml.encode("utf-8") if isinstance(xml, str) else xml)
+        self._nodes = list(self.root.iter())
+
+    def supports(self, locator: Locator) -> bool:
+        """Whether the locator can be evaluated against the source."""
+        by, value = locator
+        if by in SOURCE_ATTRIBUTES or by == "class name":
+            return True
+        if by == "xpath":
+            try:
+                self.root.findall(_relative_xpath(value))
+                return True
+            except (SyntaxError, KeyError, ValueError):
+                return False
+        return False
+
+    @property
+    def platform(self) -> str:
+        """``android`` for UiAutomator2 sources, ``ios`` otherwise."""
+        return "android" if self.root.tag == "hierarchy" else "ios"
+
+    def match(self, locator: Locator, visible: bool = False) -> List[ET.Element]:
+        """Nodes matching a supported locator, in document order."""
+        by, value = locator
+        if by in SOURCE_ATTRIBUTES:
+            attributes = SOURCE_ATTRIBUTES[by]
+            nodes = [
+                node for node in self._nodes
+                if any(node.get(attribute) == value for attribute in attributes)
+                or (by == "id" and (node.get("resource-id") or "").endswith(f":id/{value}"))
+            ]
+        elif by == "class name":
+            nodes = [node for node in self._nodes if node.tag == value or node.get("class") == value]
+        else:
+            nodes = self.root.findall(_relative_xpath(value))
+        if visible:
+            nodes = [node for node in nodes if _is_visible(node)]
+        return nodes
+
+
+@dataclass
+class WaitRecord:
+    """What one wait cost."""
+
+    label: str
+    round_trips: int
+    polls: int
+    elapsed: float
+    timed_out: bool = False
+
+
+class SmartWait:
+    """Adaptive-poll wait that counts Appium round trips."""
+
+    def __init__(
+        self,
+        driver,
+        timeout: float = 10.0,
+        poll: float = 0.25,
+        max_poll: float = 1.0,
+        backoff: float = 1.5,
+        ignored_exceptions: Sequence[type] = IGNORED_EXCEPTIONS
+    ):
+        """
+        Initialize the wait.
+
+        Args:
+            driver: WebDriver to poll
+            timeout: Seconds before TimeoutException
+            poll: First interval between checks
+            max_poll: Longest interval between checks
+            backoff: Growth factor of the interval after each miss
+            ignored_exceptions: Exceptions treated as "not yet"
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.poll = poll
+        self.max_poll = max_poll
+        self.backoff = backoff
+        self.ignored_exceptions = tuple(ignored_exceptions)
+        self.history: List[WaitRecord] = []
+        # Page source fetched by the last combined check, if any
+        self.last_snapshot: Optional[SourceSnapshot] = None
+        round_trips(driver)
+
+    @property
+    def round_trips(self) -> int:
+        """Round trips spent in waits of this instance."""
+        return sum(record.round_trips for record in self.history)
+
+    def until(self, condition: Callable[[Any], Any], message: str = "", label: Optional[str] = None) -> Any:
+        """
+        Call ``condition(driver)`` until it returns a truthy value.
+
+        Args:
+            condition: Callable taking the driver (expected_conditions work)
+            message: Text of the TimeoutException
+            label: Name of the wait in ``history`` and in the timeout message
+                (default: the condition's name and locator)
+
+        Returns:
+            The condition's value
+        """
+        label = label or _describe(condition)
+        start = time.monotonic()
+        deadline = start + self.timeout
+        trips_before = round_trips(self.driver)
+        interval = self.poll
+        polls = 0
+        while True:
+            polls += 1
+            check_started = time.monotonic()
+            try:
+                value = condition(self.driver)
+                if value:
+                    self._record(label, trips_before, polls, start)
+                    return value
+            except self.ignored_exceptions:
+                pass
+            now = time.monotonic()
+            if now >= deadline:
+                self._record(label, trips_before, polls, start, timed_out=True)
+                raise TimeoutException(message or f"Timed out after {self.timeout}s waiting for {label}")
+            latency = now - check_started
+            wait = max(interval, 2 * latency)
+            # The remote call already used part of the interval
+            time.sleep(max(0.0, min(wait - latency, deadline - now)))
+            interval = min(self.max_poll, interval * self.backoff)
+
+    def _record(self, label: str, trips_before: int, polls: int, start: float, timed_out: bool = False) -> None:
+        self.history.append(WaitRecord(
+            label, round_trips(self.driver) - trips_before, polls, time.monotonic() - start, timed_out
+        ))
+
+    def snapshot(self) -> SourceSnapshot:
+        """Fetch and parse the page source (one round trip)."""
+        self.last_snapshot = SourceSnapshot(self.driver.page_source)
+        return self.last_snapshot
+
+    def presence(self, locator: Locator) -> Any:
+        """Wait for an element to exist and return it."""
+        return self.until(lambda driver: driver.find_element(*locator), label=f"presence {locator[1]}")
+
+    def visibility(self, locator: Locator) -> Any:
+        """Wait for an element to be displayed and return it."""
+        def visible(driver):
+            element = driver.find_element(*locator)
+            return element if element.is_displayed() else None
+
+        return self.until(visible, label=f"visibility {locator[1]}")
+
+    def all_present(self, locators: Sequence[Locator], visible: bool = False) -> Dict[Locator, Optional[ET.Element]]:
+        """
+        Wait until every locator matches, checking all of them per poll.
+
+        Returns:
+            Locator -> first matching source node (None for locators checked
+            with a find instead of the page source)
+        """
+        return self.until(
+            lambda driver: self._check(locators, visible, require_all=True),
+            label="all of " + ", ".join(value for _, value in locators),
+        )
+
+    def any_present(self, locators: Sequence[Locator], visible: bool = False) -> Dict[Locator, Optional[ET.Element]]:
+        """
+        Wait until at least one locator matches (e.g. success or error screen).
+
+        Returns:
+            The locators that matched, as in all_present()
+        """
+        return self.until(
+            lambda driver: self._check(locators, visible, require_all=False),
+            label="any of " + ", ".join(value for _, value in locators),
+        )
+
+    def _check(self, locators: Sequence[Locator], visible: bool, require_all: bool):
+        """One poll of a combined condition."""
+        found: Dict[Locator, Optional[ET.Element]] = {}
+        snapshot = self.snapshot() if len(locators) > 1 else None
+        for locator in locators:
+            if snapshot is not None and snapshot.supports(locator):
+                nodes = snapshot.match(locator, visible)
+                if nodes:
+                    found[locator] = nodes[0]
+                continue
+            try:
+                element = self.driver.find_element(*locator)
+                if not visible or element.is_displayed():
+                    found[locator] = None
+            except self.ignored_exceptions:
+                pass
+            if require_all and locator not in found:
+                return None
+        if require_all:
+            return found if len(found) == len(locators) else None
+        return found or None
+
+
+def batch_find(driver, locators: Sequence[Locator], snapshot: SourceSnapshot) -> Dict[Locator, Any]:
+    """
+    Resolve several locators with one find_elements call.
+
+    The locators the platform can combine are merged into one iOS predicate
+    (``name IN {...}``) or Android UiSelector (``descriptionMatches``). Both
+    return matches in document order, so the snapshot tells which element
+    belongs to which locator. When the element count disagrees with the
+    snapshot (the screen changed in between) nothing is returned.
+
+    Args:
+        driver: WebDriver to query
+        locators: Locators to resolve
+        snapshot: Page source of the current screen
+
+    Returns:
+        Locator -> first matching element, for the locators that could be
+        combined and were found; callers find the rest individually
+    """
+    platform = snapshot.platform
+    strategies, attribute = BATCH_STRATEGIES[platform]
+    combinable = [locator for locator in locators if locator[0] in strategies]
+    if len(combinable) < 2:
+        return {}
+
+    values = {locator[1]: locator for locator in combinable}
+    order = [node.get(attribute) for node in snapshot._nodes if node.get(attribute) in values]
+    if not order:
+        return {}
+
+    if platform == "ios":
+        quoted = ", ".join("'%s'" % value.replace("\\", "\\\\").replace("'", "\\'") for value in values)
+        elements = driver.find_elements("-ios predicate string", f"{attribute} IN {{{quoted}}}")
+    else:
+        pattern = "|".join(re.escape(value) for value in values).replace('"', '\\"')
+        elements = driver.find_elements(
+            "-android uiautomator", f'new UiSelector().descriptionMatches("^({pattern})$")'
+        )
+    if len(elements) != len(order):
+        return {}
+
+    found: Dict[Locator, Any] = {}
+    for value, element in zip(order, elements):
+        found.setdefault(values[value], element)
+    return found
+
+
+def _describe(condition: Callable[[Any], Any]) -> str:
+    """
+    Label of a condition, e.g. ``presence_of_element_located test-LOGIN``.
+
+    expected_conditions return closures named ``_predicate``; their name is
+    the factory's, and the locator or text they captured is appended.
+    """
+    parts = getattr(condition, "__qualname__", type(condition).__name__).split(".<locals>.")
+    name = parts[-1]
+    if name == "_predicate" and len(parts) > 1:
+        name = parts[-2].rsplit(".", 1)[-1]
+    arguments = []
+    for cell in getattr(condition, "__closure__", None) or ():
+        try:
+            value = cell.cell_contents
+        except ValueError:
+            continue
+        if isinstance(value, tuple) and len(value) == 2 and all(isinstance(item, str) for item in value):
+            arguments.append(value[1])
+        elif isinstance(value, str):
+            arguments.append(value)
+    return " ".join([name, *arguments])
+
+
+def _relative_xpath(xpath: str) -> str:
+    """
+    Make a ``//`` XPath relative so ElementTree can evaluate it.
+
+    Absolute paths (``/hierarchy/...``) are left as they are; ElementTree
+    rejects them and the locator falls back to a find.
+    """
+    return "." + xpath if xpath.startswith("//") else xpath
+
+
+def _is_visible(node: ET.Element) -> bool:
+    for attribute in VISIBILITY_ATTRIBUTES:
+        value = node.get(attribute)
+        if value is not None:
+            return value == "true"
+    return True